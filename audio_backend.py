@@ -0,0 +1,1029 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend sonore d'Audio Combinator
+Inventaire des sorties audio (sinks) obtenu en une seule requête au serveur
+Connexion native persistante (libpulse) avec repli sur pactl
+Abonnement aux événements du serveur (sinks, modules, flux)
+Compatible avec PulseAudio et PipeWire (pipewire-pulse, ou natif via audio_pipewire)
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import re
+import shlex
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+
+# Valeur PulseAudio correspondant à 100% de volume
+VOLUME_NORM = 65536
+
+# Index invalide renvoyé par le serveur (PA_INVALID_INDEX)
+INVALID_INDEX = 0xFFFFFFFF
+
+# Propriétés consultées (dans l'ordre) quand la description est absente ou vaut "PipeWire"
+DESCRIPTION_PROPERTIES = (
+    "node.description",
+    "device.description",
+    "alsa.card_name",
+    "device.product.name",
+)
+
+
+def percent_to_volume(volume_percent):
+    """Convertit un pourcentage en valeur de volume PulseAudio"""
+    return int((volume_percent / 100.0) * VOLUME_NORM)
+
+
+def volume_to_percent(volume_value):
+    """Convertit une valeur de volume PulseAudio en pourcentage arrondi"""
+    return int(round(volume_value * 100.0 / VOLUME_NORM))
+
+
+def pactl_env():
+    """Environnement forçant une sortie non traduite de pactl"""
+    env = dict(os.environ)
+    env["LC_ALL"] = "C"
+    return env
+
+
+# Processus lancés ensemble par run_concurrently
+MAX_CONCURRENT_COMMANDS = 32
+
+
+def run_concurrently(commands):
+    """Exécute des commandes indépendantes en parallèle (lots de MAX_CONCURRENT_COMMANDS)
+
+    Un lot de N opérations coûte alors environ un aller-retour au lieu de N.
+    Toutes les commandes sont exécutées ; BackendError réunit les échecs.
+    """
+    errors = []
+    for start in range(0, len(commands), MAX_CONCURRENT_COMMANDS):
+        processes = []
+        for command in commands[start:start + MAX_CONCURRENT_COMMANDS]:
+            try:
+                processes.append((command, subprocess.Popen(
+                    [str(arg) for arg in command], stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                    universal_newlines=True, env=pactl_env())))
+            except OSError as e:
+                errors.append(str(e))
+        for command, process in processes:
+            _, stderr = process.communicate()
+            if process.returncode != 0:
+                errors.append(stderr.strip() or f"{os.path.basename(str(command[0]))} {command[1]} a échoué")
+    if errors:
+        raise BackendError("; ".join(errors))
+
+
+@dataclass
+class Sink:
+    """Une sortie audio telle que rapportée par le serveur"""
+    index: int
+    name: str
+    description: str
+    volume: int = 0            # en pourcentage (moyenne des canaux)
+    muted: bool = False
+    state: str = ""
+    monitor_source: str = ""
+    owner_module: int = None
+    latency_usec: int = 0
+    configured_latency_usec: int = 0
+    properties: dict = field(default_factory=dict)
+
+    @property
+    def is_combined(self):
+        """Vrai pour les sorties combinées existantes"""
+        return "combined" in self.name
+
+
+def resolve_description(description, properties, name):
+    """Choisit la description la plus conviviale pour un sink"""
+    if description and description != "PipeWire":
+        return description
+    for key in DESCRIPTION_PROPERTIES:
+        value = properties.get(key)
+        if value and value != "PipeWire":
+            return value
+    return name
+
+
+def _parse_owner_module(value):
+    """Index du module propriétaire, None si absent ou invalide (PA_INVALID_INDEX)"""
+    value = str(value if value is not None else "")
+    if not value.isdigit() or int(value) == INVALID_INDEX:
+        return None
+    return int(value)
+
+
+def _parse_volume_percent(channels):
+    """Moyenne en pourcentage des volumes par canal (format JSON de pactl)"""
+    values = []
+    for channel in channels.values():
+        if isinstance(channel, dict) and "value" in channel:
+            values.append(int(channel["value"]))
+    if not values:
+        return 0
+    return volume_to_percent(sum(values) / len(values))
+
+
+def parse_sinks_json(text):
+    """Analyse la sortie de `pactl --format=json list sinks`"""
+    sinks = []
+    for entry in json.loads(text):
+        properties = entry.get("properties") or {}
+        name = entry.get("name", "")
+        latency = entry.get("latency") or {}
+        sinks.append(Sink(
+            index=int(entry["index"]),
+            name=name,
+            description=resolve_description(entry.get("description"), properties, name),
+            volume=_parse_volume_percent(entry.get("volume") or {}),
+            muted=bool(entry.get("mute", False)),
+            state=str(entry.get("state", "")),
+            monitor_source=entry.get("monitor_source", ""),
+            owner_module=_parse_owner_module(entry.get("owner_module")),
+            latency_usec=int(latency.get("actual", 0) or 0),
+            configured_latency_usec=int(latency.get("configured", 0) or 0),
+            properties=properties,
+        ))
+    return sinks
+
+
+_PROPERTY_RE = re.compile(r'^\s*([\w.\-]+) = "(.*)"$')
+_VOLUME_RE = re.compile(r'(\d+) / +\d+%')
+
+
+def parse_sinks_text(text):
+    """Analyse la sortie texte de `pactl list sinks` (pactl sans support JSON)"""
+    sinks = []
+    for section in re.split(r'^Sink #', text, flags=re.MULTILINE)[1:]:
+        lines = section.splitlines()
+        index = lines[0].strip()
+        if not index.isdigit():
+            continue
+
+        fields = {}
+        properties = {}
+        in_properties = False
+        for line in lines[1:]:
+            if in_properties:
+                match = _PROPERTY_RE.match(line)
+                if match:
+                    properties[match.group(1)] = match.group(2)
+                    continue
+                if line.startswith("\t\t") or not line.strip():
+                    continue
+                in_properties = False
+            stripped = line.strip()
+            if stripped == "Properties:":
+                in_properties = True
+            elif ":" in stripped:
+                key, value = stripped.split(":", 1)
+                fields.setdefault(key, value.strip())
+
+        name = fields.get("Name", "")
+        volumes = [int(v) for v in _VOLUME_RE.findall(fields.get("Volume", ""))]
+        latency = re.match(r'(\d+) usec(?:, configured (\d+))?', fields.get("Latency", ""))
+        sinks.append(Sink(
+            index=int(index),
+            name=name,
+            description=resolve_description(fields.get("Description"), properties, name),
+            volume=volume_to_percent(sum(volumes) / len(volumes)) if volumes else 0,
+            muted=fields.get("Mute", "no") == "yes",
+            state=fields.get("State", ""),
+            monitor_source=fields.get("Monitor Source", ""),
+            owner_module=_parse_owner_module(fields.get("Owner Module")),
+            latency_usec=int(latency.group(1)) if latency else 0,
+            configured_latency_usec=int(latency.group(2) or 0) if latency else 0,
+            properties=properties,
+        ))
+    return sinks
+
+
+def query_sinks(pactl="pactl"):
+    """Liste les sinks en une seule requête, en JSON si pactl le permet"""
+    result = subprocess.run(
+        [pactl, "--format=json", "list", "sinks"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, env=pactl_env()
+    )
+    if result.returncode == 0:
+        try:
+            return parse_sinks_json(result.stdout)
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    # Anciennes versions de pactl : analyse de la sortie texte
+    result = subprocess.run(
+        [pactl, "list", "sinks"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, env=pactl_env()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "pactl list sinks a échoué")
+    return parse_sinks_text(result.stdout)
+
+
+class SinkInventory:
+    """Table en mémoire des sinks, partagée par les listes, préréglages et volumes"""
+
+    def __init__(self):
+        self.sinks = []
+        self._by_name = {}
+        self._by_index = {}
+
+    def load(self, sinks):
+        """Remplace le contenu de la table par une nouvelle liste de sinks"""
+        self.sinks = list(sinks)
+        self._by_name = {sink.name: sink for sink in self.sinks}
+        self._by_index = {sink.index: sink for sink in self.sinks}
+
+    def refresh(self, backend):
+        """Recharge la table depuis le serveur sonore"""
+        self.load(backend.list_sinks())
+        return self.sinks
+
+    def get(self, name):
+        """Retourne le sink portant ce nom technique, ou None"""
+        return self._by_name.get(name)
+
+    def get_by_index(self, index):
+        """Retourne le sink portant cet index serveur, ou None"""
+        return self._by_index.get(int(index))
+
+    def selectable(self):
+        """Sinks pouvant être combinés (hors sorties combinées existantes)"""
+        return [sink for sink in self.sinks if not sink.is_combined]
+
+    def __len__(self):
+        return len(self.sinks)
+
+    def __iter__(self):
+        return iter(self.sinks)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def apply(self, sinks):
+        """Met à jour la table et retourne les sinks ajoutés, retirés et modifiés"""
+        previous = self._by_name
+        self.load(sinks)
+        added = [sink for sink in self.sinks if sink.name not in previous]
+        removed = [sink for name, sink in previous.items() if name not in self._by_name]
+        changed = [sink for sink in self.sinks
+                   if sink.name in previous and previous[sink.name] != sink]
+        return added, removed, changed
+
+    def remove(self, index):
+        """Retire un sink d'après son index serveur et le retourne"""
+        sink = self._by_index.pop(int(index), None)
+        if sink:
+            self.sinks.remove(sink)
+            del self._by_name[sink.name]
+        return sink
+
+
+class BackendError(RuntimeError):
+    """Erreur renvoyée par le serveur sonore ou par le backend"""
+
+
+@dataclass
+class Module:
+    """Un module chargé dans le serveur sonore"""
+    index: int
+    name: str
+    argument: str = ""
+
+
+@dataclass
+class SinkInput:
+    """Un flux de lecture (sink-input) et le sink sur lequel il joue"""
+    index: int
+    sink: int
+    client: int = None
+    properties: dict = field(default_factory=dict)
+    volume: int = None         # en pourcentage ; None si inconnu (liste courte de pactl)
+    muted: bool = None
+    owner_module: int = None   # module qui a créé le flux (combinaison, boucle...)
+
+    @property
+    def application(self):
+        """Nom de l'application qui joue le flux, "" si inconnu"""
+        return (self.properties.get("application.name")
+                or self.properties.get("application.process.binary") or "")
+
+    @property
+    def internal(self):
+        """Flux créé par un module du serveur plutôt que par une application"""
+        return self.owner_module is not None
+
+
+@dataclass
+class SinkState:
+    """État cible d'un sink ; None signifie « ne pas modifier »"""
+    name: str
+    volume: int = None
+    muted: bool = None
+
+
+def diff_sink_states(inventory, targets):
+    """Ne garde que les volumes et sourdines différents de l'état connu du serveur"""
+    changes = []
+    for target in targets:
+        sink = inventory.get(target.name)
+        if sink is None:
+            changes.append(target)
+            continue
+        volume = target.volume if target.volume is not None and target.volume != sink.volume else None
+        muted = target.muted if target.muted is not None and target.muted != sink.muted else None
+        if volume is not None or muted is not None:
+            changes.append(SinkState(target.name, volume, muted))
+    return changes
+
+
+@dataclass
+class MixerSnapshot:
+    """État du mélangeur à un instant : volumes et sourdines, sortie par défaut, flux
+
+    streams associe l'index de chaque flux au sink sur lequel il jouait et à
+    son application, pour ne pas déplacer un autre flux qui aurait repris
+    l'index (serveur redémarré).
+    """
+    sinks: dict = field(default_factory=dict)    # nom -> SinkState
+    default_sink: str = None
+    streams: dict = field(default_factory=dict)  # index du flux -> (nom du sink, application)
+
+    @classmethod
+    def capture(cls, inventory, sink_inputs, default_sink):
+        streams = {}
+        for sink_input in sink_inputs:
+            sink = inventory.get_by_index(sink_input.sink) if sink_input.sink is not None else None
+            if sink is not None:
+                streams[sink_input.index] = (sink.name, sink_input.application)
+        return cls({sink.name: SinkState(sink.name, sink.volume, sink.muted) for sink in inventory},
+                   default_sink, streams)
+
+    def to_dict(self):
+        return {
+            "sinks": {name: [state.volume, state.muted] for name, state in self.sinks.items()},
+            "default_sink": self.default_sink,
+            "streams": {str(index): list(entry) for index, entry in self.streams.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({name: SinkState(name, volume, muted)
+                    for name, (volume, muted) in data.get("sinks", {}).items()},
+                   data.get("default_sink"),
+                   {int(index): tuple(entry) for index, entry in data.get("streams", {}).items()})
+
+
+@dataclass
+class ServerEvent:
+    """Événement du serveur sonore
+
+    kind vaut "new", "change" ou "remove" ; "resync" signale que l'abonnement
+    vient d'être (r)établi et que des événements ont pu être manqués.
+    """
+    kind: str
+    facility: str
+    index: int = None
+
+
+_EVENT_RE = re.compile(r"Event '(\w+)' on ([\w-]+)(?: #(\d+))?")
+
+
+def parse_event(line):
+    """Analyse une ligne de `pactl subscribe`, retourne None si elle est inconnue"""
+    match = _EVENT_RE.match(line.strip())
+    if not match:
+        return None
+    index = match.group(3)
+    return ServerEvent(match.group(1), match.group(2), int(index) if index else None)
+
+
+def parse_short_modules(text):
+    """Analyse la sortie de `pactl list short modules`"""
+    modules = []
+    for line in text.splitlines():
+        parts = line.split("\t")
+        if len(parts) >= 2 and parts[0].strip().isdigit():
+            modules.append(Module(int(parts[0]), parts[1].strip(),
+                                  parts[2].strip() if len(parts) > 2 else ""))
+    return modules
+
+
+def parse_sink_inputs_json(text):
+    """Analyse la sortie de `pactl --format=json list sink-inputs`"""
+    sink_inputs = []
+    for entry in json.loads(text):
+        client = str(entry.get("client", ""))
+        sink_inputs.append(SinkInput(
+            index=int(entry["index"]),
+            sink=int(entry["sink"]),
+            client=int(client) if client.isdigit() else None,
+            properties=entry.get("properties") or {},
+            volume=_parse_volume_percent(entry.get("volume") or {}),
+            muted=bool(entry.get("mute", False)),
+            owner_module=_parse_owner_module(entry.get("owner_module")),
+        ))
+    return sink_inputs
+
+
+def parse_module_arguments(argument):
+    """sink_name="x" slaves="a,b" -> {"sink_name": "x", "slaves": "a,b"}"""
+    values = {}
+    for part in shlex.split(argument or ""):
+        key, _, value = part.partition("=")
+        values[key] = value
+    return values
+
+
+def parse_short_sink_inputs(text):
+    """Analyse la sortie de `pactl list short sink-inputs`"""
+    sink_inputs = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 3 and parts[0].isdigit() and parts[1].isdigit():
+            sink_inputs.append(SinkInput(int(parts[0]), int(parts[1]),
+                                         int(parts[2]) if parts[2].isdigit() else None))
+    return sink_inputs
+
+
+class SoundBackend:
+    """Interface commune des backends de contrôle du serveur sonore"""
+
+    name = "abstract"
+
+    def list_sinks(self):
+        raise NotImplementedError
+
+    def list_modules(self):
+        raise NotImplementedError
+
+    def list_sink_inputs(self):
+        raise NotImplementedError
+
+    def set_sink_volume(self, sink_name, volume_percent):
+        raise NotImplementedError
+
+    def set_sink_mute(self, sink_name, muted):
+        raise NotImplementedError
+
+    def set_sink_input_volume(self, sink_input_id, volume_percent):
+        raise NotImplementedError
+
+    def set_sink_input_mute(self, sink_input_id, muted):
+        raise NotImplementedError
+
+    def load_module(self, name, argument=""):
+        """Charge un module et retourne son index"""
+        raise NotImplementedError
+
+    def unload_module(self, module_id):
+        raise NotImplementedError
+
+    def set_default_sink(self, sink_name):
+        raise NotImplementedError
+
+    def get_default_sink(self):
+        """Nom du sink par défaut, None s'il n'y en a pas"""
+        raise NotImplementedError
+
+    def move_sink_input(self, sink_input_id, sink_name):
+        raise NotImplementedError
+
+    def move_sink_inputs(self, sink_input_ids, sink_name):
+        """Déplace plusieurs flux vers un sink ; les backends natifs l'envoient en un lot"""
+        for sink_input_id in sink_input_ids:
+            self.move_sink_input(sink_input_id, sink_name)
+
+    def apply_sink_states(self, states):
+        """Applique une liste de SinkState ; les backends natifs l'envoient en un lot"""
+        for state in states:
+            if state.volume is not None:
+                self.set_sink_volume(state.name, state.volume)
+            if state.muted is not None:
+                self.set_sink_mute(state.name, state.muted)
+
+    def subscribe(self, callback):
+        """Appelle callback(ServerEvent) depuis un thread à chaque événement
+
+        Retourne un objet dont la méthode stop() met fin à l'abonnement.
+        """
+        monitor = PactlEventMonitor(callback)
+        monitor.start()
+        return monitor
+
+    def close(self):
+        """Libère la connexion au serveur"""
+
+
+class PactlBackend(SoundBackend):
+    """Backend de repli : un processus pactl par opération"""
+
+    name = "pactl"
+
+    def __init__(self, pactl="pactl"):
+        self.pactl = pactl
+
+    def run(self, *args):
+        """Exécute pactl (sans shell) et retourne sa sortie standard"""
+        try:
+            result = subprocess.run(
+                [self.pactl] + [str(arg) for arg in args],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                universal_newlines=True, env=pactl_env()
+            )
+        except OSError as e:
+            raise BackendError(str(e))
+        if result.returncode != 0:
+            raise BackendError(result.stderr.strip() or f"pactl {args[0]} a échoué")
+        return result.stdout
+
+    def list_sinks(self):
+        try:
+            return query_sinks(self.pactl)
+        except (OSError, RuntimeError) as e:
+            raise BackendError(str(e))
+
+    def list_modules(self):
+        return parse_short_modules(self.run("list", "short", "modules"))
+
+    def list_sink_inputs(self):
+        # Le format JSON donne les propriétés (nom de l'application) et le volume
+        try:
+            return parse_sink_inputs_json(self.run("--format=json", "list", "sink-inputs"))
+        except (BackendError, ValueError, KeyError, TypeError):
+            return parse_short_sink_inputs(self.run("list", "short", "sink-inputs"))
+
+    def set_sink_volume(self, sink_name, volume_percent):
+        self.run("set-sink-volume", sink_name, percent_to_volume(volume_percent))
+
+    def set_sink_mute(self, sink_name, muted):
+        self.run("set-sink-mute", sink_name, "1" if muted else "0")
+
+    def set_sink_input_volume(self, sink_input_id, volume_percent):
+        self.run("set-sink-input-volume", sink_input_id, percent_to_volume(volume_percent))
+
+    def set_sink_input_mute(self, sink_input_id, muted):
+        self.run("set-sink-input-mute", sink_input_id, "1" if muted else "0")
+
+    def load_module(self, name, argument=""):
+        args = ["load-module", name] + (argument.split() if argument else [])
+        output = self.run(*args).strip()
+        if not output.isdigit():
+            raise BackendError(f"Réponse inattendue de load-module: {output}")
+        return int(output)
+
+    def unload_module(self, module_id):
+        self.run("unload-module", module_id)
+
+    def set_default_sink(self, sink_name):
+        self.run("set-default-sink", sink_name)
+
+    def get_default_sink(self):
+        try:
+            return self.run("get-default-sink").strip() or None
+        except BackendError:
+            # pactl antérieur à la version 15 : lire la ligne de `pactl info`
+            for line in self.run("info").splitlines():
+                key, _, value = line.partition(":")
+                if key.strip() == "Default Sink":
+                    return value.strip() or None
+            return None
+
+    def move_sink_input(self, sink_input_id, sink_name):
+        self.run("move-sink-input", sink_input_id, sink_name)
+
+    def apply_sink_states(self, states):
+        """Un pactl par réglage, lancés ensemble plutôt que l'un après l'autre"""
+        commands = []
+        for state in states:
+            if state.volume is not None:
+                commands.append((self.pactl, "set-sink-volume", state.name, percent_to_volume(state.volume)))
+            if state.muted is not None:
+                commands.append((self.pactl, "set-sink-mute", state.name, "1" if state.muted else "0"))
+        run_concurrently(commands)
+
+    def move_sink_inputs(self, sink_input_ids, sink_name):
+        """Un pactl par flux, lancés ensemble plutôt que l'un après l'autre"""
+        run_concurrently([(self.pactl, "move-sink-input", sink_input_id, sink_name)
+                          for sink_input_id in sink_input_ids])
+
+    def subscribe(self, callback):
+        monitor = PactlEventMonitor(callback, self.pactl)
+        monitor.start()
+        return monitor
+
+
+class PactlEventMonitor:
+    """Flux d'événements lu depuis un processus `pactl subscribe` de longue durée
+
+    Le processus est relancé si le serveur redémarre ; un événement "resync"
+    est émis à chaque (re)connexion.
+    """
+
+    def __init__(self, callback, pactl="pactl", retry_delay=1.0):
+        self.callback = callback
+        self.pactl = pactl
+        self.retry_delay = retry_delay
+        self.running = False
+        self.process = None
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def _run(self):
+        while self.running:
+            try:
+                self.process = subprocess.Popen(
+                    [self.pactl, "subscribe"],
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                    universal_newlines=True, env=pactl_env()
+                )
+            except OSError:
+                self.process = None
+            else:
+                self.callback(ServerEvent("resync", "server"))
+                for line in self.process.stdout:
+                    event = parse_event(line)
+                    if event:
+                        self.callback(event)
+                self.process.wait()
+            if self.running:
+                time.sleep(self.retry_delay)
+
+
+# Constantes de libpulse
+_PA_CONTEXT_READY = 4
+_PA_CONTEXT_FAILED = 5
+_PA_CONTEXT_TERMINATED = 6
+_PA_OPERATION_RUNNING = 0
+_PA_CHANNELS_MAX = 32
+
+# Masque d'abonnement : sinks, sink-inputs, modules et serveur
+_PA_SUBSCRIPTION_MASK = 0x0001 | 0x0004 | 0x0010 | 0x0080
+_PA_EVENT_FACILITY_MASK = 0x0F
+_PA_EVENT_TYPE_MASK = 0x30
+_PA_FACILITIES = {0: "sink", 2: "sink-input", 4: "module", 7: "server"}
+_PA_EVENT_TYPES = {0x00: "new", 0x10: "change", 0x20: "remove"}
+
+
+class _CVolume(ctypes.Structure):
+    _fields_ = [("channels", ctypes.c_uint8),
+                ("values", ctypes.c_uint32 * _PA_CHANNELS_MAX)]
+
+
+_STATE_CB = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_void_p)
+_SUCCESS_CB = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p)
+_INDEX_CB = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_uint32, ctypes.c_void_p)
+_SUBSCRIBE_CB = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_int, ctypes.c_uint32, ctypes.c_void_p)
+
+
+def _load_libpulse():
+    """Charge libpulse et déclare les signatures utilisées"""
+    path = ctypes.util.find_library("pulse")
+    if not path:
+        raise BackendError("libpulse introuvable")
+    lib = ctypes.CDLL(path)
+
+    p = ctypes.c_void_p
+    signatures = {
+        "pa_threaded_mainloop_new": (p, []),
+        "pa_threaded_mainloop_free": (None, [p]),
+        "pa_threaded_mainloop_start": (ctypes.c_int, [p]),
+        "pa_threaded_mainloop_stop": (None, [p]),
+        "pa_threaded_mainloop_lock": (None, [p]),
+        "pa_threaded_mainloop_unlock": (None, [p]),
+        "pa_threaded_mainloop_wait": (None, [p]),
+        "pa_threaded_mainloop_signal": (None, [p, ctypes.c_int]),
+        "pa_threaded_mainloop_get_api": (p, [p]),
+        "pa_context_new": (p, [p, ctypes.c_char_p]),
+        "pa_context_unref": (None, [p]),
+        "pa_context_connect": (ctypes.c_int, [p, ctypes.c_char_p, ctypes.c_int, p]),
+        "pa_context_disconnect": (None, [p]),
+        "pa_context_get_state": (ctypes.c_int, [p]),
+        "pa_context_errno": (ctypes.c_int, [p]),
+        "pa_context_set_state_callback": (None, [p, _STATE_CB, p]),
+        "pa_strerror": (ctypes.c_char_p, [ctypes.c_int]),
+        "pa_operation_get_state": (ctypes.c_int, [p]),
+        "pa_operation_unref": (None, [p]),
+        "pa_context_set_sink_volume_by_name": (p, [p, ctypes.c_char_p, ctypes.POINTER(_CVolume), _SUCCESS_CB, p]),
+        "pa_context_set_sink_mute_by_name": (p, [p, ctypes.c_char_p, ctypes.c_int, _SUCCESS_CB, p]),
+        "pa_context_set_sink_input_volume": (p, [p, ctypes.c_uint32, ctypes.POINTER(_CVolume), _SUCCESS_CB, p]),
+        "pa_context_set_sink_input_mute": (p, [p, ctypes.c_uint32, ctypes.c_int, _SUCCESS_CB, p]),
+        "pa_context_load_module": (p, [p, ctypes.c_char_p, ctypes.c_char_p, _INDEX_CB, p]),
+        "pa_context_unload_module": (p, [p, ctypes.c_uint32, _SUCCESS_CB, p]),
+        "pa_context_set_default_sink": (p, [p, ctypes.c_char_p, _SUCCESS_CB, p]),
+        "pa_context_move_sink_input_by_name": (p, [p, ctypes.c_uint32, ctypes.c_char_p, _SUCCESS_CB, p]),
+        "pa_context_set_subscribe_callback": (None, [p, _SUBSCRIBE_CB, p]),
+        "pa_context_subscribe": (p, [p, ctypes.c_int, _SUCCESS_CB, p]),
+    }
+    for function, (restype, argtypes) in signatures.items():
+        func = getattr(lib, function)
+        func.restype = restype
+        func.argtypes = argtypes
+    return lib
+
+
+class PulseNativeBackend(SoundBackend):
+    """Connexion persistante au protocole natif via libpulse (ctypes)
+
+    Chaque opération est un aller-retour sur la socket déjà ouverte au lieu
+    d'un fork de pactl. Les listes (sinks, modules, flux) passent encore par
+    pactl car les structures d'information de libpulse varient selon les versions.
+    """
+
+    name = "libpulse"
+
+    def __init__(self, client_name="Audio Combinator", pactl="pactl"):
+        self.client_name = client_name.encode()
+        self.lib = _load_libpulse()
+        self.lister = PactlBackend(pactl)
+        self.mainloop = None
+        self.context = None
+        self._lock = threading.Lock()
+        self._result = None
+        self._batch_failures = 0
+        self._event_callback = None
+
+        # Garder les callbacks en vie tant que la connexion existe
+        self._state_cb = _STATE_CB(self._on_state)
+        self._success_cb = _SUCCESS_CB(self._on_success)
+        self._index_cb = _INDEX_CB(self._on_index)
+        self._subscribe_cb = _SUBSCRIBE_CB(self._on_event)
+        self._batch_cb = _SUCCESS_CB(self._on_batch_result)
+
+        self.connect()
+
+    # Callbacks appelés depuis le thread de la boucle libpulse
+    def _on_state(self, context, userdata):
+        self.lib.pa_threaded_mainloop_signal(self.mainloop, 0)
+
+    def _on_success(self, context, success, userdata):
+        self._result = bool(success)
+        self.lib.pa_threaded_mainloop_signal(self.mainloop, 0)
+
+    def _on_batch_result(self, context, success, userdata):
+        if not success:
+            self._batch_failures += 1
+        self.lib.pa_threaded_mainloop_signal(self.mainloop, 0)
+
+    def _on_index(self, context, index, userdata):
+        self._result = index
+        self.lib.pa_threaded_mainloop_signal(self.mainloop, 0)
+
+    def _on_event(self, context, event_type, index, userdata):
+        callback = self._event_callback
+        facility = _PA_FACILITIES.get(event_type & _PA_EVENT_FACILITY_MASK)
+        kind = _PA_EVENT_TYPES.get(event_type & _PA_EVENT_TYPE_MASK)
+        if callback and facility and kind:
+            callback(ServerEvent(kind, facility, None if index == INVALID_INDEX else index))
+
+    def _error(self):
+        errno = self.lib.pa_context_errno(self.context)
+        return BackendError(self.lib.pa_strerror(errno).decode())
+
+    def connect(self):
+        """Ouvre la connexion au serveur et attend qu'elle soit prête"""
+        lib = self.lib
+        self.mainloop = lib.pa_threaded_mainloop_new()
+        self.context = lib.pa_context_new(lib.pa_threaded_mainloop_get_api(self.mainloop),
+                                          self.client_name)
+        lib.pa_context_set_state_callback(self.context, self._state_cb, None)
+
+        lib.pa_threaded_mainloop_lock(self.mainloop)
+        try:
+            if lib.pa_threaded_mainloop_start(self.mainloop) < 0:
+                raise BackendError("Impossible de démarrer la boucle libpulse")
+            if lib.pa_context_connect(self.context, None, 0, None) < 0:
+                raise self._error()
+            while True:
+                state = lib.pa_context_get_state(self.context)
+                if state == _PA_CONTEXT_READY:
+                    break
+                if state in (_PA_CONTEXT_FAILED, _PA_CONTEXT_TERMINATED):
+                    raise self._error()
+                lib.pa_threaded_mainloop_wait(self.mainloop)
+        except BackendError:
+            lib.pa_threaded_mainloop_unlock(self.mainloop)
+            self.close()
+            raise
+        lib.pa_threaded_mainloop_unlock(self.mainloop)
+
+        # Rétablir l'abonnement aux événements après une reconnexion
+        if self._event_callback:
+            self._subscribe()
+
+    def close(self):
+        if self.mainloop:
+            self.lib.pa_threaded_mainloop_stop(self.mainloop)
+        if self.context:
+            self.lib.pa_context_set_state_callback(self.context, _STATE_CB(), None)
+            self.lib.pa_context_disconnect(self.context)
+            self.lib.pa_context_unref(self.context)
+            self.context = None
+        if self.mainloop:
+            self.lib.pa_threaded_mainloop_free(self.mainloop)
+            self.mainloop = None
+
+    def _ensure_connected(self):
+        """Rétablit la connexion si le serveur a été redémarré"""
+        if self.context and self.lib.pa_context_get_state(self.context) == _PA_CONTEXT_READY:
+            return
+        self.close()
+        self.connect()
+
+    def _operation(self, function, *args):
+        """Lance une opération asynchrone libpulse et attend son résultat"""
+        lib = self.lib
+        lib.pa_threaded_mainloop_lock(self.mainloop)
+        try:
+            self._result = None
+            operation = function(self.context, *args)
+            if not operation:
+                raise self._error()
+            while lib.pa_operation_get_state(operation) == _PA_OPERATION_RUNNING:
+                lib.pa_threaded_mainloop_wait(self.mainloop)
+            lib.pa_operation_unref(operation)
+            if self._result is False:
+                raise self._error()
+            return self._result
+        finally:
+            lib.pa_threaded_mainloop_unlock(self.mainloop)
+
+    def _call(self, function, *args):
+        """Exécute une opération sur la connexion, en la rétablissant si besoin"""
+        with self._lock:
+            self._ensure_connected()
+            return self._operation(function, *args)
+
+    def _batch(self, calls):
+        """Envoie toutes les opérations d'un coup puis attend l'ensemble des réponses
+
+        calls est une liste de tuples (fonction, arguments...) de fonctions
+        libpulse prenant un callback de succès en fin d'arguments.
+        """
+        with self._lock:
+            self._ensure_connected()
+            lib = self.lib
+            lib.pa_threaded_mainloop_lock(self.mainloop)
+            operations = []
+            try:
+                self._batch_failures = 0
+                for function, *args in calls:
+                    operation = function(self.context, *args, self._batch_cb, None)
+                    if not operation:
+                        raise self._error()
+                    operations.append(operation)
+            finally:
+                for operation in operations:
+                    while lib.pa_operation_get_state(operation) == _PA_OPERATION_RUNNING:
+                        lib.pa_threaded_mainloop_wait(self.mainloop)
+                    lib.pa_operation_unref(operation)
+                lib.pa_threaded_mainloop_unlock(self.mainloop)
+            if self._batch_failures:
+                raise BackendError(f"{self._batch_failures} opération(s) sur {len(calls)} ont échoué")
+
+    def _subscribe(self):
+        self.lib.pa_context_set_subscribe_callback(self.context, self._subscribe_cb, None)
+        self._operation(self.lib.pa_context_subscribe, _PA_SUBSCRIPTION_MASK,
+                        self._success_cb, None)
+        self._event_callback(ServerEvent("resync", "server"))
+
+    @staticmethod
+    def _cvolume(volume_percent):
+        """Volume mono : le serveur l'applique à tous les canaux"""
+        volume = _CVolume()
+        volume.channels = 1
+        volume.values[0] = percent_to_volume(volume_percent)
+        return ctypes.byref(volume)
+
+    def list_sinks(self):
+        return self.lister.list_sinks()
+
+    def list_modules(self):
+        return self.lister.list_modules()
+
+    def list_sink_inputs(self):
+        return self.lister.list_sink_inputs()
+
+    def get_default_sink(self):
+        return self.lister.get_default_sink()
+
+    def set_sink_volume(self, sink_name, volume_percent):
+        self._call(self.lib.pa_context_set_sink_volume_by_name, sink_name.encode(),
+                   self._cvolume(volume_percent), self._success_cb, None)
+
+    def set_sink_mute(self, sink_name, muted):
+        self._call(self.lib.pa_context_set_sink_mute_by_name, sink_name.encode(),
+                   int(bool(muted)), self._success_cb, None)
+
+    def set_sink_input_volume(self, sink_input_id, volume_percent):
+        self._call(self.lib.pa_context_set_sink_input_volume, int(sink_input_id),
+                   self._cvolume(volume_percent), self._success_cb, None)
+
+    def set_sink_input_mute(self, sink_input_id, muted):
+        self._call(self.lib.pa_context_set_sink_input_mute, int(sink_input_id),
+                   int(bool(muted)), self._success_cb, None)
+
+    def load_module(self, name, argument=""):
+        index = self._call(self.lib.pa_context_load_module, name.encode(),
+                           argument.encode(), self._index_cb, None)
+        if index is None or index == INVALID_INDEX:
+            raise self._error()
+        return index
+
+    def unload_module(self, module_id):
+        self._call(self.lib.pa_context_unload_module, int(module_id),
+                   self._success_cb, None)
+
+    def set_default_sink(self, sink_name):
+        self._call(self.lib.pa_context_set_default_sink, sink_name.encode(),
+                   self._success_cb, None)
+
+    def move_sink_input(self, sink_input_id, sink_name):
+        self._call(self.lib.pa_context_move_sink_input_by_name, int(sink_input_id),
+                   sink_name.encode(), self._success_cb, None)
+
+    def move_sink_inputs(self, sink_input_ids, sink_name):
+        """Déplace tous les flux en un seul aller-retour"""
+        name = sink_name.encode()
+        calls = [(self.lib.pa_context_move_sink_input_by_name, int(sink_input_id), name)
+                 for sink_input_id in sink_input_ids]
+        if calls:
+            self._batch(calls)
+
+    def apply_sink_states(self, states):
+        """Envoie tous les volumes et sourdines en un seul aller-retour"""
+        calls = []
+        for state in states:
+            name = state.name.encode()
+            if state.volume is not None:
+                calls.append((self.lib.pa_context_set_sink_volume_by_name, name,
+                              self._cvolume(state.volume)))
+            if state.muted is not None:
+                calls.append((self.lib.pa_context_set_sink_mute_by_name, name,
+                              int(bool(state.muted))))
+        if calls:
+            self._batch(calls)
+
+    def subscribe(self, callback):
+        """Abonnement natif : les événements arrivent sur la connexion existante"""
+        with self._lock:
+            self._ensure_connected()
+            self._event_callback = callback
+            self._subscribe()
+        return _NativeSubscription(self)
+
+
+class _NativeSubscription:
+    """Poignée d'un abonnement natif"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def stop(self):
+        self.backend._event_callback = None
+
+
+BACKEND_KINDS = ("auto", "pipewire", "native", "pactl", "simulated")
+
+
+def create_backend(kind="auto"):
+    """Retourne le backend demandé ; "auto" choisit libpulse, sinon pactl
+
+    "pipewire" pilote PipeWire directement (audio_pipewire) et ne s'active que
+    sur demande : ses écritures passent par wpctl/pw-metadata, un processus
+    par opération, plus lentes que libpulse via pipewire-pulse. "simulated"
+    est un serveur en mémoire (audio_simulator), sans matériel audio.
+    """
+    if kind not in BACKEND_KINDS:
+        raise ValueError(f"Backend inconnu: {kind}")
+    if kind == "simulated":
+        from audio_simulator import SimulatedBackend
+        return SimulatedBackend()
+    if kind == "pipewire":
+        from audio_pipewire import PipeWireBackend
+        return PipeWireBackend()
+    if kind in ("auto", "native"):
+        try:
+            return PulseNativeBackend()
+        except (BackendError, OSError, AttributeError):
+            if kind == "native":
+                raise
+    return PactlBackend()
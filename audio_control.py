@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API de contrôle locale d'Audio Combinator
+Serveur sur socket Unix, protocole JSON par lignes (une requête, une réponse)
+
+Chaque requête est un objet JSON sur une ligne, par exemple :
+    {"id": 1, "op": "set-volume", "sink": "alsa_output.usb", "volume": 40}
+    {"id": 2, "op": "set-volume", "volumes": {"sink_a": 40, "sink_b": 60}}
+    {"id": 3, "op": "batch", "ops": [{"op": "mute", "sink": "combined", "muted": true}]}
+    {"id": 4, "op": "fade", "sink": "combined", "volume": 20, "duration": 800}
+    {"id": 5, "op": "start", "zone": "etage", "devices": ["sink_c", "sink_d"]}
+Les réponses arrivent dans l'ordre des requêtes :
+    {"id": 1, "ok": true, "result": null}
+Un client peut envoyer plusieurs requêtes sans attendre les réponses.
+"""
+
+import functools
+import json
+import os
+import socket
+import socketserver
+import threading
+
+from audio_backend import BackendError, SinkState
+from audio_recorder import default_recording_dir
+from audio_streams import RoutingRule, stream_selection
+from audio_zones import DEFAULT_ZONE
+
+
+def default_socket_path():
+    """Chemin de la socket de contrôle (dans XDG_RUNTIME_DIR si disponible)"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "audio-combinator.sock")
+    return f"/tmp/audio-combinator-{os.getuid()}.sock"
+
+
+def _sink_to_dict(sink):
+    return {
+        "index": sink.index,
+        "name": sink.name,
+        "description": sink.description,
+        "volume": sink.volume,
+        "muted": sink.muted,
+    }
+
+
+def _stream_to_dict(stream, sink):
+    return {
+        "index": stream.index,
+        "application": stream.application,
+        "sink": sink.name if sink else stream.sink,
+        "volume": stream.volume,
+        "muted": stream.muted,
+    }
+
+
+def _per_sink(request, key, value_key, default=None):
+    """Valeurs par sink : objet "key", ou la paire "sink"/value_key"""
+    if key in request:
+        values = request[key]
+        if not isinstance(values, dict):
+            raise ValueError(f'"{key}" doit être un objet {{sink: valeur}}.')
+        return values
+    if default is None:
+        return {request["sink"]: request[value_key]}
+    return {request["sink"]: request.get(value_key, default)}
+
+
+def _zone(request):
+    """Zone visée par une requête ("zone", par défaut la zone principale)"""
+    return str(request.get("zone") or DEFAULT_ZONE)
+
+
+class ControlProtocol:
+    """Exécute les requêtes du protocole sur le cœur
+
+    run(func, *args) exécute les opérations longues (démarrage, arrêt,
+    préréglage) ; l'interface graphique y passe son exécuteur de commandes
+    pour qu'elles restent ordonnées avec les siennes. on_change() est appelé
+    après toute opération modifiant l'état de la combinaison.
+    """
+
+    def __init__(self, core, run=None, on_change=None):
+        self.core = core
+        self.run = run or (lambda func, *args: func(*args))
+        self.on_change = on_change or (lambda: None)
+        self.operations = {
+            "list": self.op_list,
+            "status": self.op_status,
+            "start": self.op_start,
+            "stop": self.op_stop,
+            "set-volume": self.op_set_volume,
+            "mute": self.op_mute,
+            "load-preset": self.op_load_preset,
+            "reconfigure": self.op_reconfigure,
+            "fade": self.op_fade,
+            "cancel-fade": self.op_cancel_fade,
+            "latency": self.op_latency,
+            "stats": self.op_stats,
+            "streams": self.op_streams,
+            "set-stream-volume": self.op_set_stream_volume,
+            "routes": self.op_routes,
+            "record": self.op_record,
+            "batch": self.op_batch,
+        }
+
+    def handle_line(self, line):
+        """Traite une ligne de requête et retourne la ligne de réponse"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return json.dumps({"ok": False, "error": f"JSON invalide: {e}"})
+        return json.dumps(self.handle(request), ensure_ascii=False)
+
+    def handle(self, request):
+        """Exécute une requête et retourne la réponse"""
+        response = {"id": request.get("id")} if isinstance(request, dict) else {}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("La requête doit être un objet JSON.")
+            operation = self.operations.get(request.get("op"))
+            if operation is None:
+                raise ValueError(f"Opération inconnue: {request.get('op')}")
+            response["ok"] = True
+            response["result"] = operation(request)
+        except (BackendError, KeyError, ValueError, TypeError) as e:
+            response["ok"] = False
+            response["error"] = e.args[0] if e.args else str(e)
+        except OSError as e:
+            response["ok"] = False
+            response["error"] = str(e)
+        except Exception as e:
+            # Une erreur imprévue ne doit ni tuer le client ni interrompre un lot
+            self.core.log(f"Erreur inattendue sur {request.get('op')!r}: {e!r}", "error")
+            response["ok"] = False
+            response["error"] = f"Erreur interne: {e}"
+        return response
+
+    def op_list(self, request):
+        return self.run(self._list)
+
+    def _list(self):
+        self.core.refresh()
+        return [_sink_to_dict(sink) for sink in self.core.sinks]
+
+    def op_status(self, request):
+        return self.core.status()
+
+    def op_start(self, request):
+        if "preset" in request:
+            plan = self.core.plan_from_preset(request["preset"])
+        else:
+            plan = self.core.make_plan(request["devices"], request.get("volumes"),
+                                       request.get("main_volume", 50),
+                                       request.get("set_as_default", True))
+        if "move_streams" in request:
+            plan["move_streams"] = stream_selection(request["move_streams"])
+        started = self.run(functools.partial(self.core.start, plan, zone=_zone(request)))
+        self.on_change()
+        if not started:
+            raise ValueError("Impossible de créer la sortie combinée.")
+        return self.core.status()
+
+    def op_stop(self, request):
+        stopped = self.run(self.core.stop, _zone(request))
+        self.on_change()
+        return stopped
+
+    def op_set_volume(self, request):
+        """Volume d'un sink ("sink"/"volume") ou de plusieurs ("volumes")"""
+        volumes = {sink_name: int(volume)
+                   for sink_name, volume in _per_sink(request, "volumes", "volume").items()}
+        for volume in volumes.values():
+            if not 0 <= volume <= 150:
+                raise ValueError(f"Volume hors limites: {volume}")
+        self.run(self._set_volumes, volumes)
+        return None
+
+    def _set_volumes(self, volumes):
+        for sink_name, volume in volumes.items():
+            self.core.set_volume(self.core.resolve_sink(sink_name), volume)
+
+    def op_mute(self, request):
+        """Sourdine d'un sink ("sink"/"muted") ou de plusieurs ("mutes"), en un lot
+
+        Avec "fade" (ms), chaque sortie passe par un fondu au lieu d'être coupée net.
+        """
+        mutes = _per_sink(request, "mutes", "muted", default=True)
+        if request.get("fade"):
+            self.run(self._fade_mutes, mutes, int(request["fade"]))
+            return None
+        targets = [SinkState(self.core.resolve_sink(name), muted=bool(muted))
+                   for name, muted in mutes.items()]
+        self.run(self.core.backend.apply_sink_states, targets)
+        for target in targets:
+            sink = self.core.sinks.get(target.name)
+            if sink:
+                sink.muted = target.muted
+        return None
+
+    def _fade_mutes(self, mutes, duration_ms):
+        for name, muted in mutes.items():
+            self.core.fade_mute(name, bool(muted), duration_ms)
+
+    def op_fade(self, request):
+        """Fondu d'un ou plusieurs sinks ("duration" en ms, "curve" : linear, ease, cubic)"""
+        volumes = {sink_name: int(volume)
+                   for sink_name, volume in _per_sink(request, "volumes", "volume").items()}
+        self.run(self._fade, volumes, int(request.get("duration", 500)), request.get("curve", "linear"))
+        return None
+
+    def _fade(self, volumes, duration_ms, curve):
+        for sink_name, volume in volumes.items():
+            self.core.fade(sink_name, volume, duration_ms, curve)
+
+    def op_cancel_fade(self, request):
+        """Arrête un fondu et retourne le volume atteint"""
+        return self.core.fades.cancel(("sink", self.core.resolve_sink(request["sink"])))
+
+    def op_latency(self, request):
+        """Mesure les latences des sinks demandés ("sinks") ou des sorties combinées d'une zone"""
+        names = request.get("sinks")
+        zone = self.core.get_zone(_zone(request), create=False)
+        if names is None and not zone.combined_sink_active:
+            raise ValueError("Aucune sortie combinée active.")
+        return self.run(self.core.measure_latency, names, zone.name).to_dict()
+
+    def op_stats(self, request):
+        """Statistiques des appels au serveur sonore, par opération"""
+        if self.core.metrics is None:
+            raise ValueError("Statistiques désactivées (lancez avec --stats).")
+        return self.core.metrics.snapshot()
+
+    def op_reconfigure(self, request):
+        """Change les slaves de la sortie combinée active sans interrompre la lecture"""
+        zone = self.core.get_zone(_zone(request), create=False)
+        if not zone.combined_sink_active:
+            raise ValueError("Aucune sortie combinée active.")
+        names = [self.core.resolve_sink(name) for name in request["devices"]]
+        reconfigured = self.run(zone.reconfigure, names)
+        if reconfigured:
+            zone.wanted_slaves = list(names)
+        self.on_change()
+        if not reconfigured:
+            raise ValueError("Impossible de reconfigurer la sortie combinée.")
+        return self.core.status()
+
+    def op_streams(self, request):
+        """Flux de lecture (depuis l'index, sans relire la table) ; "sink" pour filtrer"""
+        return self.run(self._streams, request.get("sink"))
+
+    def _streams(self, sink_name):
+        self.core.streams.ensure_loaded()
+        if sink_name is not None:
+            streams = self.core.streams_on(sink_name)
+        else:
+            streams = self.core.streams.streams()
+        return [_stream_to_dict(stream, self.core.sinks.get_by_index(stream.sink)) for stream in streams]
+
+    def op_set_stream_volume(self, request):
+        """Volume d'un flux ("stream") ou des flux d'une application ("application")"""
+        volume = int(request["volume"])
+        if not 0 <= volume <= 150:
+            raise ValueError(f"Volume hors limites: {volume}")
+        if "stream" in request:
+            return self.run(self._set_stream_volumes, [int(request["stream"])], volume)
+        return self.run(self._set_stream_volumes, None, volume, request["application"])
+
+    def _set_stream_volumes(self, indexes, volume, application=None):
+        if indexes is None:
+            self.core.streams.ensure_loaded()
+            indexes = [stream.index for stream in self.core.streams.by_application(application)]
+        for index in indexes:
+            self.core.set_stream_volume(index, volume)
+        return indexes
+
+    def op_routes(self, request):
+        """Règles de routage ; "rules" les remplace, "apply" les applique aux flux en cours"""
+        if "rules" in request:
+            self.core.routing_rules = [RoutingRule.from_dict(rule) for rule in request["rules"]]
+            self.core.save_routing_rules()
+        result = {"rules": [rule.to_dict() for rule in self.core.routing_rules]}
+        if request.get("apply"):
+            result["moved"] = self.run(self.core.route_streams)
+        return result
+
+    def op_record(self, request):
+        """Enregistrement de la sortie combinée : "action" start, stop ou status (par défaut)"""
+        zone = self.core.get_zone(_zone(request), create=False)
+        action = request.get("action", "status")
+        if action == "start":
+            segment_mb = request.get("segment_mb")
+            stats = self.run(functools.partial(
+                zone.start_recording, request.get("directory") or default_recording_dir(),
+                file_format=request.get("format", "wav"),
+                segment_seconds=request.get("segment_seconds", 3600),
+                segment_bytes=int(segment_mb * 1024 * 1024) if segment_mb else None))
+            self.on_change()
+            return stats
+        if action == "stop":
+            stats = self.run(zone.stop_recording)
+            self.on_change()
+            return stats
+        if action == "status":
+            return zone.recorder.stats() if zone.recorder else None
+        raise ValueError(f"Action d'enregistrement inconnue: {action}")
+
+    def op_load_preset(self, request):
+        loaded = self.run(functools.partial(self.core.load_preset, request["preset"],
+                                            fade_ms=int(request.get("fade", 0)), zone=_zone(request)))
+        self.on_change()
+        return loaded
+
+    def op_batch(self, request):
+        """Exécute une liste de requêtes et retourne la liste de leurs réponses"""
+        return [self.handle(sub_request) for sub_request in request["ops"]]
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        protocol = self.server.protocol
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = protocol.handle_line(line.decode("utf-8"))
+            try:
+                self.wfile.write(response.encode("utf-8") + b"\n")
+            except OSError:
+                return
+
+
+class _ControlSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ControlServer:
+    """Serveur de contrôle local (un thread par client)"""
+
+    def __init__(self, core, path=None, run=None, on_change=None):
+        self.path = path or default_socket_path()
+        self.protocol = ControlProtocol(core, run, on_change)
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """Ouvre la socket ; remplace une socket orpheline d'une instance arrêtée"""
+        if os.path.exists(self.path):
+            if _socket_alive(self.path):
+                raise OSError(f"Une instance écoute déjà sur {self.path}")
+            os.unlink(self.path)
+        old_umask = os.umask(0o177)
+        try:
+            self.server = _ControlSocketServer(self.path, _ControlHandler)
+        finally:
+            os.umask(old_umask)
+        self.server.protocol = self.protocol
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def _socket_alive(path):
+    """Vrai si un serveur répond sur la socket"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        client.close()
+
+
+def send_requests(requests, path=None):
+    """Envoie des requêtes en pipeline à l'instance en cours et retourne les réponses"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path or default_socket_path())
+    with client:
+        payload = "".join(json.dumps(request) + "\n" for request in requests)
+        client.sendall(payload.encode("utf-8"))
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile("r", encoding="utf-8") as reader:
+            return [json.loads(line) for line in reader if line.strip()]
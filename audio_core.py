@@ -0,0 +1,750 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cœur d'Audio Combinator, sans dépendance graphique
+Gestion de la sortie combinée, des volumes et des préréglages
+Utilisé par l'interface GTK, la ligne de commande et le mode démon
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from audio_backend import (BackendError, MixerSnapshot, SinkInventory, SinkState, create_backend,
+                           diff_sink_states)
+from audio_journal import StateJournal, default_state_dir
+from audio_latency import measure_latencies
+from audio_metrics import BackendMetrics, InstrumentedBackend, MetricsExporter
+from audio_streams import RoutingRule, StreamIndex, match_rule, stream_selection
+from audio_workers import FadeEngine, VolumeWriteScheduler
+from audio_zones import DEFAULT_ZONE, Zone, _no_progress, module_sink_name
+
+DEFAULT_CONFIG_DIR = os.path.expanduser("~/.config/audio-combinator")
+
+# Durée des fondus de sourdine, pour éviter les clics
+MUTE_FADE_MS = 150
+
+
+def default_presets():
+    """Préréglages proposés au premier lancement"""
+    return {
+        "Gaming Pro": {
+            "description": "Casque principal + Haut-parleurs + Casque streaming",
+            "devices": [
+                {"name": "", "volume": 70, "muted": False},
+                {"name": "", "volume": 30, "muted": False},
+                {"name": "", "volume": 45, "muted": False}
+            ],
+            "main_volume": 65,
+            "set_as_default": True,
+            "created": datetime.now().isoformat()
+        },
+        "Bureau Collaboratif": {
+            "description": "Deux casques + Haut-parleurs en sourdine",
+            "devices": [
+                {"name": "", "volume": 60, "muted": False},
+                {"name": "", "volume": 55, "muted": False},
+                {"name": "", "volume": 40, "muted": True}
+            ],
+            "main_volume": 50,
+            "set_as_default": False,
+            "created": datetime.now().isoformat()
+        },
+        "Home Studio": {
+            "description": "Monitors + Casque contrôle + Sortie enregistrement",
+            "devices": [
+                {"name": "", "volume": 65, "muted": False},
+                {"name": "", "volume": 50, "muted": False},
+                {"name": "", "volume": 80, "muted": False}
+            ],
+            "main_volume": 70,
+            "set_as_default": True,
+            "created": datetime.now().isoformat()
+        }
+    }
+
+
+def print_log(message, tag=None):
+    """Journal par défaut : sortie standard (erreurs sur la sortie d'erreur)"""
+    print(message, file=sys.stderr if tag == "error" else sys.stdout, flush=True)
+
+
+def _zone_attribute(name):
+    """Attribut du cœur désignant celui de la zone par défaut"""
+    return property(lambda self: getattr(self.zone, name),
+                    lambda self, value: setattr(self.zone, name, value))
+
+
+class CombinerCore:
+    """Moteur de combinaison : zones (sorties combinées) et opérations sur le serveur
+
+    log(message, tag) reçoit les messages d'état ; tag vaut "info", "success",
+    "warning" ou "error". Les méthodes sont bloquantes : l'interface graphique
+    les appelle depuis son exécuteur de commandes. Les opérations sur une
+    sortie combinée prennent un paramètre zone (par défaut DEFAULT_ZONE) ;
+    combined_sink_active, combined_name, slaves... sont ceux de la zone par défaut.
+    """
+
+    combined_sink_active = _zone_attribute("combined_sink_active")
+    module_id = _zone_attribute("module_id")
+    combined_name = _zone_attribute("combined_name")
+    slaves = _zone_attribute("slaves")
+    wanted_slaves = _zone_attribute("wanted_slaves")
+    latency = _zone_attribute("latency")
+    latency_monitor = _zone_attribute("latency_monitor")
+
+    def __init__(self, backend=None, config_dir=DEFAULT_CONFIG_DIR, log=None, metrics=None, state_dir=None,
+                 connect=True):
+        self.log = log or print_log
+        self.backend = None  # Voir connect() ; connect=False laisse l'appelant ouvrir la connexion plus tard
+
+        # Statistiques des appels au serveur (désactivées par défaut : aucun surcoût)
+        if metrics is None and (os.environ.get("AUDIO_COMBINATOR_STATS") == "1"
+                                or os.environ.get("AUDIO_COMBINATOR_METRICS_FILE")):
+            metrics = BackendMetrics()
+        self.metrics = metrics
+        self.metrics_exporter = None
+        if metrics is not None:
+            metrics_file = os.environ.get("AUDIO_COMBINATOR_METRICS_FILE")
+            if metrics_file:
+                self.metrics_exporter = MetricsExporter(
+                    metrics, metrics_file, os.environ.get("AUDIO_COMBINATOR_METRICS_FORMAT", "prometheus"))
+        self.sinks = SinkInventory()  # Table des sinks partagée par toute l'application
+        self.volume_writer = VolumeWriteScheduler(None, on_error=self.on_volume_write_error)
+        self.fades = FadeEngine(self.volume_writer, on_error=self.on_volume_write_error)
+        self.streams = StreamIndex(None, on_update=self.on_streams_changed, on_error=self.on_streams_error)
+
+        # Sorties combinées, par zone ; modules chargés par cette instance (index -> sink)
+        self.zones = {}
+        self.zone = self.get_zone(DEFAULT_ZONE)
+        self.owned_modules = {}
+        self.journal = StateJournal(state_dir or default_state_dir(config_dir))
+
+        # Branchements à chaud
+        self.hotplug = True           # Reconfigurer la combinaison quand un slave va et vient
+        self.hotplug_add_new = False  # Ajouter aussi les périphériques nouvellement branchés (zone par défaut)
+
+        # Latences des sorties combinées
+        self.resample_method = None  # Méthode de rééchantillonnage imposée au module
+        self.on_latency = None       # on_latency(report) pour la zone par défaut, depuis un autre thread
+
+        # Configuration des préréglages
+        self.config_dir = config_dir
+        self.presets_file = os.path.join(self.config_dir, "presets.json")
+        self.presets = {}
+        self.routing_file = os.path.join(self.config_dir, "routing.json")
+        self.routing_rules = []
+
+        if backend is not None or connect:
+            self.connect(backend)
+
+    def connect(self, backend=None):
+        """Ouvre la connexion au serveur sonore (backend donné ou choisi par l'environnement)
+
+        L'interface graphique l'appelle depuis son exécuteur pour que la
+        fenêtre s'affiche sans attendre le serveur.
+        """
+        backend = backend or create_backend(os.environ.get("AUDIO_COMBINATOR_BACKEND", "auto"))
+        if self.metrics is not None:
+            backend = InstrumentedBackend(backend, self.metrics)
+        self.backend = backend
+        self.volume_writer.backend = backend
+        self.streams.backend = backend
+
+    # Préréglages
+
+    def load_presets(self):
+        """Charge les préréglages depuis le fichier"""
+        try:
+            # Créer le répertoire de configuration s'il n'existe pas
+            os.makedirs(self.config_dir, exist_ok=True)
+
+            if os.path.exists(self.presets_file):
+                with open(self.presets_file, 'r', encoding='utf-8') as f:
+                    self.presets = json.load(f)
+            else:
+                # Créer quelques préréglages par défaut
+                self.presets = default_presets()
+                self.save_presets()
+        except Exception as e:
+            self.presets = {}
+            self.log(f"Erreur lors du chargement des préréglages: {e}", "error")
+        return self.presets
+
+    def save_presets(self):
+        """Sauvegarde les préréglages dans le fichier"""
+        try:
+            with open(self.presets_file, 'w', encoding='utf-8') as f:
+                json.dump(self.presets, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            self.log(f"Erreur lors de la sauvegarde des préréglages: {e}", "error")
+
+    def load_routing_rules(self):
+        """Charge les règles de routage des applications"""
+        try:
+            if os.path.exists(self.routing_file):
+                with open(self.routing_file, 'r', encoding='utf-8') as f:
+                    self.routing_rules = [RoutingRule.from_dict(rule) for rule in json.load(f)]
+        except Exception as e:
+            self.routing_rules = []
+            self.log(f"Erreur lors du chargement des règles de routage: {e}", "error")
+        return self.routing_rules
+
+    def save_routing_rules(self):
+        """Sauvegarde les règles de routage dans le fichier"""
+        try:
+            os.makedirs(self.config_dir, exist_ok=True)
+            with open(self.routing_file, 'w', encoding='utf-8') as f:
+                json.dump([rule.to_dict() for rule in self.routing_rules], f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            self.log(f"Erreur lors de la sauvegarde des règles de routage: {e}", "error")
+
+    def plan_from_preset(self, preset_name):
+        """Construit un plan de démarrage à partir d'un préréglage enregistré"""
+        if preset_name not in self.presets:
+            raise KeyError(f"Préréglage '{preset_name}' non trouvé.")
+        config = self.presets[preset_name]
+        names = [device.get("name", "") for device in config.get("devices", [])]
+        if not all(names):
+            raise ValueError(f"Le préréglage '{preset_name}' ne désigne pas tous ses périphériques.")
+        plan = self.make_plan(names, [device.get("volume", 50) for device in config["devices"]],
+                              config.get("main_volume", 50), config.get("set_as_default", True))
+        plan["mutes"] = [device.get("muted", False) for device in config["devices"]]
+        plan["move_streams"] = stream_selection(config.get("move_streams"))
+        return plan
+
+    # Inventaire
+
+    def refresh(self):
+        """Relit la table des sinks depuis le serveur"""
+        return self.sinks.refresh(self.backend)
+
+    def describe(self, sink_name):
+        sink = self.sinks.get(sink_name)
+        return sink.description if sink else sink_name
+
+    def make_plan(self, device_names, volumes=None, main_volume=50, set_as_default=True):
+        """Plan de démarrage : périphériques, volumes et options"""
+        if not self.sinks.sinks:
+            self.refresh()
+        devices = []
+        for name in device_names:
+            if name not in self.sinks:
+                raise ValueError(f"Périphérique inconnu: {name}")
+            if name not in [device['name'] for device in devices]:
+                devices.append({'name': name, 'description': self.describe(name)})
+        volumes = list(volumes) if volumes is not None else [50] * len(devices)
+        return {
+            "devices": devices,
+            "volumes": volumes[:len(devices)],
+            "main_volume": main_volume,
+            "set_as_default": set_as_default,
+        }
+
+    # Opérations sur le serveur
+
+    def run_backend(self, operation, *args):
+        """Exécute une opération du backend sonore et retourne son résultat"""
+        try:
+            return getattr(self.backend, operation)(*args)
+        except BackendError as e:
+            self.log(f"Erreur: {e}", "error")
+            return None
+
+    def set_volume(self, sink_name, volume_percent):
+        """Définit le volume d'un sink (écriture regroupée en arrière-plan)"""
+        self.fades.cancel(("sink", sink_name))
+        self.volume_writer.set_sink_volume(sink_name, volume_percent)
+        sink = self.sinks.get(sink_name)
+        if sink:
+            sink.volume = int(volume_percent)
+
+    def set_mute(self, sink_name, muted):
+        """Définit l'état de sourdine d'un sink"""
+        self.run_backend("set_sink_mute", sink_name, muted)
+        sink = self.sinks.get(sink_name)
+        if sink:
+            sink.muted = muted
+
+    def fade(self, sink_name, volume_percent, duration_ms, curve="linear"):
+        """Amène progressivement un sink au volume demandé (sans bloquer)"""
+        name = self.resolve_sink(sink_name)
+        sink = self.sinks.get(name)
+        start = sink.volume if sink else volume_percent
+        self.fades.fade(("sink", name), start, volume_percent, duration_ms, curve)
+        if sink:
+            sink.volume = int(volume_percent)
+
+    def fade_mute(self, sink_name, muted, duration_ms=MUTE_FADE_MS):
+        """Sourdine sans clic : fondu vers le silence avant de couper, et inversement"""
+        name = self.resolve_sink(sink_name)
+        sink = self.sinks.get(name)
+        if sink is None or duration_ms <= 0:
+            self.set_mute(name, muted)
+            return
+        target = ("sink", name)
+        volume = sink.volume
+
+        if muted:
+            def _mute(target):
+                self.run_backend("set_sink_mute", name, True)
+                # Rétablir le volume réglé, inaudible tant que la sourdine est active
+                self.volume_writer.submit(target, volume)
+            self.fades.fade(target, volume, 0, duration_ms, "cubic", on_done=_mute)
+        else:
+            def _unmute():
+                self.volume_writer.discard(target)
+                self.run_backend("set_sink_volume", name, 0)
+                self.run_backend("set_sink_mute", name, False)
+            self.fades.fade(target, 0, volume, duration_ms, "cubic", before=_unmute)
+        sink.muted = muted
+
+    def on_volume_write_error(self, target, error):
+        """Erreur d'écriture de volume ou d'un fondu (depuis le thread d'écriture ou des fondus)"""
+        self.log(f"Erreur: {error}", "error")
+
+    def apply_sink_states(self, targets):
+        """Applique les volumes et sourdines cibles qui diffèrent de l'état connu, en un lot"""
+        changes = diff_sink_states(self.sinks, targets)
+        if not changes:
+            return changes
+
+        # Les écritures encore en attente seraient périmées par le lot
+        for state in changes:
+            self.volume_writer.discard(("sink", state.name))
+        self.backend.apply_sink_states(changes)
+        for state in changes:
+            sink = self.sinks.get(state.name)
+            if sink:
+                if state.volume is not None:
+                    sink.volume = state.volume
+                if state.muted is not None:
+                    sink.muted = state.muted
+        return changes
+
+    # Instantané du mélangeur
+
+    def take_snapshot(self):
+        """Relève volumes, sourdines, sortie par défaut et flux avant une session"""
+        try:
+            # Table des sinks et index des flux sont tenus à jour par les événements
+            if not self.sinks.sinks:
+                self.refresh()
+            self.streams.ensure_loaded()
+            default_sink = self.backend.get_default_sink()
+        except BackendError as e:
+            self.log(f"Instantané du mélangeur impossible: {e}", "warning")
+            return None
+        return MixerSnapshot.capture(self.sinks, self.streams.streams(), default_sink)
+
+    def restore_snapshot(self, snapshot, combined_name, sink_names, moved_streams=None):
+        """Défait ce qu'une zone a changé au mélangeur depuis son instantané
+
+        À appeler avant de décharger la sortie combinée combined_name. Seuls
+        les flux encore sur cette sortie retournent à leur sink d'origine (un
+        lot par sink) ; la sortie par défaut n'est rétablie que si c'est
+        toujours elle ; seuls les volumes des sinks de la zone (sink_names)
+        sont remis, en un lot de différences. moved_streams complète les
+        origines de l'instantané. Retourne le nombre de changements envoyés.
+        """
+        origins = dict(snapshot.streams) if snapshot else {}
+        origins.update(moved_streams or {})
+        count = 0
+        # Chaque étape est indépendante : un échec n'empêche pas les suivantes
+        try:
+            if not self.sinks.sinks:
+                self.refresh()
+            combined = self.sinks.get(combined_name)
+            if origins and combined is None:
+                self.refresh()
+                combined = self.sinks.get(combined_name)
+            if origins and combined is not None:
+                # Relecture : un flux oublié tomberait sur une sortie de secours
+                self.streams.refresh()
+                count += self._return_streams(self.streams.on_sink(combined.index), origins)
+        except BackendError as e:
+            self.log(f"Erreur lors du retour des flux: {e}", "error")
+
+        if snapshot is not None:
+            default_sink = snapshot.default_sink
+            try:
+                if default_sink in self.sinks and default_sink != combined_name and \
+                        self.backend.get_default_sink() == combined_name:
+                    self.backend.set_default_sink(default_sink)
+                    count += 1
+            except BackendError as e:
+                self.log(f"Erreur lors du rétablissement de la sortie par défaut: {e}", "error")
+            try:
+                count += len(self.apply_sink_states([state for name, state in snapshot.sinks.items()
+                                                     if name in sink_names and name in self.sinks]))
+            except BackendError as e:
+                self.log(f"Erreur lors du rétablissement des volumes: {e}", "error")
+
+        if count:
+            self.log(f"État du mélangeur rétabli ({count} changement(s)).", "info")
+        return count
+
+    def _return_streams(self, streams, origins):
+        """Renvoie les flux vers leur sink d'origine (origins : index -> (sink, application))
+
+        Un flux dont l'index a été repris par une autre application, ou dont
+        le sink d'origine a disparu, reste où il est.
+        """
+        moves = {}
+        for stream in streams:
+            sink_name, application = origins.get(stream.index, (None, None))
+            target = self.sinks.get(sink_name) if sink_name else None
+            if target is not None and target.index != stream.sink and stream.application == application:
+                moves.setdefault(sink_name, []).append(stream.index)
+        count = 0
+        for sink_name, indexes in moves.items():
+            try:
+                self.backend.move_sink_inputs(indexes, sink_name)
+            except BackendError as e:
+                self.log(f"Erreur: {e}", "error")
+                continue
+            sink_index = self.sinks.get(sink_name).index
+            for index in indexes:
+                self.streams.update(index, sink=sink_index)
+            count += len(indexes)
+        return count
+
+    def get_zone(self, name=DEFAULT_ZONE, create=True):
+        """Zone nommée, créée au besoin"""
+        zone = self.zones.get(name)
+        if zone is None:
+            if not create:
+                raise ValueError(f"Zone inconnue: {name}")
+            zone = self.zones[name] = Zone(self, name)
+        return zone
+
+    def active_zones(self):
+        return [zone for zone in self.zones.values() if zone.combined_sink_active]
+
+    def create_combined_sink(self, plan, progress=_no_progress, zone=DEFAULT_ZONE):
+        """Crée une sortie audio combinée"""
+        return self.get_zone(zone).create(plan, progress)
+
+    def reconfigure(self, slave_names, progress=_no_progress, zone=DEFAULT_ZONE):
+        """Remplace les slaves d'une sortie combinée en gardant son nom (voir Zone.reconfigure)"""
+        return self.get_zone(zone, create=False).reconfigure(slave_names, progress)
+
+    def hotplug_slaves(self):
+        """Slaves à combiner par zone d'après les sinks présents : {zone: slaves}
+
+        À appeler après une mise à jour de la table des sinks ; seules les
+        zones dont les slaves changent figurent dans le résultat.
+        """
+        if not self.hotplug:
+            return {}
+        changes = {}
+        for zone in self.active_zones():
+            names = zone.hotplug_slaves(self.hotplug_add_new and zone.is_default)
+            if names:
+                changes[zone.name] = names
+        return changes
+
+    def remove_combined_sink(self, zone=DEFAULT_ZONE):
+        """Supprime la sortie audio combinée"""
+        return self.get_zone(zone).remove()
+
+    # Journal de reprise
+
+    def save_state(self):
+        """Note les zones actives et les modules chargés (supprime le journal s'il n'y a rien)"""
+        zones = {zone.name: zone.to_state() for zone in self.active_zones()}
+        try:
+            if zones or self.owned_modules:
+                self.journal.write({"zones": zones, "modules": dict(self.owned_modules),
+                                    "updated": time.time()})
+            else:
+                self.journal.clear()
+        except OSError as e:
+            self.log(f"Écriture du journal de reprise impossible: {e}", "warning")
+
+    def recover(self, adopt=True):
+        """Reprend ou nettoie ce que des instances arrêtées brutalement ont laissé
+
+        Une zone dont le module est toujours chargé (avec le même nom de sink)
+        est reprise telle quelle si adopt est vrai et que la zone est libre ;
+        les autres modules notés dans les journaux orphelins sont déchargés et
+        le mélangeur est rétabli tel que ces zones l'avaient trouvé. Rien
+        d'autre n'est touché. Retourne les noms des zones reprises.
+        """
+        orphans = self.journal.orphans()
+        if not orphans:
+            return []
+        started = time.perf_counter()
+        modules = {str(module.index): module for module in self.backend.list_modules()}
+
+        def loaded(module_id, sink_name):
+            # Vérifier le nom : les index repartent de zéro si le serveur a redémarré
+            module = modules.get(str(module_id))
+            return module is not None and module_sink_name(module.argument) == sink_name
+
+        adopted = []
+        for path, state in orphans:
+            recorded = dict(state.get("modules", {}))
+            for name, zone_state in state.get("zones", {}).items():
+                module_id = str(zone_state.get("module_id"))
+                zone = self.get_zone(name) if loaded(module_id, zone_state.get("combined_name")) else None
+                if adopt and zone is not None and not zone.combined_sink_active:
+                    if not self.sinks.sinks:
+                        self.refresh()
+                    zone.adopt(zone_state)
+                    adopted.append(name)
+                    recorded.pop(module_id, None)
+                elif zone_state.get("snapshot") or zone_state.get("moved_streams"):
+                    # Avant le déchargement du module, comme un arrêt normal
+                    snapshot = zone_state.get("snapshot")
+                    self.restore_snapshot(MixerSnapshot.from_dict(snapshot) if snapshot else None,
+                                          zone_state.get("combined_name"),
+                                          set(zone_state.get("slaves", [])) |
+                                          set(zone_state.get("wanted_slaves", [])),
+                                          {int(index): tuple(entry) for index, entry
+                                           in zone_state.get("moved_streams", {}).items()})
+            for module_id, sink_name in recorded.items():
+                if loaded(module_id, sink_name):
+                    self.log(f"Nettoyage d'une sortie combinée abandonnée: {sink_name}", "info")
+                    self.run_backend("unload_module", module_id)
+            self.journal.discard(path)
+        self.save_state()
+        elapsed = (time.perf_counter() - started) * 1000
+        self.log(f"Journal de reprise traité en {elapsed:.1f} ms "
+                 f"({len(adopted)} zone(s) reprise(s)).", "info")
+        return adopted
+
+    # Latences
+
+    def measure_latency(self, names=None, zone=DEFAULT_ZONE):
+        """Mesure les latences des sinks nommés (par défaut, les sorties combinées de la zone)"""
+        names = self.get_zone(zone).slaves if names is None else names
+        sinks = self.run_backend("list_sinks")
+        if sinks is None:
+            sinks = list(self.sinks)
+        else:
+            self.sinks.load(sinks)
+        return measure_latencies(sinks, names)
+
+    def start(self, plan, progress=_no_progress, zone=DEFAULT_ZONE):
+        """Remplace la sortie combinée de la zone par une nouvelle"""
+        # D'abord supprimer la sortie combinée existante (celle de cette instance seulement)
+        if self.get_zone(zone).combined_sink_active:
+            self.remove_combined_sink(zone)
+
+        # Puis créer la nouvelle sortie combinée
+        if not self.create_combined_sink(plan, progress, zone):
+            return False
+        if self.routing_rules:
+            self.route_streams()
+        return True
+
+    def stop(self, zone=DEFAULT_ZONE):
+        """Arrête la combinaison d'une zone"""
+        return self.remove_combined_sink(zone)
+
+    def start_recording(self, directory, zone=DEFAULT_ZONE, **options):
+        """Enregistre la sortie combinée d'une zone (voir Zone.start_recording)"""
+        return self.get_zone(zone, create=False).start_recording(directory, **options)
+
+    def stop_recording(self, zone=DEFAULT_ZONE):
+        return self.get_zone(zone, create=False).stop_recording()
+
+    # Flux de lecture
+
+    def streams_on(self, sink_name):
+        """Flux qui jouent sur un sink, d'après l'index des flux"""
+        sink = self.sinks.get(self.resolve_sink(sink_name))
+        if sink is None:
+            return []
+        self.streams.ensure_loaded()
+        return self.streams.on_sink(sink.index)
+
+    def select_streams(self, applications=None, sinks=None):
+        """Flux d'applications en cours, choisis par application et/ou par sink actuel
+
+        applications : motifs comme ceux des règles de routage ; sinks : noms
+        techniques. Un filtre vide ne restreint rien. Les flux créés par des
+        modules (entrées des sorties combinées) ne sont jamais retenus.
+        """
+        self.streams.ensure_loaded()
+        rules = [RoutingRule(pattern, "") for pattern in applications or []]
+        sink_indexes = {self.sinks.get(name).index for name in sinks or [] if name in self.sinks}
+        return [stream for stream in self.streams.streams()
+                if not stream.internal
+                and (not rules or match_rule(rules, stream) is not None)
+                and (not sinks or stream.sink in sink_indexes)]
+
+    def route_streams(self, sink_inputs=None):
+        """Applique les règles de routage aux flux donnés (par défaut, à tous)
+
+        Les flux allant vers une même sortie sont déplacés en un lot ; une
+        règle visant une zone inactive ou un sink absent est ignorée.
+        Retourne le nombre de flux déplacés.
+        """
+        if sink_inputs is None:
+            self.streams.ensure_loaded()
+            sink_inputs = self.streams.streams()
+        moves = {}
+        for sink_input in sink_inputs:
+            rule = match_rule(self.routing_rules, sink_input)
+            if rule is None:
+                continue
+            try:
+                target = self.sinks.get(self.resolve_sink(rule.target))
+            except ValueError:
+                continue
+            if target is None:
+                continue
+            if sink_input.sink != target.index:
+                moves.setdefault(target.name, []).append(sink_input.index)
+            if rule.volume is not None and sink_input.volume != rule.volume:
+                self.set_stream_volume(sink_input.index, rule.volume)
+        moved = 0
+        for target_name, indexes in moves.items():
+            target = self.sinks.get(target_name)
+            try:
+                self.backend.move_sink_inputs(indexes, target_name)
+            except BackendError as e:
+                # Un flux a pu disparaître entre-temps ; la prochaine relecture corrigera l'index
+                self.log(f"Erreur: {e}", "error")
+                continue
+            for index in indexes:
+                self.streams.update(index, sink=target.index)
+            moved += len(indexes)
+            self.log(f"{len(indexes)} flux routé(s) vers {target.description}.", "info")
+        return moved
+
+    def on_streams_changed(self, added, removed):
+        """Relecture de l'index des flux (depuis son thread) : router les nouveaux flux"""
+        if added and self.routing_rules:
+            self.route_streams(added)
+
+    def on_streams_error(self, error):
+        """Erreur du routage des nouveaux flux (depuis le thread de l'index)"""
+        self.log(f"Erreur lors du routage des flux: {error}", "error")
+
+    def set_stream_volume(self, sink_input_id, volume_percent):
+        """Volume d'un flux (écriture regroupée en arrière-plan)"""
+        self.volume_writer.set_sink_input_volume(sink_input_id, volume_percent)
+        self.streams.update(sink_input_id, volume=int(volume_percent))
+
+    def set_stream_mute(self, sink_input_id, muted):
+        self.run_backend("set_sink_input_mute", sink_input_id, muted)
+        self.streams.update(sink_input_id, muted=muted)
+
+    def load_preset(self, preset_name, progress=_no_progress, fade_ms=0, zone=DEFAULT_ZONE):
+        """Applique un préréglage
+
+        Si les mêmes périphériques sont déjà combinés, seuls les volumes et
+        sourdines sont envoyés (en un lot, ou en fondus si fade_ms > 0) ;
+        sinon la combinaison est redémarrée.
+        """
+        plan = self.plan_from_preset(preset_name)
+        names = [device['name'] for device in plan["devices"]]
+        target_zone = self.get_zone(zone)
+        if target_zone.combined_sink_active and names == target_zone.slaves:
+            targets = [SinkState(name, volume, muted) for name, volume, muted
+                       in zip(names, plan["volumes"], plan["mutes"])]
+            targets.append(SinkState(target_zone.combined_name, plan["main_volume"]))
+            if fade_ms > 0:
+                for change in diff_sink_states(self.sinks, targets):
+                    if change.volume is not None:
+                        self.fade(change.name, change.volume, fade_ms, "cubic")
+                    if change.muted is not None:
+                        self.fade_mute(change.name, change.muted, fade_ms)
+            else:
+                self.apply_sink_states(targets)
+            return True
+        return self.start(plan, progress, zone)
+
+    def resolve_sink(self, sink_name):
+        """Nom technique d'un sink
+
+        "combined" désigne la sortie combinée active de la zone par défaut,
+        "combined:<zone>" celle d'une autre zone.
+        """
+        if sink_name == "combined" or sink_name.startswith("combined:"):
+            zone = self.zones.get(sink_name.partition(":")[2] or DEFAULT_ZONE)
+            if zone is None or not zone.combined_sink_active:
+                raise ValueError("Aucune sortie combinée active.")
+            return zone.combined_name
+        return sink_name
+
+    def status(self):
+        """État courant de la combinaison (zone par défaut) et de toutes les zones"""
+        status = self.zone.status()
+        status["backend"] = self.backend.name
+        status["zones"] = {name: zone.status() for name, zone in self.zones.items()}
+        return status
+
+    # Événements du serveur
+
+    def subscribe(self, callback):
+        """S'abonne aux événements du serveur ; callback(event) depuis un autre thread"""
+        return self.backend.subscribe(callback)
+
+    def handle_event(self, event):
+        """Applique un événement à l'état du cœur
+
+        Retourne True si l'événement demande de relire la liste des sinks.
+        """
+        if event.facility == "module" and event.kind == "remove":
+            for zone in self.active_zones():
+                if zone.module_id == str(event.index):
+                    zone.on_combined_module_lost()
+        elif event.facility == "sink":
+            if event.kind == "remove":
+                self.sinks.remove(event.index)
+            else:
+                return True
+        elif event.facility == "sink-input":
+            if event.kind == "remove" and event.index is not None:
+                self.streams.remove(event.index)
+            elif self.streams.loaded:
+                self.streams.invalidate()
+        elif event.kind == "resync":
+            if self.streams.loaded:
+                self.streams.invalidate()
+            return True
+        return False
+
+    def check_combined_module(self, modules):
+        """Vérifie que les modules des zones figurent toujours dans la liste des modules"""
+        return all([zone.check_module(modules) for zone in self.active_zones()])
+
+    def close(self):
+        """Envoie les derniers volumes et ferme la connexion, sans toucher à la combinaison"""
+        self.fades.wait(timeout=5.0)
+        self.fades.stop()
+        self.streams.stop()
+        for zone in self.zones.values():
+            if zone.latency_monitor:
+                zone.latency_monitor.stop()
+            zone.stop_recording()
+        self.volume_writer.stop()
+        self.stop_metrics_export()
+        if self.backend:
+            self.backend.close()
+
+    def shutdown(self):
+        """Envoie les derniers volumes, arrête la combinaison et ferme la connexion"""
+        self.fades.stop()
+        self.streams.stop()
+        self.volume_writer.stop()
+        for zone in self.active_zones():
+            zone.remove()
+        self.save_state()
+        self.stop_metrics_export()
+        if self.backend:
+            self.backend.close()
+
+    def stop_metrics_export(self):
+        if self.metrics_exporter:
+            try:
+                self.metrics_exporter.stop()
+            except OSError as e:
+                self.log(f"Export des statistiques impossible: {e}", "warning")
+            self.metrics_exporter = None
@@ -0,0 +1,1544 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Audio Combiner GUI - Application pour combiner plusieurs sorties audio
+Compatible avec PulseAudio et PipeWire
+Support pour 2+ périphériques de sortie avec contrôle de volume individuel
+Avec préréglages sauvegardables (profils audio)
+Fenêtre GTK, cliente du cœur (audio_core)
+"""
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, GLib, Gdk, Pango
+import os
+import sys
+import signal
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from audio_backend import BackendError, SinkState
+from audio_control import ControlServer
+from audio_core import CombinerCore
+from audio_log import DEFAULT_CAPACITY, StatusLog
+from audio_meters import MeterBank, meter_fraction
+from audio_recorder import default_recording_dir
+from audio_workers import CommandExecutor
+from audio_zones import DEFAULT_ZONE
+
+# Cadence d'affichage des messages d'état (ms)
+STATUS_FRAME_MS = 100
+
+# Cadence de dessin des indicateurs de niveau (ms), indépendante de l'audio
+METER_FRAME_MS = 33
+METER_BACKGROUND = (0.85, 0.85, 0.85)
+METER_RMS_COLOR = (0.2, 0.7, 0.3)
+METER_PEAK_COLOR = (0.1, 0.4, 0.15)
+METER_CLIP_COLOR = (0.8, 0.1, 0.1)
+
+
+class DeviceRegistry:
+    """Index des périphériques de la liste partagée et de leur sélection
+
+    Associe chaque nom technique à sa ligne du modèle GTK et garde le nom
+    sélectionné dans chaque combobox. La liste des périphériques
+    sélectionnés est mise en cache jusqu'au prochain changement de
+    sélection ou de la liste : les gestionnaires des curseurs et boutons
+    n'ont plus à parcourir les modèles à chaque appel.
+    """
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self.store = Gtk.ListStore(str, str, str)  # id, description, nom technique
+        self.loaded = False
+        self.selection = []  # Nom sélectionné par combobox (None si aucun)
+        self._rows = {}
+        self._selected = None
+
+    def load(self, sinks):
+        """Reconstruit le modèle (nouveau ListStore) à partir des sinks"""
+        self.store = Gtk.ListStore(str, str, str)
+        self._rows = {}
+        for sink in sinks:
+            self.add(sink)
+        self.loaded = True
+        self.invalidate()
+
+    def add(self, sink):
+        tree_iter = self.store.append([str(sink.index), sink.description, sink.name])
+        self._rows[sink.name] = Gtk.TreeRowReference.new(self.store, self.store.get_path(tree_iter))
+        self.invalidate()
+
+    def update(self, sink):
+        tree_iter = self.get_iter(sink.name)
+        if tree_iter is not None:
+            self.store.set(tree_iter, [0, 1], [str(sink.index), sink.description])
+            self.invalidate()
+
+    def remove(self, sink_name):
+        """Retire un périphérique et retourne sa description, ou None"""
+        tree_iter = self.get_iter(sink_name)
+        self._rows.pop(sink_name, None)
+        if tree_iter is None:
+            return None
+        description = self.store[tree_iter][1]
+        self.store.remove(tree_iter)
+        self.invalidate()
+        return description
+
+    def get_iter(self, sink_name):
+        reference = self._rows.get(sink_name)
+        if reference is None or not reference.valid():
+            return None
+        return self.store.get_iter(reference.get_path())
+
+    def position(self, sink_name):
+        """Position du périphérique dans le modèle, ou -1"""
+        reference = self._rows.get(sink_name)
+        if reference is None or not reference.valid():
+            return -1
+        return reference.get_path().get_indices()[0]
+
+    def first_unselected(self):
+        """Position du premier périphérique qu'aucune combobox n'a sélectionné"""
+        used = set(self.selection)
+        for position, row in enumerate(self.store):
+            if row[2] not in used:
+                return position
+        return 0 if len(self.store) else -1
+
+    def __contains__(self, sink_name):
+        return sink_name in self._rows
+
+    def __len__(self):
+        return len(self.store)
+
+    def set_selection(self, combo_index, sink_name):
+        if combo_index >= len(self.selection):
+            self.selection.extend([None] * (combo_index + 1 - len(self.selection)))
+        if self.selection[combo_index] != sink_name:
+            self.selection[combo_index] = sink_name
+            self.invalidate()
+
+    def truncate(self, count):
+        """Oublie la sélection des combobox retirées"""
+        del self.selection[count:]
+        self.invalidate()
+
+    def invalidate(self):
+        self._selected = None
+
+    def selected_devices(self):
+        """Périphériques sélectionnés, sans doublon, dans l'ordre des combobox"""
+        if self._selected is None:
+            devices = []
+            seen = set()
+            for sink_name in self.selection:
+                if sink_name and sink_name not in seen and sink_name in self._rows:
+                    seen.add(sink_name)
+                    sink = self.inventory.get(sink_name)
+                    description = sink.description if sink else self.store[self.get_iter(sink_name)][1]
+                    devices.append({'name': sink_name, 'description': description})
+            self._selected = devices
+        return self._selected
+
+
+class StartupTimer:
+    """Durées des phases du démarrage, mesurées depuis `origin` (perf_counter)
+
+    Les phases peuvent se chevaucher (la découverte tourne pendant le
+    premier affichage) ; seule la première exécution d'une phase compte.
+    """
+    
+    PHASES = ("import", "connexion", "interface", "premier affichage", "préréglages", "périphériques")
+    
+    def __init__(self, origin=None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.phases = {}  # phase -> [début, fin]
+        self.reported = False
+    
+    def begin(self, phase, at=None):
+        if phase not in self.phases:
+            self.phases[phase] = [at if at is not None else time.perf_counter(), None]
+    
+    def end(self, phase):
+        """Termine une phase ; retourne True quand toutes les phases sont terminées"""
+        times = self.phases.get(phase)
+        if times and times[1] is None:
+            times[1] = time.perf_counter()
+        # L'import n'est mesuré que si run_gui a reçu l'instant de départ
+        required = [name for name in self.PHASES if name != "import" or name in self.phases]
+        return all(name in self.phases and self.phases[name][1] is not None for name in required)
+    
+    def summary(self):
+        parts = [f"{phase} {(self.phases[phase][1] - self.phases[phase][0]) * 1000:.0f} ms"
+                 for phase in self.PHASES if phase in self.phases]
+        ready = max(end for _, end in self.phases.values()) - self.origin
+        return f"Démarrage en {ready * 1000:.0f} ms ({', '.join(parts)})"
+
+
+class AudioCombiner:
+    def __init__(self, core=None, startup=None):
+        # Phases du démarrage : la fenêtre s'affiche avant la découverte et les préréglages
+        self.startup = startup or StartupTimer()
+        
+        # Journal d'état borné, affiché par image dans la zone de statut
+        self.status_log = StatusLog(
+            int(os.environ.get("AUDIO_COMBINATOR_LOG_LINES", DEFAULT_CAPACITY)),
+            os.environ.get("AUDIO_COMBINATOR_LOG_FILE"))
+        
+        # Cœur de l'application (sortie combinée, volumes, préréglages) ;
+        # la connexion au serveur sonore se fait sur l'exécuteur, après la fenêtre
+        self.core = core or CombinerCore(log=self.append_status, connect=False)
+        self.startup.begin("interface")
+        self.core.on_latency = lambda report: GLib.idle_add(self.show_latency, report)
+        self.running = True
+        self.device_combos = []  # Liste pour stocker toutes les combobox
+        self.device_rows = []    # Liste pour stocker toutes les lignes de périphériques
+        self.volume_scales = []  # Liste pour stocker tous les contrôles de volume
+        self.mute_buttons = []   # Liste pour stocker tous les boutons de sourdine
+        self.volume_labels = []  # Liste pour stocker tous les labels de volume
+        self.meter_areas = []    # Indicateurs de niveau, un par ligne de périphérique
+        self.meters = MeterBank()
+        self.meters_visible = False  # Indicateurs arrêtés tant que la fenêtre est cachée
+        self.meter_source = None
+        self.meter_levels = {}   # Dernier niveau dessiné, par indicateur
+        self.meter_error_reported = False
+        self.executor = CommandExecutor(dispatch=self.run_in_main_loop)  # E/S hors du thread GTK
+        self.progress = self.executor.reporter(self.report_progress)
+        self.busy_operations = 0
+        self.volume_status_sources = {}  # Messages de volume différés, par périphérique
+        self.devices = DeviceRegistry(self.core.sinks)  # Modèle partagé et sélection des combobox
+        self.event_subscription = None
+        self.resync_source = None
+        
+        # Configurer le gestionnaire de signaux pour un arrêt propre
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+
+        # Créer la fenêtre principale
+        self.window = Gtk.Window(title="Audio Combinator Pro")
+        self.window.set_border_width(10)
+        self.window.set_default_size(700, 700)
+        self.window.connect("destroy", self.on_window_destroy)
+        for signal_name in ("map-event", "unmap-event", "window-state-event"):
+            self.window.connect(signal_name, self.on_window_visibility)
+        
+        # Ajouter un peu de style (CSS)
+        self.setup_css()
+        
+        # Créer le conteneur principal avec défilement
+        self.main_scrolled = Gtk.ScrolledWindow()
+        self.main_scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        self.window.add(self.main_scrolled)
+        
+        # Créer la grille principale
+        self.main_grid = Gtk.Grid()
+        self.main_grid.set_column_spacing(10)
+        self.main_grid.set_row_spacing(10)
+        self.main_grid.set_margin_start(10)
+        self.main_grid.set_margin_end(10)
+        self.main_grid.set_margin_top(10)
+        self.main_grid.set_margin_bottom(10)
+        self.main_scrolled.add(self.main_grid)
+        
+        self.current_row = 0
+        
+        # Titre
+        title_label = Gtk.Label(label="Combinaison de sorties audio avec contrôle de volume")
+        title_label.set_hexpand(True)
+        title_label.get_style_context().add_class("title")
+        self.main_grid.attach(title_label, 0, self.current_row, 3, 1)
+        self.current_row += 1
+        
+        # Section des préréglages
+        self.create_presets_section()
+        
+        # Section pour les périphériques
+        devices_frame = Gtk.Frame(label="Périphériques de sortie")
+        devices_frame.set_hexpand(True)
+        self.main_grid.attach(devices_frame, 0, self.current_row, 3, 1)
+        self.current_row += 1
+        
+        # Conteneur pour les périphériques avec défilement
+        self.devices_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        self.devices_box.set_margin_start(10)
+        self.devices_box.set_margin_end(10)
+        self.devices_box.set_margin_top(10)
+        self.devices_box.set_margin_bottom(10)
+        devices_frame.add(self.devices_box)
+        
+        # Ajouter deux périphériques par défaut
+        self.add_device_row()
+        self.add_device_row()
+        
+        # Boutons pour gérer les périphériques
+        device_buttons_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=5)
+        device_buttons_box.set_halign(Gtk.Align.CENTER)
+        self.devices_box.pack_start(device_buttons_box, False, False, 5)
+        
+        self.add_device_button = Gtk.Button(label="+ Ajouter un périphérique")
+        self.add_device_button.connect("clicked", self.on_add_device_clicked)
+        device_buttons_box.pack_start(self.add_device_button, False, False, 0)
+        
+        self.remove_device_button = Gtk.Button(label="- Retirer le dernier")
+        self.remove_device_button.connect("clicked", self.on_remove_device_clicked)
+        device_buttons_box.pack_start(self.remove_device_button, False, False, 0)
+        
+        # Section de contrôle de volume principal
+        volume_frame = Gtk.Frame(label="Contrôle de volume général (actif seulement pendant la combinaison)")
+        volume_frame.set_hexpand(True)
+        self.main_grid.attach(volume_frame, 0, self.current_row, 3, 1)
+        self.current_row += 1
+        
+        volume_frame_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        volume_frame_box.set_margin_start(10)
+        volume_frame_box.set_margin_end(10)
+        volume_frame_box.set_margin_top(10)
+        volume_frame_box.set_margin_bottom(10)
+        volume_frame.add(volume_frame_box)
+        
+        volume_main_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        volume_frame_box.pack_start(volume_main_box, False, False, 0)
+        
+        # Volume principal
+        volume_main_label = Gtk.Label(label="Volume général:")
+        volume_main_box.pack_start(volume_main_label, False, False, 0)
+        
+        self.main_volume_scale = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL)
+        self.main_volume_scale.set_range(0, 100)
+        self.main_volume_scale.set_value(50)
+        self.main_volume_scale.set_digits(0)
+        self.main_volume_scale.set_hexpand(True)
+        self.main_volume_scale.connect("value-changed", self.on_main_volume_changed)
+        volume_main_box.pack_start(self.main_volume_scale, True, True, 0)
+        
+        self.main_volume_label = Gtk.Label(label="50%")
+        self.main_volume_label.set_size_request(40, -1)
+        volume_main_box.pack_start(self.main_volume_label, False, False, 0)
+        
+        # Bouton mute principal
+        self.main_mute_button = Gtk.Button(label="🔊")
+        self.main_mute_button.connect("clicked", self.on_main_mute_clicked)
+        self.main_mute_button.set_size_request(40, -1)
+        volume_main_box.pack_start(self.main_mute_button, False, False, 0)
+        
+        # Indicateur de niveau de la sortie combinée
+        self.main_meter_area = Gtk.DrawingArea()
+        self.main_meter_area.set_size_request(-1, 8)
+        self.main_meter_area.connect("draw", self.on_meter_draw, None)
+        volume_frame_box.pack_start(self.main_meter_area, False, False, 0)
+        
+        # Latences mesurées des périphériques combinés
+        self.latency_label = Gtk.Label(label="")
+        self.latency_label.set_halign(Gtk.Align.START)
+        self.latency_label.set_line_wrap(True)
+        volume_frame_box.pack_start(self.latency_label, False, False, 0)
+        
+        # Option périphérique par défaut
+        self.default_check = Gtk.CheckButton(label="Définir comme périphérique par défaut")
+        self.default_check.set_active(True)
+        self.main_grid.attach(self.default_check, 0, self.current_row, 3, 1)
+        self.current_row += 1
+        
+        # Option déplacement des flux déjà en cours
+        self.move_streams_check = Gtk.CheckButton(label="Déplacer les flux en cours vers la sortie combinée")
+        self.move_streams_check.set_tooltip_text("Les flux retournent sur leur sortie d'origine à l'arrêt")
+        self.main_grid.attach(self.move_streams_check, 0, self.current_row, 3, 1)
+        self.current_row += 1
+        
+        # Boutons principaux
+        button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        button_box.set_hexpand(True)
+        self.main_grid.attach(button_box, 0, self.current_row, 3, 1)
+        self.current_row += 1
+        
+        self.refresh_button = Gtk.Button(label="Actualiser")
+        self.refresh_button.connect("clicked", self.on_refresh_clicked)
+        button_box.pack_start(self.refresh_button, True, True, 0)
+        
+        self.start_button = Gtk.Button(label="Démarrer")
+        self.start_button.connect("clicked", self.on_start_clicked)
+        self.start_button.get_style_context().add_class("suggested-action")
+        button_box.pack_start(self.start_button, True, True, 0)
+        
+        self.stop_button = Gtk.Button(label="Arrêter")
+        self.stop_button.connect("clicked", self.on_stop_clicked)
+        self.stop_button.get_style_context().add_class("destructive-action")
+        self.stop_button.set_sensitive(False)
+        button_box.pack_start(self.stop_button, True, True, 0)
+        
+        # Copie sur disque de la sortie combinée (segments WAV)
+        self.record_button = Gtk.ToggleButton(label="⏺ Enregistrer")
+        self.record_button.set_tooltip_text(f"Enregistrer la sortie combinée dans {default_recording_dir()}")
+        self.record_handler = self.record_button.connect("toggled", self.on_record_toggled)
+        self.record_button.set_sensitive(False)
+        button_box.pack_start(self.record_button, True, True, 0)
+        
+        # Progression des opérations en arrière-plan
+        self.progress_bar = Gtk.ProgressBar()
+        self.progress_bar.set_show_text(True)
+        self.progress_bar.set_no_show_all(True)
+        self.main_grid.attach(self.progress_bar, 0, self.current_row, 3, 1)
+        self.current_row += 1
+        
+        # Statistiques des appels au serveur sonore (rafraîchies quand le panneau est ouvert)
+        self.stats_expander = Gtk.Expander(label="Statistiques du serveur sonore")
+        self.stats_label = Gtk.Label(label="")
+        self.stats_label.set_halign(Gtk.Align.START)
+        self.stats_label.set_selectable(True)
+        self.stats_label.get_style_context().add_class("monospace")
+        self.stats_expander.add(self.stats_label)
+        self.stats_expander.connect("notify::expanded", self.on_stats_expanded)
+        self.main_grid.attach(self.stats_expander, 0, self.current_row, 3, 1)
+        self.current_row += 1
+        self.stats_source = None
+        
+        # Zone de statut
+        status_frame = Gtk.Frame(label="Statut")
+        status_frame.set_hexpand(True)
+        status_frame.set_vexpand(True)
+        self.main_grid.attach(status_frame, 0, self.current_row, 3, 1)
+        
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_hexpand(True)
+        scrolled.set_vexpand(True)
+        scrolled.set_min_content_height(120)
+        status_frame.add(scrolled)
+        
+        self.status_buffer = Gtk.TextBuffer()
+        self.status_view = Gtk.TextView(buffer=self.status_buffer)
+        self.status_view.set_editable(False)
+        self.status_view.set_cursor_visible(False)
+        self.status_view.set_wrap_mode(Gtk.WrapMode.WORD)
+        scrolled.add(self.status_view)
+        self.status_end = self.status_buffer.create_mark("status-end", self.status_buffer.get_end_iter(), False)
+        self.status_source = GLib.timeout_add(STATUS_FRAME_MS, self.flush_status)
+        
+        # Tags pour colorer le texte
+        self.setup_text_tags()
+        
+        # Se connecter au serveur et s'abonner à ses événements (sinks, modules,
+        # flux) en arrière-plan ; l'exécuteur garde les opérations suivantes après
+        self.startup.begin("connexion")
+        self.run_async("Connexion au serveur sonore", self.connect_backend,
+                       on_done=lambda result: self.end_startup_phase("connexion"))
+        
+        # Charger les préréglages et les périphériques en arrière-plan
+        self.startup.begin("préréglages")
+        self.run_async("Chargement des préréglages", self.load_settings, on_done=self.on_settings_loaded)
+        self.startup.begin("périphériques")
+        self.update_device_list()
+        
+        # Reprendre une combinaison laissée par une instance arrêtée brutalement
+        self.run_async("Reprise de la combinaison", self.core.recover, on_done=self.on_recovered)
+        
+        # API de contrôle locale pour les scripts d'automatisation
+        self.control_server = ControlServer(
+            self.core,
+            run=lambda func, *args: self.executor.submit(func, *args).result(),
+            on_change=lambda: self.run_in_main_loop(self.update_ui_state))
+        try:
+            self.control_server.start()
+        except OSError as e:
+            self.control_server = None
+            self.append_status(f"API de contrôle indisponible: {e}", "warning")
+        
+        # Mettre à jour l'état des boutons
+        self.update_device_buttons_state()
+        self.end_startup_phase("interface")
+    
+    def end_startup_phase(self, phase):
+        """Termine une phase du démarrage ; affiche le bilan une fois toutes terminées"""
+        if self.startup.end(phase) and not self.startup.reported:
+            self.startup.reported = True
+            self.append_status(self.startup.summary(), "info")
+    
+    def on_first_draw(self, widget, context):
+        """Premier dessin de la fenêtre"""
+        widget.disconnect(self.first_draw_handler)
+        self.end_startup_phase("premier affichage")
+        return False
+    
+    def connect_backend(self):
+        """Ouvre la connexion et s'abonne aux événements du serveur (depuis l'exécuteur)"""
+        if self.core.backend is None:
+            self.core.connect()
+        self.event_subscription = self.core.subscribe(self.on_server_event)
+    
+    def load_settings(self):
+        """Lit les préréglages et les règles de routage (depuis l'exécuteur)"""
+        self.core.load_presets()
+        self.core.load_routing_rules()
+    
+    def on_settings_loaded(self, result):
+        self.update_presets_combo()
+        self.end_startup_phase("préréglages")
+    
+    def create_presets_section(self):
+        """Crée la section de gestion des préréglages"""
+        presets_frame = Gtk.Frame(label="Préréglages (Profils Audio)")
+        presets_frame.set_hexpand(True)
+        self.main_grid.attach(presets_frame, 0, self.current_row, 3, 1)
+        self.current_row += 1
+        
+        presets_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        presets_box.set_margin_start(10)
+        presets_box.set_margin_end(10)
+        presets_box.set_margin_top(10)
+        presets_box.set_margin_bottom(10)
+        presets_frame.add(presets_box)
+        
+        # Première ligne : Charger un préréglage
+        load_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        presets_box.pack_start(load_row, False, False, 0)
+        
+        load_label = Gtk.Label(label="Charger préréglage:")
+        load_label.set_size_request(120, -1)
+        load_row.pack_start(load_label, False, False, 0)
+        
+        # ComboBox pour les préréglages
+        self.presets_combo = Gtk.ComboBox()
+        self.presets_store = Gtk.ListStore(str, str)  # nom, description
+        self.presets_combo.set_model(self.presets_store)
+        renderer_text = Gtk.CellRendererText()
+        self.presets_combo.pack_start(renderer_text, True)
+        self.presets_combo.add_attribute(renderer_text, "text", 1)
+        self.presets_combo.set_hexpand(True)
+        load_row.pack_start(self.presets_combo, True, True, 0)
+        
+        load_button = Gtk.Button(label="Charger")
+        load_button.connect("clicked", self.on_load_preset_clicked)
+        load_row.pack_start(load_button, False, False, 0)
+        
+        delete_button = Gtk.Button(label="Supprimer")
+        delete_button.connect("clicked", self.on_delete_preset_clicked)
+        delete_button.get_style_context().add_class("destructive-action")
+        load_row.pack_start(delete_button, False, False, 0)
+        
+        # Deuxième ligne : Sauvegarder un préréglage
+        save_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        presets_box.pack_start(save_row, False, False, 0)
+        
+        save_label = Gtk.Label(label="Nom du préréglage:")
+        save_label.set_size_request(120, -1)
+        save_row.pack_start(save_label, False, False, 0)
+        
+        self.preset_name_entry = Gtk.Entry()
+        self.preset_name_entry.set_placeholder_text("Ex: Gaming Pro, Bureau Collaboratif...")
+        self.preset_name_entry.set_hexpand(True)
+        save_row.pack_start(self.preset_name_entry, True, True, 0)
+        
+        save_button = Gtk.Button(label="Sauvegarder")
+        save_button.connect("clicked", self.on_save_preset_clicked)
+        save_button.get_style_context().add_class("suggested-action")
+        save_row.pack_start(save_button, False, False, 0)
+        
+        # Mise à jour de la liste des préréglages
+        self.update_presets_combo()
+    
+    def update_presets_combo(self):
+        """Met à jour la liste des préréglages dans la ComboBox"""
+        self.presets_store.clear()
+        for name, preset in self.core.presets.items():
+            description = f"{name} - {preset.get('description', 'Aucune description')}"
+            self.presets_store.append([name, description])
+    
+    def get_current_configuration(self):
+        """Récupère la configuration actuelle"""
+        selected_devices = self.get_selected_devices()
+        
+        config = {
+            "description": "",
+            "devices": [],
+            "main_volume": int(self.main_volume_scale.get_value()),
+            "set_as_default": self.default_check.get_active(),
+            "move_streams": self.move_streams_check.get_active(),
+            "created": datetime.now().isoformat()
+        }
+        
+        # Sauvegarder la configuration de chaque périphérique
+        for i, device in enumerate(selected_devices):
+            if i < len(self.volume_scales):
+                device_config = {
+                    "name": device['name'],
+                    "volume": int(self.volume_scales[i].get_value()),
+                    "muted": self.mute_buttons[i].get_label() == "🔇"
+                }
+                config["devices"].append(device_config)
+        
+        return config
+    
+    def apply_configuration(self, config):
+        """Applique une configuration"""
+        try:
+            # Ajuster le nombre de périphériques si nécessaire
+            devices_needed = len(config["devices"])
+            current_devices = len(self.device_combos)
+            
+            # Ajouter des périphériques si nécessaire
+            while current_devices < devices_needed and current_devices < 8:
+                self.add_device_row()
+                current_devices += 1
+            
+            # Retirer des périphériques si nécessaire
+            while current_devices > devices_needed and current_devices > 2:
+                self.remove_device_row()
+                current_devices -= 1
+            
+            # Mettre à jour les widgets sans déclencher une écriture par curseur
+            with self.suppress_volume_handlers():
+                # Appliquer les paramètres généraux
+                main_volume = config.get("main_volume", 50)
+                self.main_volume_scale.set_value(main_volume)
+                self.main_volume_label.set_text(f"{main_volume}%")
+                self.default_check.set_active(config.get("set_as_default", True))
+                self.move_streams_check.set_active(bool(config.get("move_streams")))
+                
+                # Appliquer les paramètres des périphériques
+                for i, device_config in enumerate(config["devices"]):
+                    if i < len(self.volume_scales):
+                        # Régler le volume
+                        volume = device_config.get("volume", 50)
+                        self.volume_scales[i].set_value(volume)
+                        self.volume_labels[i].set_text(f"{volume}%")
+                        
+                        # Régler l'état de sourdine
+                        muted = device_config.get("muted", False)
+                        self.mute_buttons[i].set_label("🔇" if muted else "🔊")
+                        
+                        # Essayer de sélectionner le périphérique correspondant
+                        device_name = device_config.get("name", "")
+                        if device_name:
+                            self.select_device_by_name(i, device_name)
+            
+            # Appliquer les volumes immédiatement, en un seul lot
+            self.apply_current_volumes()
+            
+            return True
+        except Exception as e:
+            self.append_status(f"Erreur lors de l'application de la configuration: {e}", "error")
+            return False
+    
+    def select_device_by_name(self, combo_index, device_name):
+        """Sélectionne un périphérique par son nom dans une ComboBox"""
+        position = self.devices.position(device_name)
+        if position < 0 or combo_index >= len(self.device_combos):
+            return False
+        self.device_combos[combo_index].set_active(position)
+        return True
+    
+    @contextmanager
+    def suppress_volume_handlers(self):
+        """Bloque les gestionnaires de volume pendant une mise à jour groupée des curseurs"""
+        for scale in self.volume_scales:
+            scale.handler_block_by_func(self.on_device_volume_changed)
+        self.main_volume_scale.handler_block_by_func(self.on_main_volume_changed)
+        try:
+            yield
+        finally:
+            for scale in self.volume_scales:
+                scale.handler_unblock_by_func(self.on_device_volume_changed)
+            self.main_volume_scale.handler_unblock_by_func(self.on_main_volume_changed)
+    
+    def apply_current_volumes(self):
+        """Applique les volumes actuels aux périphériques, seulement ceux qui ont changé"""
+        targets = []
+        selected_devices = self.get_selected_devices()
+        for i, device in enumerate(selected_devices):
+            if i < len(self.volume_scales):
+                volume = int(self.volume_scales[i].get_value())
+                muted = self.mute_buttons[i].get_label() == "🔇"
+                targets.append(SinkState(device['name'], volume, muted))
+        if self.core.combined_sink_active and self.core.combined_name:
+            targets.append(SinkState(self.core.combined_name, int(self.main_volume_scale.get_value())))
+        
+        self.run_async("Application des volumes", self.core.apply_sink_states, targets,
+                       on_done=self.on_sink_states_applied)
+    
+    def on_sink_states_applied(self, changes):
+        """Fin de l'application groupée des volumes"""
+        if changes:
+            self.append_status(f"{len(changes)} périphérique(s) mis à jour en un seul lot.", "info")
+        else:
+            self.append_status("Les volumes sont déjà à jour.", "info")
+    
+    def on_save_preset_clicked(self, button):
+        """Gestionnaire pour sauvegarder un préréglage"""
+        name = self.preset_name_entry.get_text().strip()
+        if not name:
+            self.append_status("Veuillez entrer un nom pour le préréglage.", "error")
+            return
+        
+        # Vérifier si au moins 2 périphériques sont sélectionnés
+        selected_devices = self.get_selected_devices()
+        if len(selected_devices) < 2:
+            self.append_status("Veuillez sélectionner au moins 2 périphériques avant de sauvegarder.", "error")
+            return
+        
+        # Demander une description
+        description = self.get_preset_description()
+        
+        # Créer la configuration
+        config = self.get_current_configuration()
+        config["description"] = description
+        
+        # Sauvegarder
+        self.core.presets[name] = config
+        self.core.save_presets()
+        self.update_presets_combo()
+        
+        # Vider le champ de nom
+        self.preset_name_entry.set_text("")
+        
+        self.append_status(f"Préréglage '{name}' sauvegardé avec succès!", "success")
+        self.append_status(f"Configuration: {len(selected_devices)} périphériques, volume général {config['main_volume']}%", "info")
+    
+    def get_preset_description(self):
+        """Demande une description pour le préréglage"""
+        dialog = Gtk.Dialog(title="Description du préréglage", 
+                           parent=self.window,
+                           flags=Gtk.DialogFlags.MODAL)
+        dialog.add_button("Annuler", Gtk.ResponseType.CANCEL)
+        dialog.add_button("OK", Gtk.ResponseType.OK)
+        dialog.set_default_response(Gtk.ResponseType.OK)
+        
+        content_area = dialog.get_content_area()
+        content_area.set_spacing(10)
+        content_area.set_margin_start(10)
+        content_area.set_margin_end(10)
+        content_area.set_margin_top(10)
+        content_area.set_margin_bottom(10)
+        
+        label = Gtk.Label(label="Entrez une description courte pour ce préréglage:")
+        content_area.pack_start(label, False, False, 0)
+        
+        entry = Gtk.Entry()
+        entry.set_placeholder_text("Ex: Configuration pour gaming avec 3 sorties")
+        entry.set_activates_default(True)
+        content_area.pack_start(entry, False, False, 0)
+        
+        dialog.show_all()
+        response = dialog.run()
+        
+        description = entry.get_text().strip() if response == Gtk.ResponseType.OK else ""
+        dialog.destroy()
+        
+        return description
+    
+    def on_load_preset_clicked(self, button):
+        """Gestionnaire pour charger un préréglage"""
+        preset_iter = self.presets_combo.get_active_iter()
+        if not preset_iter:
+            self.append_status("Veuillez sélectionner un préréglage à charger.", "error")
+            return
+        
+        preset_name = self.presets_store[preset_iter][0]
+        if preset_name not in self.core.presets:
+            self.append_status(f"Préréglage '{preset_name}' non trouvé.", "error")
+            return
+        
+        config = self.core.presets[preset_name]
+        if self.apply_configuration(config):
+            self.append_status(f"Préréglage '{preset_name}' chargé avec succès!", "success")
+            self.append_status(f"Description: {config.get('description', 'Aucune description')}", "info")
+            self.append_status(f"Configuration: {len(config['devices'])} périphériques", "info")
+        else:
+            self.append_status(f"Erreur lors du chargement du préréglage '{preset_name}'.", "error")
+    
+    def on_delete_preset_clicked(self, button):
+        """Gestionnaire pour supprimer un préréglage"""
+        preset_iter = self.presets_combo.get_active_iter()
+        if not preset_iter:
+            self.append_status("Veuillez sélectionner un préréglage à supprimer.", "error")
+            return
+        
+        preset_name = self.presets_store[preset_iter][0]
+        
+        # Demander confirmation
+        dialog = Gtk.MessageDialog(parent=self.window,
+                                 flags=Gtk.DialogFlags.MODAL,
+                                 type=Gtk.MessageType.QUESTION,
+                                 buttons=Gtk.ButtonsType.YES_NO,
+                                 message_format=f"Supprimer le préréglage '{preset_name}' ?")
+        dialog.format_secondary_text("Cette action est irréversible.")
+        
+        response = dialog.run()
+        dialog.destroy()
+        
+        if response == Gtk.ResponseType.YES:
+            if preset_name in self.core.presets:
+                del self.core.presets[preset_name]
+                self.core.save_presets()
+                self.update_presets_combo()
+                self.append_status(f"Préréglage '{preset_name}' supprimé.", "success")
+            else:
+                self.append_status(f"Préréglage '{preset_name}' non trouvé.", "error")
+    
+    def add_device_row(self):
+        """Ajoute une nouvelle ligne de sélection de périphérique avec contrôles de volume"""
+        device_number = len(self.device_combos) + 1
+        
+        # Créer la boîte principale pour cette ligne
+        device_row = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        device_row.set_hexpand(True)
+        
+        # Première ligne : sélection du périphérique
+        selection_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        selection_row.set_hexpand(True)
+        
+        # Label pour le périphérique
+        device_label = Gtk.Label(label=f"Périphérique {device_number}:")
+        device_label.set_size_request(120, -1)
+        device_label.set_halign(Gtk.Align.START)
+        device_label.get_style_context().add_class("device-label")
+        selection_row.pack_start(device_label, False, False, 0)
+        
+        # ComboBox pour le périphérique
+        device_combo = Gtk.ComboBox()
+        renderer_text = Gtk.CellRendererText()
+        device_combo.pack_start(renderer_text, True)
+        device_combo.add_attribute(renderer_text, "text", 1)
+        device_combo.set_hexpand(True)
+        device_combo.connect("changed", self.on_device_combo_changed, device_number - 1)
+        selection_row.pack_start(device_combo, True, True, 0)
+        
+        device_row.pack_start(selection_row, False, False, 0)
+        
+        # Deuxième ligne : contrôles de volume
+        volume_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        volume_row.set_hexpand(True)
+        volume_row.set_margin_start(20)  # Indenter légèrement
+        
+        # Label volume
+        volume_label_text = Gtk.Label(label="Volume:")
+        volume_label_text.set_size_request(60, -1)
+        volume_row.pack_start(volume_label_text, False, False, 0)
+        
+        # Slider de volume
+        volume_scale = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL)
+        volume_scale.set_range(0, 100)
+        volume_scale.set_value(50)
+        volume_scale.set_digits(0)
+        volume_scale.set_hexpand(True)
+        volume_scale.connect("value-changed", self.on_device_volume_changed, device_number - 1)
+        volume_row.pack_start(volume_scale, True, True, 0)
+        
+        # Label pourcentage
+        volume_percent_label = Gtk.Label(label="50%")
+        volume_percent_label.set_size_request(40, -1)
+        volume_row.pack_start(volume_percent_label, False, False, 0)
+        
+        # Bouton mute
+        mute_button = Gtk.Button(label="🔊")
+        mute_button.connect("clicked", self.on_device_mute_clicked, device_number - 1)
+        mute_button.set_size_request(40, -1)
+        volume_row.pack_start(mute_button, False, False, 0)
+        
+        device_row.pack_start(volume_row, False, False, 0)
+        
+        # Troisième ligne : indicateur de niveau (RMS, crête, saturation)
+        meter_area = Gtk.DrawingArea()
+        meter_area.set_size_request(-1, 8)
+        meter_area.set_margin_start(90)
+        meter_area.set_margin_end(50)
+        meter_area.connect("draw", self.on_meter_draw, device_number - 1)
+        device_row.pack_start(meter_area, False, False, 0)
+        
+        # Séparateur
+        separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
+        separator.set_margin_top(5)
+        separator.set_margin_bottom(5)
+        device_row.pack_start(separator, False, False, 0)
+        
+        # Ajouter à nos listes
+        self.device_combos.append(device_combo)
+        self.device_rows.append(device_row)
+        self.volume_scales.append(volume_scale)
+        self.mute_buttons.append(mute_button)
+        self.volume_labels.append(volume_percent_label)
+        self.meter_areas.append(meter_area)
+        
+        # Ajouter à l'interface avant les boutons
+        button_box_index = len(self.devices_box.get_children()) - 1
+        self.devices_box.pack_start(device_row, False, False, 0)
+        self.devices_box.reorder_child(device_row, button_box_index)
+        
+        # Afficher la nouvelle ligne
+        device_row.show_all()
+        
+        # Mettre à jour la liste des périphériques pour cette nouvelle combobox
+        self.populate_single_combo(device_combo)
+        
+        return device_combo
+    
+    def remove_device_row(self):
+        """Retire la dernière ligne de sélection de périphérique"""
+        if len(self.device_combos) > 2:  # Garder au minimum 2 périphériques
+            # Retirer de l'interface
+            last_row = self.device_rows.pop()
+            last_combo = self.device_combos.pop()
+            last_volume = self.volume_scales.pop()
+            last_mute = self.mute_buttons.pop()
+            last_label = self.volume_labels.pop()
+            last_meter = self.meter_areas.pop()
+            self.meter_levels.pop(last_meter, None)
+            
+            self.devices_box.remove(last_row)
+            self.devices.truncate(len(self.device_combos))
+            self.update_meters()
+        
+        self.update_device_buttons_state()
+    
+    def update_device_buttons_state(self):
+        """Met à jour l'état des boutons d'ajout/suppression de périphériques"""
+        # Limite à 8 périphériques maximum pour des raisons pratiques
+        self.add_device_button.set_sensitive(len(self.device_combos) < 8 and not self.core.combined_sink_active)
+        self.remove_device_button.set_sensitive(len(self.device_combos) > 2 and not self.core.combined_sink_active)
+    
+    def setup_css(self):
+        """Configure le CSS pour l'interface"""
+        css_provider = Gtk.CssProvider()
+        css = """
+        .title {
+            font-size: 18px;
+            font-weight: bold;
+            margin-bottom: 10px;
+        }
+        .device-label {
+            font-weight: bold;
+        }
+        .monospace {
+            font-family: monospace;
+        }
+        """
+        css_provider.load_from_data(css.encode())
+        Gtk.StyleContext.add_provider_for_screen(
+            Gdk.Screen.get_default(),
+            css_provider,
+            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+        )
+    
+    def setup_text_tags(self):
+        """Configure les tags pour formater le texte dans la zone de statut"""
+        self.status_buffer.create_tag("info", foreground="#0066cc")
+        self.status_buffer.create_tag("success", foreground="#009900")
+        self.status_buffer.create_tag("error", foreground="#cc0000")
+        self.status_buffer.create_tag("warning", foreground="#cc6600")
+        self.status_buffer.create_tag("bold", weight=Pango.Weight.BOLD)
+    
+    def run_in_main_loop(self, func, *args):
+        """Exécute func dans la boucle GTK (appelable depuis n'importe quel thread)"""
+        def _call():
+            func(*args)
+            return False
+        GLib.idle_add(_call)
+    
+    def run_async(self, description, func, *args, on_done=None):
+        """Lance une opération sur le serveur sonore sans bloquer l'interface"""
+        self.busy_operations += 1
+        self.report_progress(description, 0.0)
+        self.update_ui_state()
+        
+        def _finished():
+            self.busy_operations -= 1
+            if not self.busy_operations:
+                self.progress_bar.hide()
+            self.update_ui_state()
+        
+        def _done(result):
+            _finished()
+            if on_done:
+                on_done(result)
+        
+        def _error(error):
+            _finished()
+            self.append_status(f"Erreur ({description}): {error}", "error")
+        
+        return self.executor.submit(func, *args, on_done=_done, on_error=_error)
+    
+    def report_progress(self, text, fraction):
+        """Affiche la progression de l'opération en cours"""
+        self.progress_bar.set_text(text)
+        self.progress_bar.set_fraction(fraction)
+        self.progress_bar.show()
+    
+    def append_status(self, message, tag=None):
+        """Ajoute un message à la zone de statut (depuis n'importe quel thread)"""
+        self.status_log.append(message, tag)
+    
+    def flush_status(self):
+        """Affiche en une fois les messages arrivés depuis l'image précédente"""
+        entries = self.status_log.drain()
+        if entries:
+            buffer = self.status_buffer
+            for entry in entries:
+                if entry.tag:
+                    buffer.insert_with_tags_by_name(buffer.get_end_iter(), entry.message + "\n", entry.tag)
+                else:
+                    buffer.insert(buffer.get_end_iter(), entry.message + "\n")
+            
+            # Ne garder que les dernières lignes
+            excess = buffer.get_line_count() - 1 - self.status_log.capacity
+            if excess > 0:
+                buffer.delete(buffer.get_start_iter(), buffer.get_iter_at_line(excess))
+            
+            # Faire défiler jusqu'au bas
+            self.status_view.scroll_to_mark(self.status_end, 0.0, False, 0.0, 0.0)
+        return self.running
+    
+    def update_device_list(self):
+        """Met à jour la liste des périphériques audio"""
+        self.append_status("Recherche des périphériques audio...", "info")
+        
+        # Obtenir tous les sinks (id, nom, description, propriétés) en une seule requête
+        self.run_async("Recherche des périphériques", self.list_sinks,
+                       on_done=self.populate_device_list)
+    
+    def list_sinks(self):
+        """Inventaire des sinks (depuis l'exécuteur, une fois connecté)"""
+        return self.core.backend.list_sinks()
+    
+    def populate_device_list(self, sinks):
+        """Remplit la liste des périphériques à partir de l'inventaire reçu"""
+        self.core.sinks.load(sinks)
+        self.end_startup_phase("périphériques")
+        
+        # Créer un nouveau modèle de données pour les périphériques
+        self.devices.load(self.core.sinks.selectable())
+        store = self.devices.store
+        
+        # Mettre à jour toutes les combobox
+        for i, combo in enumerate(self.device_combos):
+            combo.set_model(store)
+            # Sélectionner un périphérique différent pour chaque combo si possible
+            if len(store) > i:
+                combo.set_active(i)
+            elif len(store) > 0:
+                combo.set_active(0)
+        
+        self.append_status(f"Trouvé {len(store)} périphériques audio.", "success")
+    
+    def populate_single_combo(self, combo):
+        """Remplit une seule combobox avec la liste des périphériques"""
+        if not self.devices.loaded:
+            return
+        combo.set_model(self.devices.store)
+        # Sélectionner un périphérique différent des autres si possible
+        position = self.devices.first_unselected()
+        if position >= 0:
+            combo.set_active(position)
+    
+    def on_device_combo_changed(self, combo, combo_index):
+        """Enregistre la sélection d'une combobox dans le registre"""
+        device_iter = combo.get_active_iter()
+        sink_name = combo.get_model()[device_iter][2] if device_iter else None
+        self.devices.set_selection(combo_index, sink_name)
+        self.update_meters()
+    
+    def get_selected_devices(self):
+        """Retourne la liste des périphériques sélectionnés (uniques, en cache)"""
+        return self.devices.selected_devices()
+    
+    def find_sink_inputs_for_combined_sink(self):
+        """Trouve les sink-inputs associés à notre sortie combinée (index des flux)"""
+        if not self.core.combined_sink_active or not self.core.combined_name:
+            return []
+        
+        # Les sink-inputs référencent le sink par son index
+        try:
+            return [str(stream.index) for stream in self.core.streams_on(self.core.combined_name)]
+        except BackendError as e:
+            self.append_status(f"Erreur: {e}", "error")
+            return []
+    
+    def set_sink_input_volume(self, sink_input_id, volume_percent):
+        """Définit le volume d'un sink-input spécifique"""
+        self.core.set_stream_volume(sink_input_id, volume_percent)
+    
+    def set_sink_input_mute(self, sink_input_id, muted):
+        """Définit l'état de sourdine d'un sink-input spécifique"""
+        self.executor.submit(self.core.set_stream_mute, sink_input_id, muted)
+    
+    def set_sink_volume(self, sink_name, volume_percent):
+        """Définit le volume d'un sink spécifique (écriture regroupée en arrière-plan)"""
+        self.core.set_volume(sink_name, volume_percent)
+    
+    def set_sink_mute(self, sink_name, muted):
+        """Définit l'état de sourdine d'un sink spécifique (avec un court fondu, sans clic)"""
+        self.executor.submit(self.core.fade_mute, sink_name, muted)
+    
+    def on_main_volume_changed(self, scale):
+        """Gestionnaire pour le changement de volume principal"""
+        volume = int(scale.get_value())
+        self.main_volume_label.set_text(f"{volume}%")
+        
+        if self.core.combined_sink_active and self.core.combined_name:
+            self.set_sink_volume(self.core.combined_name, volume)
+    
+    def on_main_mute_clicked(self, button):
+        """Gestionnaire pour le bouton de sourdine principal"""
+        if button.get_label() == "🔊":
+            button.set_label("🔇")
+            if self.core.combined_sink_active and self.core.combined_name:
+                self.set_sink_mute(self.core.combined_name, True)
+        else:
+            button.set_label("🔊")
+            if self.core.combined_sink_active and self.core.combined_name:
+                self.set_sink_mute(self.core.combined_name, False)
+    
+    def on_device_volume_changed(self, scale, device_index):
+        """Gestionnaire pour le changement de volume d'un périphérique"""
+        volume = int(scale.get_value())
+        self.volume_labels[device_index].set_text(f"{volume}%")
+        
+        # Appliquer le volume immédiatement, même si la combinaison n'est pas active
+        selected_devices = self.get_selected_devices()
+        if device_index < len(selected_devices):
+            device_name = selected_devices[device_index]['name']
+            self.set_sink_volume(device_name, volume)
+            
+            if self.core.combined_sink_active:
+                message = f"Volume de '{selected_devices[device_index]['description']}' défini à {volume}%"
+            else:
+                message = f"Volume pré-configuré pour '{selected_devices[device_index]['description']}': {volume}%"
+            self.schedule_volume_status(device_index, message)
+    
+    def schedule_volume_status(self, device_index, message):
+        """Affiche un seul message une fois le glissement du curseur terminé"""
+        source = self.volume_status_sources.pop(device_index, None)
+        if source:
+            GLib.source_remove(source)
+        self.volume_status_sources[device_index] = GLib.timeout_add(
+            400, self.flush_volume_status, device_index, message)
+    
+    def flush_volume_status(self, device_index, message):
+        """Écrit le message de volume différé avec le bilan des écritures"""
+        self.volume_status_sources.pop(device_index, None)
+        report = self.core.volume_writer.take_report()
+        if report["coalesced"] or report["failed"]:
+            message += f" ({report['written']} écritures envoyées, {report['coalesced']} regroupées"
+            message += f", {report['failed']} échouées)" if report["failed"] else ")"
+        self.append_status(message, "info")
+        return False
+    
+    def on_device_mute_clicked(self, button, device_index):
+        """Gestionnaire pour le bouton de sourdine d'un périphérique"""
+        if button.get_label() == "🔊":
+            button.set_label("🔇")
+            muted = True
+        else:
+            button.set_label("🔊")
+            muted = False
+        
+        # Appliquer la sourdine immédiatement, même si la combinaison n'est pas active
+        selected_devices = self.get_selected_devices()
+        if device_index < len(selected_devices):
+            device_name = selected_devices[device_index]['name']
+            self.set_sink_mute(device_name, muted)
+            status = "en sourdine" if muted else "réactivé"
+            
+            if self.core.combined_sink_active:
+                self.append_status(f"Audio de '{selected_devices[device_index]['description']}' {status}", "info")
+            else:
+                self.append_status(f"Audio pré-configuré pour '{selected_devices[device_index]['description']}': {status}", "info")
+    
+    def get_combination_plan(self):
+        """Relève dans l'interface tout ce qu'il faut pour démarrer la combinaison"""
+        selected_devices = self.get_selected_devices()
+        return {
+            "devices": selected_devices,
+            "volumes": [int(scale.get_value()) for scale in self.volume_scales[:len(selected_devices)]],
+            "main_volume": int(self.main_volume_scale.get_value()),
+            "set_as_default": self.default_check.get_active(),
+            "move_streams": {} if self.move_streams_check.get_active() else None,
+        }
+    
+    def on_server_event(self, event):
+        """Reçoit un événement du serveur (depuis le thread d'abonnement)
+
+        L'événement est appliqué au cœur sur le thread de travail, dans
+        l'ordre des autres commandes ; seule l'interface est mise à jour
+        ensuite sur le thread principal.
+        """
+        self.executor.submit(self.handle_server_event, event,
+                             on_done=self.on_server_event_handled,
+                             on_error=self.on_background_error)
+    
+    def handle_server_event(self, event):
+        """Applique un événement du serveur à l'état de l'application (thread de travail)"""
+        was_active = self.core.combined_sink_active
+        removed = None
+        if event.facility == "sink" and event.kind == "remove":
+            sink = self.core.sinks.get_by_index(event.index)
+            if sink:
+                removed = sink.name
+        changed = self.core.handle_event(event)
+        return event, was_active, removed, changed
+    
+    def on_server_event_handled(self, result):
+        """Reporte dans l'interface l'effet d'un événement du serveur"""
+        event, was_active, removed, changed = result
+        if removed:
+            self.remove_store_device(removed)
+        
+        if changed:
+            if event.kind == "resync" and self.core.combined_sink_active:
+                # Des événements ont pu être manqués pendant la (re)connexion
+                self.executor.submit(self.check_combined_module,
+                                     on_done=self.on_combined_module_checked,
+                                     on_error=self.on_background_error)
+            self.schedule_sink_resync()
+        
+        if was_active and not self.core.combined_sink_active:
+            self.update_ui_state()
+    
+    def check_combined_module(self):
+        """Vérifie que notre module figure toujours dans la liste des modules (thread de travail)"""
+        return self.core.check_combined_module(self.core.backend.list_modules())
+    
+    def on_combined_module_checked(self, present):
+        if not present:
+            self.update_ui_state()
+    
+    def on_background_error(self, error):
+        """Erreur d'une requête d'arrière-plan sans opération visible"""
+        self.append_status(f"Erreur: {error}", "error")
+    
+    def schedule_sink_resync(self):
+        """Regroupe les événements de sinks rapprochés en une seule requête"""
+        if self.resync_source is None:
+            self.resync_source = GLib.timeout_add(200, self.resync_sinks)
+    
+    def resync_sinks(self):
+        """Relit les sinks en arrière-plan après une rafale d'événements"""
+        self.resync_source = None
+        if self.devices.loaded:
+            self.executor.submit(self.list_sinks, on_done=self.apply_sink_changes,
+                                 on_error=self.on_background_error)
+        return False
+    
+    def apply_sink_changes(self, sinks):
+        """Met à jour la table des sinks et la liste des périphériques sans tout reconstruire"""
+        added, removed, changed = self.core.sinks.apply(sinks)
+        
+        for sink in removed:
+            self.remove_store_device(sink.name)
+        for sink in changed:
+            self.devices.update(sink)
+        for sink in added:
+            if not sink.is_combined:
+                self.devices.add(sink)
+                self.append_status(f"Nouveau périphérique détecté: {sink.description}", "info")
+        
+        # Un slave débranché ou rebranché : recombiner sans couper la lecture
+        for zone, slaves in self.core.hotplug_slaves().items():
+            self.run_async("Reconfiguration de la combinaison", self.core.reconfigure, slaves,
+                           self.progress, zone)
+    
+    def remove_store_device(self, sink_name):
+        """Retire un périphérique débranché de la liste partagée"""
+        description = self.devices.remove(sink_name)
+        if description is not None:
+            self.append_status(f"Périphérique retiré: {description}", "warning")
+    
+    def update_ui_state(self):
+        """Met à jour l'état de l'interface en fonction de l'état de la sortie combinée"""
+        if self.core.combined_sink_active:
+            self.start_button.set_sensitive(False)
+            self.stop_button.set_sensitive(True)
+            self.refresh_button.set_sensitive(False)
+            self.add_device_button.set_sensitive(False)
+            self.remove_device_button.set_sensitive(False)
+            self.default_check.set_sensitive(False)
+            self.move_streams_check.set_sensitive(False)
+            
+            # Désactiver les contrôles de préréglages pendant la combinaison
+            self.presets_combo.set_sensitive(False)
+            self.preset_name_entry.set_sensitive(False)
+            
+            # Activer le contrôle de volume principal seulement quand la combinaison est active
+            self.main_volume_scale.set_sensitive(True)
+            self.main_mute_button.set_sensitive(True)
+            
+            for combo in self.device_combos:
+                combo.set_sensitive(False)
+            
+            # Les contrôles de volume individuels restent toujours actifs
+            for i, (scale, button) in enumerate(zip(self.volume_scales, self.mute_buttons)):
+                scale.set_sensitive(True)
+                button.set_sensitive(True)
+        else:
+            self.start_button.set_sensitive(True)
+            self.stop_button.set_sensitive(False)
+            self.refresh_button.set_sensitive(True)
+            self.default_check.set_sensitive(True)
+            self.move_streams_check.set_sensitive(True)
+            
+            # Réactiver les contrôles de préréglages
+            self.presets_combo.set_sensitive(True)
+            self.preset_name_entry.set_sensitive(True)
+            
+            # Désactiver seulement le contrôle de volume principal
+            self.main_volume_scale.set_sensitive(False)
+            self.main_mute_button.set_sensitive(False)
+            
+            for combo in self.device_combos:
+                combo.set_sensitive(True)
+            
+            # Garder les contrôles de volume individuels actifs même avant le démarrage
+            for i, (scale, button) in enumerate(zip(self.volume_scales, self.mute_buttons)):
+                scale.set_sensitive(True)
+                button.set_sensitive(True)
+            
+            self.update_device_buttons_state()
+        
+        # Pas de nouvelle opération tant qu'une autre est en cours
+        if self.busy_operations:
+            self.start_button.set_sensitive(False)
+            self.stop_button.set_sensitive(False)
+            self.refresh_button.set_sensitive(False)
+        
+        # Le bouton d'enregistrement suit l'état réel de l'enregistreur
+        self.record_button.set_sensitive(self.core.combined_sink_active and not self.busy_operations)
+        recording = self.core.zone.recorder is not None
+        if not self.busy_operations and self.record_button.get_active() != recording:
+            self.record_button.handler_block(self.record_handler)
+            self.record_button.set_active(recording)
+            self.record_button.handler_unblock(self.record_handler)
+        
+        # La sortie combinée a (ou n'a plus) son indicateur
+        self.update_meters()
+    
+    def meter_sink_name(self, device_index):
+        """Sink affiché par un indicateur (None : celui de la sortie combinée)"""
+        if device_index is None:
+            return self.core.combined_name if self.core.combined_sink_active else None
+        selection = self.devices.selection
+        return selection[device_index] if device_index < len(selection) else None
+    
+    def update_meters(self):
+        """Démarre les indicateurs des sinks affichés ; les arrête tous si la fenêtre est cachée"""
+        sources = {}
+        if self.meters_visible:
+            for device_index in [None] + list(range(len(self.meter_areas))):
+                name = self.meter_sink_name(device_index)
+                if name:
+                    sink = self.core.sinks.get(name)
+                    sources[name] = sink.monitor_source if sink and sink.monitor_source else f"{name}.monitor"
+        error = self.meters.watch(sources)
+        if error and not self.meter_error_reported:
+            self.meter_error_reported = True
+            self.append_status(f"Indicateurs de niveau indisponibles: {error}", "warning")
+        
+        if sources and self.meter_source is None:
+            self.meter_source = GLib.timeout_add(METER_FRAME_MS, self.draw_meters)
+        elif not sources and self.meter_source is not None:
+            GLib.source_remove(self.meter_source)
+            self.meter_source = None
+            self.meter_levels.clear()
+            self.draw_meters()
+    
+    def draw_meters(self):
+        """Redessine à cadence fixe les indicateurs dont le niveau a changé"""
+        for device_index, area in [(None, self.main_meter_area)] + list(enumerate(self.meter_areas)):
+            name = self.meter_sink_name(device_index)
+            level = self.meters.level(name) if name else None
+            if self.meter_levels.get(area) is not level:
+                self.meter_levels[area] = level
+                area.queue_draw()
+        return self.meter_source is not None
+    
+    def on_meter_draw(self, area, cr, device_index):
+        """Dessine un indicateur : RMS en barre, crête en trait, rouge en cas de saturation"""
+        width, height = area.get_allocated_width(), area.get_allocated_height()
+        cr.set_source_rgb(*METER_BACKGROUND)
+        cr.rectangle(0, 0, width, height)
+        cr.fill()
+        level = self.meter_levels.get(area)
+        if level is None:
+            return False
+        cr.set_source_rgb(*(METER_CLIP_COLOR if level.clipped else METER_RMS_COLOR))
+        cr.rectangle(0, 0, width * meter_fraction(level.rms), height)
+        cr.fill()
+        cr.set_source_rgb(*(METER_CLIP_COLOR if level.clipped else METER_PEAK_COLOR))
+        cr.rectangle(max(width * meter_fraction(level.peak) - 2, 0), 0, 2, height)
+        cr.fill()
+        return False
+    
+    def on_window_visibility(self, window, event):
+        """Fenêtre affichée, cachée ou réduite : les indicateurs ne tournent que si elle est visible"""
+        if event.type == Gdk.EventType.UNMAP:
+            visible = False
+        elif event.type == Gdk.EventType.WINDOW_STATE:
+            visible = window.get_mapped() and not event.new_window_state & Gdk.WindowState.ICONIFIED
+        else:
+            visible = True
+        if visible != self.meters_visible:
+            self.meters_visible = visible
+            self.update_meters()
+        return False
+    
+    def reset_volume_controls(self):
+        """Remet les contrôles de volume à leur état initial, sans rien envoyer au serveur"""
+        selected_devices = self.get_selected_devices()
+        with self.suppress_volume_handlers():
+            # Remettre le volume principal à 50%
+            self.main_volume_scale.set_value(50)
+            self.main_volume_label.set_text("50%")
+            self.main_mute_button.set_label("🔊")
+            
+            # Afficher les volumes individuels rétablis à l'arrêt (50% si inconnus)
+            for i, (scale, label, button) in enumerate(zip(self.volume_scales, self.volume_labels, self.mute_buttons)):
+                sink = self.core.sinks.get(selected_devices[i]['name']) if i < len(selected_devices) else None
+                volume = sink.volume if sink else 50
+                scale.set_value(volume)
+                label.set_text(f"{volume}%")
+                button.set_label("🔇" if sink and sink.muted else "🔊")
+    
+    def on_add_device_clicked(self, button):
+        """Gestionnaire d'événement pour le bouton d'ajout de périphérique"""
+        self.add_device_row()
+        self.update_device_buttons_state()
+    
+    def on_remove_device_clicked(self, button):
+        """Gestionnaire d'événement pour le bouton de suppression de périphérique"""
+        self.remove_device_row()
+    
+    def on_refresh_clicked(self, button):
+        """Gestionnaire d'événement pour le bouton Actualiser"""
+        self.update_device_list()
+    
+    def on_start_clicked(self, button):
+        """Gestionnaire d'événement pour le bouton Démarrer"""
+        plan = self.get_combination_plan()
+        if len(plan["devices"]) < 2:
+            self.append_status("Veuillez sélectionner au moins deux périphériques différents.", "error")
+            return
+        
+        self.run_async("Démarrage de la combinaison", self.core.start, plan, self.progress,
+                       on_done=self.on_combination_started)
+    
+    def on_combination_started(self, created):
+        """Fin du démarrage de la combinaison"""
+        if created:
+            self.update_ui_state()
+            self.show_latency(self.core.latency)
+            selected_devices = self.get_selected_devices()
+            self.append_status(f"La sortie combinée est active. L'audio est maintenant redirigé vers {len(selected_devices)} périphériques.", "success")
+            self.append_status("Les volumes pré-configurés ont été appliqués.", "info")
+            self.append_status("Vous pouvez maintenant ajuster le volume général et les volumes individuels.", "info")
+    
+    def on_recovered(self, adopted):
+        """Fin de la reprise : afficher la combinaison reprise comme si on l'avait démarrée"""
+        if DEFAULT_ZONE not in adopted:
+            return
+        slaves = self.core.slaves
+        while len(self.device_combos) < min(len(slaves), 8):
+            self.add_device_row()
+        for combo, name in zip(self.device_combos, slaves):
+            position = self.devices.position(name)
+            if position >= 0:
+                combo.set_active(position)
+        self.update_ui_state()
+        self.append_status("La sortie combinée de la session précédente a été reprise sans interruption.",
+                           "success")
+    
+    def show_latency(self, report):
+        """Affiche les latences mesurées (rapport None : efface l'affichage)"""
+        if report is None or not self.core.combined_sink_active:
+            self.latency_label.set_text("")
+        else:
+            self.latency_label.set_text(f"Latences: {report.summary(self.core.describe)}")
+        return False
+    
+    def on_stop_clicked(self, button):
+        """Gestionnaire d'événement pour le bouton Arrêter"""
+        self.run_async("Arrêt de la combinaison", self.core.stop,
+                       on_done=self.on_combination_stopped)
+    
+    def on_combination_stopped(self, removed):
+        """Fin de l'arrêt de la combinaison"""
+        if removed:
+            self.update_ui_state()
+            self.reset_volume_controls()
+            self.show_latency(None)
+    
+    def on_record_toggled(self, button):
+        """Démarre ou termine l'enregistrement de la sortie combinée"""
+        if button.get_active():
+            self.run_async("Démarrage de l'enregistrement", self.core.start_recording,
+                           default_recording_dir())
+        else:
+            self.run_async("Fin de l'enregistrement", self.core.stop_recording)
+    
+    def on_window_destroy(self, window):
+        """Gestionnaire d'événement pour la fermeture de la fenêtre"""
+        self.cleanup()
+        Gtk.main_quit()
+    
+    def on_stats_expanded(self, expander, param):
+        """Rafraîchit les statistiques toutes les 2 secondes tant que le panneau est ouvert"""
+        if expander.get_expanded():
+            self.refresh_stats()
+            if self.stats_source is None:
+                self.stats_source = GLib.timeout_add(2000, self.refresh_stats)
+        elif self.stats_source is not None:
+            GLib.source_remove(self.stats_source)
+            self.stats_source = None
+    
+    def refresh_stats(self):
+        """Affiche les compteurs et latences par opération"""
+        if self.core.metrics is None:
+            text = "Statistiques désactivées (lancez avec --stats)."
+        else:
+            text = self.core.metrics.summary()
+        text = f"{text}\n\n{self.meters.summary()}"
+        recorder = self.core.zone.recorder
+        if recorder is not None:
+            stats = recorder.stats()
+            text += (f"\nEnregistrement: {stats['seconds']} s en {stats['segments']} fichier(s), "
+                     f"{stats['dropped_blocks']} blocs perdus, tampon {stats['ring_high_water']}/"
+                     f"{stats['ring_blocks']} au plus")
+        self.stats_label.set_text(text)
+        return True
+    
+    def signal_handler(self, signum, frame):
+        """Gestionnaire pour les signaux d'arrêt"""
+        self.cleanup()
+        sys.exit(0)
+    
+    def cleanup(self):
+        """Nettoie les ressources avant de quitter"""
+        self.running = False
+        if self.meter_source is not None:
+            GLib.source_remove(self.meter_source)
+            self.meter_source = None
+        self.meters.stop()
+        if self.event_subscription:
+            self.event_subscription.stop()
+            self.event_subscription = None
+        if self.control_server:
+            self.control_server.stop()
+        self.executor.shutdown(wait=True)
+        self.core.shutdown()
+        self.status_log.close()
+
+def run_gui(core=None, started=None):
+    """Lance l'interface graphique
+
+    started : instant (perf_counter) pris en tête du script, avant ses imports, pour
+    mesurer la phase d'import dans le bilan du démarrage.
+    """
+    startup = StartupTimer(started)
+    if started is not None:
+        startup.begin("import", at=started)
+        startup.end("import")
+    app = AudioCombiner(core, startup)
+    startup.begin("premier affichage")
+    app.first_draw_handler = app.window.connect("draw", app.on_first_draw)
+    app.window.show_all()
+    # Initialiser l'état de l'interface
+    app.update_ui_state()
+    Gtk.main()
\ No newline at end of file
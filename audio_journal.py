@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Journal de reprise d'Audio Combinator
+Chaque processus inscrit dans son propre fichier les modules, noms de sinks
+et volumes qu'il a créés, réécrit atomiquement à chaque changement. Après un
+arrêt brutal (SIGKILL, plantage), l'instance suivante retrouve ces fichiers
+orphelins pour reprendre la combinaison ou nettoyer exactement ce qu'ils
+désignent.
+"""
+
+import json
+import os
+import threading
+
+
+def default_state_dir(config_dir):
+    """Répertoire des journaux : XDG_RUNTIME_DIR (vidé avec la session, comme le serveur)"""
+    directory = os.environ.get("AUDIO_COMBINATOR_STATE_DIR")
+    if directory:
+        return directory
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "audio-combinator")
+    return os.path.join(config_dir, "state")
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class StateJournal:
+    """Journal d'état d'un processus : <répertoire>/<pid>.json"""
+
+    def __init__(self, directory, pid=None):
+        self.directory = directory
+        self.pid = pid or os.getpid()
+        self.path = os.path.join(directory, f"{self.pid}.json")
+        self._lock = threading.Lock()
+
+    def write(self, state):
+        """Remplace le journal (écriture dans un fichier temporaire puis renommage)"""
+        state = dict(state, pid=self.pid)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path)
+
+    def clear(self):
+        """Supprime le journal (plus rien à reprendre)"""
+        with self._lock:
+            self.discard(self.path)
+
+    def orphans(self):
+        """Journaux laissés par des processus qui ne tournent plus : [(chemin, état)]"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        orphans = []
+        for name in sorted(names):
+            pid = name[:-len(".json")]
+            if not (name.endswith(".json") and pid.isdigit()):
+                continue
+            if int(pid) == self.pid or _process_alive(int(pid)):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    orphans.append((path, json.load(f)))
+            except (OSError, ValueError):
+                # Illisible : rien d'utilisable à reprendre
+                self.discard(path)
+        return orphans
+
+    @staticmethod
+    def discard(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Latences des périphériques combinés d'Audio Combinator
+Mesure de la latence de chaque sortie, réglage de module-combine-sink
+et surveillance de l'alignement pendant que la combinaison tourne
+"""
+
+import threading
+from dataclasses import dataclass, field
+
+from audio_backend import BackendError
+
+# Au-delà de cet écart entre sorties, le module corrige sa cadence plus souvent
+WIDE_SPREAD_USEC = 20000
+
+# Écart supplémentaire (par rapport au démarrage) signalé comme une dérive
+DRIFT_WARNING_USEC = 15000
+
+# Période de correction de module-combine-sink selon l'écart mesuré (secondes)
+ADJUST_TIME_NARROW = 10
+ADJUST_TIME_WIDE = 2
+
+
+def sink_latency_usec(sink):
+    """Latence actuelle du sink, ou sa latence configurée s'il est suspendu"""
+    return sink.latency_usec or sink.configured_latency_usec
+
+
+@dataclass
+class LatencyReport:
+    """Latences mesurées des sorties d'une combinaison (en microsecondes)"""
+    latencies: dict = field(default_factory=dict)  # nom du sink -> latence
+    missing: list = field(default_factory=list)    # sinks absents du serveur
+
+    @property
+    def reference_usec(self):
+        """Latence de la sortie la plus lente, sur laquelle les autres s'alignent"""
+        return max(self.latencies.values(), default=0)
+
+    @property
+    def spread_usec(self):
+        return self.reference_usec - min(self.latencies.values(), default=0)
+
+    @property
+    def delays(self):
+        """Retard à ajouter à chaque sortie pour rejoindre la plus lente"""
+        reference = self.reference_usec
+        return {name: reference - latency for name, latency in self.latencies.items()}
+
+    def to_dict(self):
+        return {
+            "latencies_usec": dict(self.latencies),
+            "delays_usec": self.delays,
+            "reference_usec": self.reference_usec,
+            "spread_usec": self.spread_usec,
+            "missing": list(self.missing),
+        }
+
+    def summary(self, describe=None):
+        """Résumé lisible, ex. « Enceintes 45 ms, Casque BT 180 ms (écart 135 ms) »"""
+        describe = describe or (lambda name: name)
+        parts = [f"{describe(name)} {latency / 1000:.0f} ms"
+                 for name, latency in self.latencies.items()]
+        return f"{', '.join(parts)} (écart {self.spread_usec / 1000:.0f} ms)"
+
+
+def measure_latencies(sinks, names):
+    """Construit le rapport de latence des sinks nommés à partir d'une liste de sinks"""
+    by_name = {sink.name: sink for sink in sinks}
+    report = LatencyReport()
+    for name in names:
+        sink = by_name.get(name)
+        if sink is None:
+            report.missing.append(name)
+        else:
+            report.latencies[name] = sink_latency_usec(sink)
+    return report
+
+
+def combine_sink_tuning(report, resample_method=None):
+    """Paramètres d'alignement de module-combine-sink adaptés aux latences mesurées
+
+    module-combine-sink compense lui-même les latences de ses esclaves en
+    ajustant leur fréquence d'échantillonnage ; on règle la fréquence de ces
+    corrections (plus rapide quand les sorties sont très décalées, comme
+    Bluetooth + HDMI) et, si demandé, la méthode de rééchantillonnage.
+    """
+    wide = report.spread_usec >= WIDE_SPREAD_USEC
+    tuning = {"adjust_time": ADJUST_TIME_WIDE if wide else ADJUST_TIME_NARROW}
+    if resample_method:
+        tuning["resample_method"] = resample_method
+    return tuning
+
+
+class LatencyMonitor:
+    """Relit périodiquement les latences des sorties combinées
+
+    on_report(report) est appelé depuis le thread de surveillance après
+    chaque mesure réussie.
+    """
+
+    def __init__(self, backend, names, on_report, interval=10.0):
+        self.backend = backend
+        self.names = list(names)
+        self.on_report = on_report
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                sinks = self.backend.list_sinks()
+            except BackendError:
+                continue
+            if not self.stopped.is_set():
+                self.on_report(measure_latencies(sinks, self.names))
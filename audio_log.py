@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Journal d'état d'Audio Combinator
+Historique borné (tampon circulaire) alimenté sans verrou par tous les
+threads et vidé par image par l'interface, avec copie facultative dans un
+fichier journal tournant écrit depuis un thread dédié
+"""
+
+import collections
+import logging
+import logging.handlers
+import queue
+import time
+
+# Nombre de lignes gardées par défaut dans la zone de statut
+DEFAULT_CAPACITY = 1000
+
+# Taille maximale et nombre d'archives du fichier journal
+LOG_FILE_MAX_BYTES = 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+_LEVELS = {"error": logging.ERROR, "warning": logging.WARNING}
+
+StatusEntry = collections.namedtuple("StatusEntry", "time message tag")
+
+
+class LogFile:
+    """Fichier journal tournant, écrit hors du thread appelant"""
+
+    def __init__(self, path, max_bytes=LOG_FILE_MAX_BYTES, backups=LOG_FILE_BACKUPS):
+        self.path = path
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes,
+                                                       backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        self.queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(self.queue, handler)
+        self.logger = logging.Logger(f"audio-combinator:{path}")
+        self.logger.addHandler(logging.handlers.QueueHandler(self.queue))
+        self.listener.start()
+
+    def write(self, message, tag=None):
+        self.logger.log(_LEVELS.get(tag, logging.INFO), message)
+
+    def close(self):
+        """Écrit les derniers messages et ferme le fichier"""
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+class StatusLog:
+    """Historique borné des messages d'état
+
+    append() peut être appelé depuis n'importe quel thread : il ne fait
+    qu'ajouter à une deque (opération atomique). drain(), appelé par
+    l'interface à cadence fixe, retourne les messages arrivés depuis
+    l'appel précédent. Au-delà de capacity messages, les plus anciens
+    sont oubliés (ils restent dans le fichier journal s'il y en a un).
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, log_file=None):
+        self.capacity = capacity
+        self.history = collections.deque(maxlen=capacity)
+        self.pending = collections.deque(maxlen=capacity)
+        self.file = LogFile(log_file) if log_file else None
+
+    def append(self, message, tag=None):
+        entry = StatusEntry(time.time(), message, tag)
+        self.pending.append(entry)
+        if self.file:
+            self.file.write(message, tag)
+
+    def drain(self):
+        """Retourne (dans l'ordre) les messages ajoutés depuis le dernier appel"""
+        entries = []
+        try:
+            while True:
+                entries.append(self.pending.popleft())
+        except IndexError:
+            pass
+        self.history.extend(entries)
+        return entries
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
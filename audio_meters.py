@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Indicateurs de niveau d'Audio Combinator
+Crête et niveau RMS de chaque sortie, lus sur sa source de monitor par un
+processus parec et réduits bloc par bloc sur un thread dédié (NumPy si
+disponible). L'affichage lit le dernier niveau à sa propre cadence, quelle
+que soit celle de l'audio.
+"""
+
+import array
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+try:
+    import numpy
+except ImportError:  # NumPy est facultatif : réduction en Python pur, sous-échantillonnée
+    numpy = None
+
+# Format de capture : suffisant pour un indicateur, léger pour le serveur
+METER_RATE = 16000
+METER_CHANNELS = 2
+BLOCK_FRAMES = 512        # 32 ms à 16 kHz
+
+# Sans NumPy, un échantillon sur FALLBACK_STRIDE est examiné
+FALLBACK_STRIDE = 4
+
+CLIP_LEVEL = 0.999        # crête considérée comme saturée
+CLIP_HOLD = 1.5           # secondes d'affichage de la saturation
+PEAK_DECAY_DB = 20.0      # retombée de la crête affichée, en dB par seconde
+RMS_SMOOTHING = 0.3       # constante de temps du niveau RMS, en secondes
+FLOOR_DB = -60.0          # bas de l'échelle des indicateurs
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def to_db(value):
+    """Niveau linéaire -> dBFS, borné au bas de l'échelle"""
+    return max(20.0 * math.log10(value), FLOOR_DB) if value > 0 else FLOOR_DB
+
+
+def meter_fraction(value):
+    """Position sur l'indicateur (0 à 1, échelle en dB) d'un niveau linéaire"""
+    return (to_db(value) - FLOOR_DB) / -FLOOR_DB
+
+
+def reduce_block(data, channels=METER_CHANNELS):
+    """Crête et RMS (maximum des canaux) d'un bloc float32 little-endian"""
+    if numpy is not None:
+        samples = numpy.frombuffer(data, dtype="<f4")
+        frames = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+        if not len(frames):
+            return 0.0, 0.0
+        peak = float(numpy.abs(frames).max())
+        rms = float(numpy.sqrt(numpy.mean(numpy.square(frames, dtype=numpy.float64), axis=0)).max())
+        return peak, rms
+
+    samples = array.array("f")
+    samples.frombytes(data[:len(data) - len(data) % 4])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    peak = rms = 0.0
+    for channel in range(channels):
+        values = samples[channel::channels * FALLBACK_STRIDE]
+        if values:
+            peak = max(peak, max(map(abs, values)))
+            rms = max(rms, math.sqrt(sum(value * value for value in values) / len(values)))
+    return peak, rms
+
+
+def _process_cpu_seconds(pid):
+    """Temps CPU consommé par un processus (Linux, /proc), 0 si illisible"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+
+
+@dataclass
+class MeterLevel:
+    """Niveau affiché d'une sortie (valeurs linéaires, 1.0 = pleine échelle)"""
+    peak: float = 0.0
+    rms: float = 0.0
+    clipped: bool = False
+
+
+class LevelMeter:
+    """Indicateur d'une source de monitor
+
+    Un processus parec capture la source ; un thread lit les blocs, les
+    réduit (crête, RMS) et met à jour `level`, lu sans attente par l'affichage.
+    """
+
+    def __init__(self, source, rate=METER_RATE, channels=METER_CHANNELS,
+                 block_frames=BLOCK_FRAMES, parec="parec"):
+        self.source = source
+        self.channels = channels
+        self.block_bytes = block_frames * channels * 4
+        self.level = MeterLevel()
+        self.running = True
+        self._clip_until = 0.0
+        self._thread_cpu = 0.0
+        self._cpu_mark = (time.monotonic(), 0.0)
+        self.process = subprocess.Popen(
+            [parec, f"--device={source}", "--format=float32le", f"--rate={rate}",
+             f"--channels={channels}", f"--latency-msec={block_frames * 1000 // rate}"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Arrête la capture sans attendre le thread (il se termine à la fin du flux)"""
+        self.running = False
+        if self.process.poll() is None:
+            self.process.terminate()
+
+    def cpu_percent(self):
+        """Part d'un cœur utilisée (réduction et capture) depuis l'appel précédent"""
+        now = time.monotonic()
+        total = self._thread_cpu + _process_cpu_seconds(self.process.pid)
+        (then, previous), self._cpu_mark = self._cpu_mark, (now, total)
+        return 100.0 * (total - previous) / (now - then) if now > then else 0.0
+
+    def _run(self):
+        stream = self.process.stdout
+        last = time.monotonic()
+        while self.running:
+            data = stream.read(self.block_bytes)
+            if not data:
+                break
+            peak, rms = reduce_block(data, self.channels)
+            now = time.monotonic()
+            elapsed, last = now - last, now
+            previous = self.level
+            if peak >= CLIP_LEVEL:
+                self._clip_until = now + CLIP_HOLD
+            # Nouvel objet à chaque bloc : l'affichage lit un niveau cohérent sans verrou
+            self.level = MeterLevel(
+                peak=max(peak, previous.peak * 10 ** (-PEAK_DECAY_DB * elapsed / 20.0)),
+                rms=previous.rms + (rms - previous.rms) * (1.0 - math.exp(-elapsed / RMS_SMOOTHING)),
+                clipped=now < self._clip_until)
+            self._thread_cpu = time.thread_time()
+        self.process.wait()
+        self.level = MeterLevel()
+
+
+class MeterBank:
+    """Indicateurs actifs par nom de sink
+
+    watch({sink: source de monitor}) démarre les indicateurs manquants et
+    arrête ceux qui ne sont plus demandés ; watch({}) les arrête tous.
+    """
+
+    def __init__(self, factory=LevelMeter):
+        self.factory = factory
+        self.meters = {}
+        self.error = None  # dernière erreur de démarrage (parec absent...)
+
+    def watch(self, sources):
+        for name in [name for name, meter in self.meters.items()
+                     if sources.get(name) != meter.source]:
+            self.meters.pop(name).stop()
+        for name, source in sources.items():
+            if name not in self.meters and source:
+                try:
+                    self.meters[name] = self.factory(source)
+                except OSError as e:
+                    self.error = str(e)
+        return self.error
+
+    def level(self, name):
+        meter = self.meters.get(name)
+        return meter.level if meter else None
+
+    def cpu_percent(self):
+        """Part d'un cœur utilisée par chaque indicateur : {sink: pourcentage}"""
+        return {name: meter.cpu_percent() for name, meter in self.meters.items()}
+
+    def summary(self):
+        usage = self.cpu_percent()
+        if not usage:
+            return "Indicateurs de niveau: inactifs"
+        details = ", ".join(f"{name} {percent:.1f}%" for name, percent in sorted(usage.items()))
+        return (f"Indicateurs de niveau: {sum(usage.values()):.1f}% d'un cœur "
+                f"({'NumPy' if numpy is not None else 'Python'}) — {details}")
+
+    def stop(self):
+        self.watch({})
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrumentation des appels au serveur sonore d'Audio Combinator
+Compteurs, échecs, reprises et histogrammes de latence par opération,
+exportables au format texte Prometheus ou en lignes JSON
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+
+from audio_backend import BackendError, SoundBackend
+
+# Bornes supérieures des classes de l'histogramme, en secondes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Opérations chronométrées (toutes les méthodes de SoundBackend sauf subscribe/close)
+INSTRUMENTED_OPERATIONS = (
+    "list_sinks", "list_modules", "list_sink_inputs",
+    "set_sink_volume", "set_sink_mute", "set_sink_input_volume", "set_sink_input_mute",
+    "load_module", "unload_module", "set_default_sink", "get_default_sink", "apply_sink_states",
+    "move_sink_input", "move_sink_inputs",
+)
+
+
+class OperationStats:
+    """Compteurs et histogramme de latence d'une opération"""
+
+    __slots__ = ("calls", "failures", "retries", "total_seconds", "max_seconds",
+                 "buckets", "last_error")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # dernière classe : +Inf
+        self.last_error = None
+
+    def observe(self, seconds):
+        self.calls += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def quantile(self, q):
+        """Estimation d'un quantile (borne supérieure de la classe atteinte)"""
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "mean_ms": round(self.total_seconds / self.calls * 1000, 3) if self.calls else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "last_error": self.last_error,
+        }
+
+
+class BackendMetrics:
+    """Statistiques des appels au serveur sonore, par opération"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.operations = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, operation):
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = OperationStats()
+        return stats
+
+    def observe(self, operation, seconds, error=None):
+        with self._lock:
+            stats = self._stats(operation)
+            stats.observe(seconds)
+            if error is not None:
+                stats.failures += 1
+                stats.last_error = str(error)
+
+    def retry(self, operation):
+        """Compte une nouvelle tentative d'une opération après un échec"""
+        with self._lock:
+            self._stats(operation).retries += 1
+
+    def snapshot(self):
+        """Copie des statistiques : {opération: {calls, failures, ...}}"""
+        with self._lock:
+            return {operation: stats.to_dict()
+                    for operation, stats in sorted(self.operations.items())}
+
+    def summary(self):
+        """Tableau lisible, une ligne par opération"""
+        lines = [f"{'opération':<22}{'appels':>8}{'échecs':>8}{'reprises':>9}"
+                 f"{'moy. ms':>9}{'p95 ms':>8}{'max ms':>9}"]
+        for operation, stats in self.snapshot().items():
+            lines.append(f"{operation:<22}{stats['calls']:>8}{stats['failures']:>8}"
+                         f"{stats['retries']:>9}{stats['mean_ms']:>9.2f}"
+                         f"{stats['p95_ms']:>8.1f}{stats['max_ms']:>9.1f}")
+        return "\n".join(lines)
+
+    def to_prometheus(self):
+        """Statistiques au format texte d'exposition Prometheus"""
+        prefix = "audio_combinator_backend"
+        lines = []
+        with self._lock:
+            operations = sorted(self.operations.items())
+            for name, field, help_text in (("calls_total", "calls", "Appels au serveur sonore"),
+                                           ("failures_total", "failures", "Appels en échec"),
+                                           ("retries_total", "retries", "Nouvelles tentatives")):
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for operation, stats in operations:
+                    lines.append(f'{prefix}_{name}{{operation="{operation}"}} {getattr(stats, field)}')
+            lines.append(f"# HELP {prefix}_call_seconds Durée des appels au serveur sonore")
+            lines.append(f"# TYPE {prefix}_call_seconds histogram")
+            for operation, stats in operations:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    lines.append(f'{prefix}_call_seconds_bucket{{operation="{operation}",le="{bound}"}} '
+                                 f'{cumulative}')
+                lines.append(f'{prefix}_call_seconds_sum{{operation="{operation}"}} {stats.total_seconds:.6f}')
+                lines.append(f'{prefix}_call_seconds_count{{operation="{operation}"}} {stats.calls}')
+        return "\n".join(lines) + "\n"
+
+    def to_json_line(self):
+        return json.dumps({"time": time.time(), "operations": self.snapshot()}, ensure_ascii=False)
+
+
+class InstrumentedBackend(SoundBackend):
+    """Enveloppe un backend et chronomètre chacun de ses appels
+
+    Les autres attributs (abonnement, méthodes propres au backend) sont
+    transmis tels quels au backend enveloppé.
+    """
+
+    def __init__(self, backend, metrics):
+        self.backend = backend
+        self.metrics = metrics
+        self.name = backend.name
+        for operation in INSTRUMENTED_OPERATIONS:
+            setattr(self, operation, self._timed(operation, getattr(backend, operation)))
+
+    def _timed(self, operation, method):
+        metrics = self.metrics
+        clock = time.perf_counter
+
+        def call(*args):
+            started = clock()
+            try:
+                result = method(*args)
+            except BackendError as e:
+                metrics.observe(operation, clock() - started, e)
+                raise
+            metrics.observe(operation, clock() - started)
+            return result
+        return call
+
+    def subscribe(self, callback):
+        return self.backend.subscribe(callback)
+
+    def close(self):
+        self.backend.close()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+class MetricsExporter:
+    """Écrit périodiquement les statistiques dans un fichier
+
+    Format "prometheus" : le fichier est remplacé à chaque écriture (pour le
+    collecteur textfile de node_exporter) ; format "jsonl" : une ligne JSON
+    est ajoutée à chaque écriture.
+    """
+
+    def __init__(self, metrics, path, format="prometheus", interval=10.0):
+        if format not in ("prometheus", "jsonl"):
+            raise ValueError(f"Format d'export inconnu: {format}")
+        self.metrics = metrics
+        self.path = path
+        self.format = format
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self):
+        if self.format == "jsonl":
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(self.metrics.to_json_line() + "\n")
+        else:
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                f.write(self.metrics.to_prometheus())
+            os.replace(temporary, self.path)
+
+    def stop(self):
+        """Arrête le thread après une dernière écriture"""
+        self.stopped.set()
+        self.thread.join(timeout=1.0)
+        self.write()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass
@@ -0,0 +1,588 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend PipeWire natif d'Audio Combinator
+Le graphe entier est lu d'un seul instantané `pw-dump`, puis tenu à jour par
+le flux de `pw-dump --monitor` : les listes (sinks, flux, combinaisons) sont
+servies depuis la mémoire sans lancer de processus. La sortie combinée est
+créée par libpipewire-module-combine-stream dans un processus pipewire
+dédié, au lieu de l'émulation de module-combine-sink par pipewire-pulse.
+"""
+
+import json
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+from audio_backend import (BackendError, Module, ServerEvent, Sink, SinkInput, SoundBackend,
+                           pactl_env, parse_module_arguments, resolve_description, run_concurrently)
+
+# Module PipeWire qui réalise la sortie combinée
+COMBINE_STREAM_MODULE = "libpipewire-module-combine-stream"
+
+# Propriété posée sur les nœuds combinés créés par Audio Combinator (liste des slaves)
+SLAVES_PROPERTY = "audio-combinator.slaves"
+
+_NODE = "PipeWire:Interface:Node"
+_LINK = "PipeWire:Interface:Link"
+_CLIENT = "PipeWire:Interface:Client"
+_METADATA = "PipeWire:Interface:Metadata"
+_SINK_CLASS = "Audio/Sink"
+_STREAM_CLASS = "Stream/Output/Audio"
+
+
+def pipewire_available():
+    """Vrai si un serveur PipeWire tourne et que ses outils sont installés"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    remote = os.environ.get("PIPEWIRE_REMOTE", "pipewire-0")
+    if not runtime_dir or not os.path.exists(os.path.join(runtime_dir, remote)):
+        return False
+    return all(shutil.which(tool) for tool in ("pw-dump", "pw-metadata", "wpctl", "pipewire"))
+
+
+def _props(obj):
+    # Les métadonnées portent leurs propriétés hors de "info"
+    return (obj.get("info") or {}).get("props") or obj.get("props") or {}
+
+
+def _removed(obj):
+    """pw-dump signale un objet retiré en ne redonnant que son id (le reste à null)"""
+    return all(value is None for key, value in obj.items() if key != "id")
+
+
+def _node_volume(info):
+    """Volume (pourcentage, échelle cubique comme pactl et wpctl) et sourdine d'un nœud"""
+    for params in (info.get("params") or {}).get("Props") or []:
+        if isinstance(params, dict) and "channelVolumes" in params:
+            values = [float(value) for value in params["channelVolumes"]] or [0.0]
+            linear = max(sum(values) / len(values), 0.0)
+            return int(round(linear ** (1.0 / 3.0) * 100)), bool(params.get("mute", False))
+    return 0, False
+
+
+def _latency_usec(value):
+    """node.latency = "1024/48000" -> 21333 µs"""
+    quantum, _, rate = str(value or "").partition("/")
+    if not (quantum.isdigit() and rate.isdigit() and int(rate)):
+        return 0
+    return int(int(quantum) * 1000000 / int(rate))
+
+
+def iter_json_arrays(lines):
+    """Tableaux JSON successifs écrits par `pw-dump --monitor`
+
+    pw-dump referme chaque tableau au début d'une ligne : on ne tente le
+    décodage qu'à ce moment-là, pas à chaque ligne reçue.
+    """
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if line[:1].isspace() or not line.rstrip().endswith("]"):
+            continue
+        try:
+            value = json.loads("".join(buffer))
+        except ValueError:
+            continue
+        buffer = []
+        if isinstance(value, list):
+            yield value
+
+
+class PipeWireGraph:
+    """Objets du graphe PipeWire (nœuds, liens, clients, métadonnées) par id"""
+
+    def __init__(self):
+        self.objects = {}
+        self._module_pids = {}  # id du nœud combiné -> pid du processus qui le porte
+        self._lock = threading.Lock()
+
+    def load(self, objects):
+        """Remplace le graphe par un instantané complet"""
+        with self._lock:
+            self.objects = {obj["id"]: obj for obj in objects if "id" in obj}
+            self._module_pids = {}
+            for obj in self.objects.values():
+                self._module_pid(obj)
+
+    def apply(self, objects):
+        """Applique une mise à jour du moniteur ; retourne les ServerEvent correspondants"""
+        changes = []
+        with self._lock:
+            for obj in objects:
+                index = obj.get("id")
+                if index is None:
+                    continue
+                if _removed(obj):
+                    previous = self.objects.pop(index, None)
+                    if previous is not None:
+                        changes.append(("remove", previous))
+                else:
+                    changes.append(("change" if index in self.objects else "new", obj))
+                    self.objects[index] = obj
+            # Les clients d'un même lot sont connus avant de chercher les pid
+            events = []
+            for kind, obj in changes:
+                events.extend(self._events(kind, obj))
+        return events
+
+    def _events(self, kind, obj):
+        props = _props(obj)
+        obj_type = obj.get("type")
+        if obj_type == _NODE:
+            media_class = props.get("media.class")
+            if media_class == _STREAM_CLASS:
+                return [ServerEvent(kind, "sink-input", obj["id"])]
+            if media_class != _SINK_CLASS:
+                return []
+            events = [ServerEvent(kind, "sink", obj["id"])]
+            if kind == "remove":
+                pid = self._module_pids.pop(obj["id"], None)
+            else:
+                known = obj["id"] in self._module_pids
+                pid = self._module_pid(obj)
+                kind = "change" if known else kind
+            if pid is not None and kind != "change":
+                events.append(ServerEvent(kind, "module", pid))
+            return events
+        if obj_type == _LINK:
+            # Un lien refait signale un flux déplacé
+            output = self.objects.get((obj.get("info") or {}).get("output-node-id"))
+            if output is not None and _props(output).get("media.class") == _STREAM_CLASS:
+                return [ServerEvent("change", "sink-input", output["id"])]
+            return []
+        if obj_type == _METADATA and props.get("metadata.name") == "default":
+            return [ServerEvent("change", "server")]
+        return []
+
+    def _client_pid(self, client_id):
+        client = self.objects.get(int(client_id)) if str(client_id).isdigit() else None
+        if client is None or client.get("type") != _CLIENT:
+            return None
+        pid = str(_props(client).get("application.process.id", ""))
+        return int(pid) if pid.isdigit() else None
+
+    def _module_pid(self, obj):
+        """pid du processus portant un nœud combiné d'Audio Combinator (None sinon)"""
+        props = _props(obj)
+        if obj.get("type") != _NODE or SLAVES_PROPERTY not in props:
+            return None
+        pid = self._client_pid(props.get("client.id"))
+        if pid is not None:
+            self._module_pids[obj["id"]] = pid
+        return pid
+
+    def _nodes(self, media_class):
+        return [obj for obj in self.objects.values()
+                if obj.get("type") == _NODE and _props(obj).get("media.class") == media_class]
+
+    def node(self, name):
+        """Nœud de sortie portant ce node.name, ou None"""
+        with self._lock:
+            return next((obj for obj in self._nodes(_SINK_CLASS)
+                         if _props(obj).get("node.name") == name), None)
+
+    def default_sink(self):
+        """Nom de la sortie par défaut, d'après la métadonnée "default" de la session"""
+        with self._lock:
+            for obj in self.objects.values():
+                if obj.get("type") != _METADATA or _props(obj).get("metadata.name") != "default":
+                    continue
+                for entry in obj.get("metadata") or []:
+                    if entry.get("key") == "default.audio.sink" and isinstance(entry.get("value"), dict):
+                        return entry["value"].get("name")
+            return None
+
+    def sinks(self):
+        with self._lock:
+            sinks = []
+            for obj in self._nodes(_SINK_CLASS):
+                info = obj.get("info") or {}
+                props = _props(obj)
+                name = props.get("node.name", "")
+                volume, muted = _node_volume(info)
+                sinks.append(Sink(
+                    index=int(obj["id"]),
+                    name=name,
+                    description=resolve_description(props.get("node.description"), props, name),
+                    volume=volume,
+                    muted=muted,
+                    state=str(info.get("state", "")).upper(),
+                    monitor_source=f"{name}.monitor",
+                    owner_module=self._module_pids.get(obj["id"]),
+                    configured_latency_usec=_latency_usec(props.get("node.latency")),
+                    properties=props,
+                ))
+            return sinks
+
+    def sink_inputs(self):
+        with self._lock:
+            targets = {}
+            for obj in self.objects.values():
+                if obj.get("type") == _LINK:
+                    info = obj.get("info") or {}
+                    targets[info.get("output-node-id")] = info.get("input-node-id")
+            # Les flux internes des sorties combinées ne sont pas des lectures d'applications
+            combine_clients = {str(_props(self.objects[index]).get("client.id"))
+                               for index in self._module_pids if index in self.objects}
+            sink_inputs = []
+            for obj in self._nodes(_STREAM_CLASS):
+                props = _props(obj)
+                client = str(props.get("client.id", ""))
+                if client in combine_clients:
+                    continue
+                volume, muted = _node_volume(obj.get("info") or {})
+                sink_inputs.append(SinkInput(
+                    index=int(obj["id"]),
+                    sink=targets.get(obj["id"]),
+                    client=int(client) if client.isdigit() else None,
+                    properties=props,
+                    volume=volume,
+                    muted=muted,
+                ))
+            return sink_inputs
+
+    def modules(self):
+        """Sorties combinées présentes, décrites comme des module-combine-sink"""
+        with self._lock:
+            modules = []
+            for index, pid in sorted(self._module_pids.items()):
+                props = _props(self.objects.get(index, {}))
+                modules.append(Module(pid, "module-combine-sink",
+                                      f"sink_name=\"{props.get('node.name', '')}\" "
+                                      f"slaves=\"{props.get(SLAVES_PROPERTY, '')}\""))
+            return modules
+
+
+class PipeWireBackend(SoundBackend):
+    """Pilotage direct de PipeWire
+
+    Le graphe vient d'un processus `pw-dump --monitor` de longue durée, lancé
+    à la première requête : son premier tableau est l'instantané complet, les
+    suivants les changements, dont sont tirés les événements des abonnés.
+    Volumes, sourdines et sortie par défaut passent par wpctl, les
+    déplacements de flux par la métadonnée target.object.
+
+    load_module("module-combine-sink", ...) lance `pipewire -c` avec une
+    configuration chargeant libpipewire-module-combine-stream (compensation
+    de latence de PipeWire au lieu de adjust_time/resample_method, ignorés) ;
+    l'index du « module » est le pid de ce processus, détaché pour survivre
+    à l'application comme un module du serveur.
+    """
+
+    name = "pipewire"
+
+    def __init__(self, pw_dump="pw-dump", wpctl="wpctl", pw_metadata="pw-metadata",
+                 pipewire="pipewire", timeout=2.0):
+        self.pw_dump = pw_dump
+        self.wpctl = wpctl
+        self.pw_metadata = pw_metadata
+        self.pipewire = pipewire
+        self.timeout = timeout
+        self.graph = PipeWireGraph()
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+        self.config_dir = os.path.join(runtime_dir, "audio-combinator", "pipewire")
+        self._synced = threading.Event()
+        self._monitor = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def run(self, program, *args):
+        """Exécute un outil PipeWire (sans shell) et retourne sa sortie standard"""
+        try:
+            result = subprocess.run(
+                [program] + [str(arg) for arg in args],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                universal_newlines=True, env=pactl_env()
+            )
+        except OSError as e:
+            raise BackendError(str(e))
+        if result.returncode != 0:
+            raise BackendError(result.stderr.strip() or f"{os.path.basename(program)} a échoué")
+        return result.stdout
+
+    # Graphe
+
+    def _ensure_graph(self):
+        """Démarre le moniteur au premier appel ; instantané ponctuel s'il ne répond pas"""
+        with self._lock:
+            first = self._monitor is None
+            if first:
+                self._monitor = PipeWireMonitor(self.pw_dump, self._on_snapshot, self._on_update)
+                self._monitor.start()
+        if self._synced.wait(self.timeout if first else 0):
+            return
+        try:
+            self.graph.load(json.loads(self.run(self.pw_dump)))
+        except ValueError as e:
+            raise BackendError(f"Sortie de pw-dump illisible: {e}")
+
+    def _on_snapshot(self, objects):
+        if objects is None:
+            # Moniteur arrêté : les listes repasseront par un instantané
+            self._synced.clear()
+            return
+        self.graph.load(objects)
+        self._synced.set()
+        self._dispatch([ServerEvent("resync", "server")])
+
+    def _on_update(self, objects):
+        self._dispatch(self.graph.apply(objects))
+
+    def _dispatch(self, events):
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for event in events:
+            for callback in callbacks:
+                callback(event)
+
+    def _node_id(self, sink_name):
+        self._ensure_graph()
+        node = self.graph.node(sink_name)
+        if node is None:
+            raise BackendError(f"No such entity: {sink_name}")
+        return node["id"]
+
+    def _wait_for(self, condition):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.02)
+        return condition()
+
+    # Interface SoundBackend
+
+    def list_sinks(self):
+        self._ensure_graph()
+        return self.graph.sinks()
+
+    def list_modules(self):
+        self._ensure_graph()
+        return self.graph.modules()
+
+    def list_sink_inputs(self):
+        self._ensure_graph()
+        return self.graph.sink_inputs()
+
+    def set_sink_volume(self, sink_name, volume_percent):
+        self.run(self.wpctl, "set-volume", self._node_id(sink_name), f"{volume_percent / 100.0:.2f}")
+
+    def set_sink_mute(self, sink_name, muted):
+        self.run(self.wpctl, "set-mute", self._node_id(sink_name), "1" if muted else "0")
+
+    def set_sink_input_volume(self, sink_input_id, volume_percent):
+        self.run(self.wpctl, "set-volume", sink_input_id, f"{volume_percent / 100.0:.2f}")
+
+    def set_sink_input_mute(self, sink_input_id, muted):
+        self.run(self.wpctl, "set-mute", sink_input_id, "1" if muted else "0")
+
+    def set_default_sink(self, sink_name):
+        self.run(self.wpctl, "set-default", self._node_id(sink_name))
+
+    def get_default_sink(self):
+        self._ensure_graph()
+        return self.graph.default_sink()
+
+    def move_sink_input(self, sink_input_id, sink_name):
+        self._ensure_graph()
+        node = self.graph.node(sink_name)
+        if node is None:
+            raise BackendError(f"No such entity: {sink_name}")
+        target = _props(node).get("object.serial", sink_name)
+        self.run(self.pw_metadata, sink_input_id, "target.object", target)
+
+    def move_sink_inputs(self, sink_input_ids, sink_name):
+        """Un pw-metadata par flux, lancés ensemble"""
+        self._ensure_graph()
+        node = self.graph.node(sink_name)
+        if node is None:
+            raise BackendError(f"No such entity: {sink_name}")
+        target = _props(node).get("object.serial", sink_name)
+        run_concurrently([(self.pw_metadata, sink_input_id, "target.object", target)
+                          for sink_input_id in sink_input_ids])
+
+    def load_module(self, name, argument=""):
+        if name != "module-combine-sink":
+            raise BackendError(f"Module non pris en charge par le backend PipeWire: {name}")
+        arguments = parse_module_arguments(argument)
+        sink_name = arguments.get("sink_name")
+        slaves = [slave for slave in arguments.get("slaves", "").split(",") if slave]
+        if not sink_name or not slaves:
+            raise BackendError("sink_name et slaves sont requis")
+        self._ensure_graph()
+        for slave in slaves:
+            if self.graph.node(slave) is None:
+                raise BackendError(f"No such entity: {slave}")
+
+        os.makedirs(self.config_dir, exist_ok=True)
+        config_path = os.path.join(self.config_dir, f"{sink_name}.conf")
+        log_path = os.path.join(self.config_dir, f"{sink_name}.log")
+        with open(config_path, "w", encoding="utf-8") as f:
+            # Le SPA-JSON des configurations PipeWire accepte le JSON strict
+            json.dump(combine_stream_config(sink_name, slaves), f, indent=2, ensure_ascii=False)
+        try:
+            with open(log_path, "w", encoding="utf-8") as log:
+                process = subprocess.Popen([self.pipewire, "-c", config_path],
+                                           stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+                                           start_new_session=True)
+        except OSError as e:
+            raise BackendError(str(e))
+
+        def ready():
+            if process.poll() is not None:
+                return True
+            # Sans flux du moniteur, le graphe ne bouge que par un nouvel instantané
+            self._ensure_graph()
+            return any(module.index == process.pid for module in self.graph.modules())
+        if not self._wait_for(ready) or process.poll() is not None:
+            if process.poll() is None:
+                process.terminate()
+            process.wait()
+            self._remove_files(sink_name)
+            raise BackendError(f"{COMBINE_STREAM_MODULE} n'a pas créé {sink_name}")
+        return process.pid
+
+    def unload_module(self, module_id):
+        self._ensure_graph()
+        module = next((module for module in self.graph.modules()
+                       if str(module.index) == str(module_id)), None)
+        if module is None:
+            raise BackendError(f"No such entity: module {module_id}")
+        try:
+            os.kill(int(module.index), signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        except PermissionError as e:
+            raise BackendError(str(e))
+        def gone():
+            self._ensure_graph()
+            return all(other.index != module.index for other in self.graph.modules())
+        self._wait_for(gone)
+        sink_name = parse_module_arguments(module.argument).get("sink_name")
+        if sink_name:
+            self._remove_files(sink_name)
+
+    def _remove_files(self, sink_name):
+        for extension in (".conf", ".log"):
+            try:
+                os.remove(os.path.join(self.config_dir, sink_name + extension))
+            except FileNotFoundError:
+                pass
+
+    def subscribe(self, callback):
+        self._ensure_graph()
+        with self._lock:
+            self._callbacks.append(callback)
+        if self._synced.is_set():
+            # Le resync de connexion est livré comme les autres événements, hors de l'appelant
+            threading.Thread(target=callback, args=(ServerEvent("resync", "server"),),
+                             daemon=True).start()
+        return _PipeWireSubscription(self, callback)
+
+    def close(self):
+        with self._lock:
+            monitor, self._monitor = self._monitor, None
+            self._callbacks = []
+        if monitor:
+            monitor.stop()
+        self._synced.clear()
+
+
+def combine_stream_config(sink_name, slaves, description="Sortie simultanée"):
+    """Configuration de `pipewire -c` : un client portant la sortie combinée"""
+    return {
+        "context.properties": {"log.level": 1},
+        "context.spa-libs": {
+            "audio.convert.*": "audioconvert/libspa-audioconvert",
+            "support.*": "support/libspa-support",
+        },
+        "context.modules": [
+            {"name": "libpipewire-module-rt", "flags": ["ifexists", "nofail"]},
+            {"name": "libpipewire-module-protocol-native"},
+            {"name": "libpipewire-module-client-node"},
+            {"name": "libpipewire-module-adapter"},
+            {"name": COMBINE_STREAM_MODULE, "args": {
+                "combine.mode": "sink",
+                "node.name": sink_name,
+                "node.description": description,
+                # PipeWire retarde les sorties rapides pour les aligner sur la plus lente
+                "combine.latency-compensate": True,
+                "combine.props": {"audio.position": ["FL", "FR"],
+                                  SLAVES_PROPERTY: ",".join(slaves)},
+                "stream.props": {},
+                "stream.rules": [{
+                    "matches": [{"media.class": _SINK_CLASS, "node.name": slave} for slave in slaves],
+                    "actions": {"create-stream": {}},
+                }],
+            }},
+        ],
+    }
+
+
+class PipeWireMonitor:
+    """Processus `pw-dump --monitor` de longue durée
+
+    on_snapshot(objets) reçoit le premier tableau de chaque connexion
+    (instantané complet), puis None quand le processus s'arrête ;
+    on_update(objets) reçoit les changements. Le processus est relancé si
+    le serveur redémarre.
+    """
+
+    def __init__(self, pw_dump, on_snapshot, on_update, retry_delay=1.0):
+        self.pw_dump = pw_dump
+        self.on_snapshot = on_snapshot
+        self.on_update = on_update
+        self.retry_delay = retry_delay
+        self.running = False
+        self.process = None
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def _run(self):
+        while self.running:
+            try:
+                self.process = subprocess.Popen(
+                    [self.pw_dump, "--monitor"],
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                    universal_newlines=True, env=pactl_env()
+                )
+            except OSError:
+                self.process = None
+            else:
+                first = True
+                for objects in iter_json_arrays(self.process.stdout):
+                    if first:
+                        self.on_snapshot(objects)
+                        first = False
+                    else:
+                        self.on_update(objects)
+                self.process.wait()
+                self.on_snapshot(None)
+            if self.running:
+                time.sleep(self.retry_delay)
+
+
+class _PipeWireSubscription:
+    """Poignée d'un abonnement aux changements du graphe"""
+
+    def __init__(self, backend, callback):
+        self.backend = backend
+        self.callback = callback
+
+    def stop(self):
+        with self.backend._lock:
+            if self.callback in self.backend._callbacks:
+                self.backend._callbacks.remove(self.callback)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Enregistrement de la sortie combinée d'Audio Combinator
+Copie sur disque de ce qui joue sur la sortie combinée, lue sur sa source
+de monitor par parec et découpée en segments WAV ou FLAC. La capture remplit
+un tampon circulaire alloué une fois pour toutes, vidé par un thread
+d'écriture : la mémoire reste bornée et un disque trop lent fait perdre des
+blocs (comptés) au lieu de bloquer la capture ou l'interface.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from datetime import datetime
+
+# Format d'enregistrement : 16 bits signés little-endian
+RECORD_RATE = 48000
+RECORD_CHANNELS = 2
+SAMPLE_BYTES = 2
+
+BLOCK_FRAMES = 4800   # 100 ms à 48 kHz
+RING_BLOCKS = 64      # 6,4 s d'avance possible sur le disque
+
+RECORD_FORMATS = ("wav", "flac")
+
+# Délai avant de relancer la capture (source disparue pendant une reconfiguration)
+RESTART_DELAY = 0.5
+
+
+def default_recording_dir():
+    """Répertoire des enregistrements : AUDIO_COMBINATOR_RECORD_DIR, sinon ~/Music/Audio Combinator"""
+    return os.environ.get("AUDIO_COMBINATOR_RECORD_DIR") or \
+        os.path.join(os.path.expanduser("~/Music"), "Audio Combinator")
+
+
+class RingBuffer:
+    """Tampon circulaire de blocs de taille fixe (un producteur, un consommateur)
+
+    Le producteur lit directement dans l'emplacement libre suivant ;
+    head et tail comptent les blocs depuis le début, leur différence est
+    l'occupation du tampon.
+    """
+
+    def __init__(self, blocks, block_bytes):
+        self.blocks = blocks
+        self.block_bytes = block_bytes
+        self.buffer = bytearray(blocks * block_bytes)
+        self.view = memoryview(self.buffer)
+        self.lengths = [0] * blocks
+        self.head = 0
+        self.tail = 0
+        self.high_water = 0  # occupation maximale atteinte
+        self.condition = threading.Condition()
+
+    def _slot(self, number):
+        start = (number % self.blocks) * self.block_bytes
+        return self.view[start:start + self.block_bytes]
+
+    def free_slot(self):
+        """Emplacement à remplir, ou None si le tampon est plein"""
+        with self.condition:
+            if self.head - self.tail >= self.blocks:
+                return None
+            return self._slot(self.head)
+
+    def commit(self, length):
+        """Publie l'emplacement rempli par le producteur"""
+        with self.condition:
+            self.lengths[self.head % self.blocks] = length
+            self.head += 1
+            self.high_water = max(self.high_water, self.head - self.tail)
+            self.condition.notify()
+
+    def next_block(self, timeout=None):
+        """Bloc le plus ancien (vue sur le tampon), ou None ; release() une fois écrit"""
+        with self.condition:
+            if self.tail == self.head:
+                self.condition.wait(timeout)
+            if self.tail == self.head:
+                return None
+            return self._slot(self.tail)[:self.lengths[self.tail % self.blocks]]
+
+    def release(self):
+        with self.condition:
+            self.tail += 1
+
+    def __len__(self):
+        with self.condition:
+            return self.head - self.tail
+
+
+class _WavSegment:
+    """Segment WAV ; l'en-tête est tenu à jour à chaque bloc (fichier lisible après un plantage)"""
+
+    def __init__(self, path, rate, channels, flac=None):
+        self.file = wave.open(path, "wb")
+        self.file.setnchannels(channels)
+        self.file.setsampwidth(SAMPLE_BYTES)
+        self.file.setframerate(rate)
+
+    def write(self, data):
+        self.file.writeframes(data)
+
+    def close(self):
+        self.file.close()
+
+
+class _FlacSegment:
+    """Segment FLAC, encodé au fil de l'eau par l'outil flac"""
+
+    def __init__(self, path, rate, channels, flac="flac"):
+        self.process = subprocess.Popen(
+            [flac, "--silent", "--force", "--force-raw-format", "--endian=little", "--sign=signed",
+             f"--channels={channels}", f"--bps={SAMPLE_BYTES * 8}", f"--sample-rate={rate}",
+             "-o", path, "-"],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def write(self, data):
+        self.process.stdin.write(data)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+
+
+_SEGMENT_TYPES = {"wav": _WavSegment, "flac": _FlacSegment}
+
+
+class Recorder:
+    """Enregistre une source de monitor en segments successifs
+
+    segment_seconds et segment_bytes déclenchent le passage au fichier
+    suivant (le premier atteint ; None pour ignorer un critère). La durée est
+    celle de l'audio écrit, pas celle de l'horloge. Les compteurs de stats()
+    peuvent être lus à tout moment depuis un autre thread.
+    """
+
+    def __init__(self, source, directory, prefix="combined", file_format="wav",
+                 segment_seconds=3600, segment_bytes=None, rate=RECORD_RATE,
+                 channels=RECORD_CHANNELS, ring_blocks=RING_BLOCKS, block_frames=BLOCK_FRAMES,
+                 parec="parec", flac="flac"):
+        if file_format not in RECORD_FORMATS:
+            raise ValueError(f"Format d'enregistrement inconnu: {file_format}")
+        if file_format == "flac" and shutil.which(flac) is None:
+            raise ValueError("Encodeur flac introuvable")
+        os.makedirs(directory, exist_ok=True)
+        self.source = source
+        self.directory = directory
+        self.prefix = prefix
+        self.file_format = file_format
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_bytes
+        self.rate = rate
+        self.channels = channels
+        self.parec = parec
+        self.flac = flac
+        self.frame_bytes = channels * SAMPLE_BYTES
+        self.ring = RingBuffer(ring_blocks, block_frames * self.frame_bytes)
+        # Emplacement où lire (et perdre) l'audio quand le tampon est plein
+        self._scratch = memoryview(bytearray(self.ring.block_bytes))
+
+        self.captured_blocks = 0
+        self.dropped_blocks = 0
+        self.dropped_bytes = 0
+        self.written_bytes = 0
+        self.restarts = 0
+        self.segments = []
+        self.error = None
+        self.started = time.time()
+
+        self.running = True
+        self.process = None
+        self.capture_thread = threading.Thread(target=self._capture, daemon=True)
+        self.writer_thread = threading.Thread(target=self._write, daemon=True)
+        self.writer_thread.start()
+        self.capture_thread.start()
+
+    def stop(self, timeout=5.0):
+        """Arrête la capture, écrit ce qui reste dans le tampon et ferme le segment"""
+        self.running = False
+        process = self.process
+        if process and process.poll() is None:
+            process.terminate()
+        self.capture_thread.join(timeout)
+        self.writer_thread.join(timeout)
+        return self.stats()
+
+    def stats(self):
+        bytes_per_second = self.rate * self.frame_bytes
+        with self.ring.condition:
+            dropped_blocks, dropped_bytes = self.dropped_blocks, self.dropped_bytes
+        return {
+            "source": self.source,
+            "format": self.file_format,
+            "file": self.segments[-1] if self.segments else None,
+            "segments": len(self.segments),
+            "seconds": round(self.written_bytes / bytes_per_second, 1),
+            "written_bytes": self.written_bytes,
+            "captured_blocks": self.captured_blocks,
+            "dropped_blocks": dropped_blocks,
+            "dropped_bytes": dropped_bytes,
+            "ring_blocks": self.ring.blocks,
+            "ring_high_water": self.ring.high_water,
+            "restarts": self.restarts,
+            "error": self.error,
+        }
+
+    def _drop(self, length):
+        """Compte un bloc perdu ; la capture et l'écriture en perdent toutes deux"""
+        with self.ring.condition:
+            self.dropped_blocks += 1
+            self.dropped_bytes += length
+
+    def _fill(self, stream, target):
+        """Remplit un bloc depuis parec ; retourne le nombre d'octets (trames entières)"""
+        filled = 0
+        while filled < len(target):
+            count = stream.readinto(target[filled:])
+            if not count:
+                break
+            filled += count
+        return filled - filled % self.frame_bytes
+
+    def _capture(self):
+        while self.running:
+            try:
+                self.process = subprocess.Popen(
+                    [self.parec, f"--device={self.source}", "--format=s16le", f"--rate={self.rate}",
+                     f"--channels={self.channels}", "--dont-move"],
+                    stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            except OSError as e:
+                self.error = str(e)
+                self.running = False
+                break
+            stream = self.process.stdout
+            while self.running:
+                slot = self.ring.free_slot()
+                length = self._fill(stream, slot if slot is not None else self._scratch)
+                if not length:
+                    break
+                if slot is None:
+                    self._drop(length)
+                else:
+                    self.ring.commit(length)
+                    self.captured_blocks += 1
+            self.process.wait()
+            if self.running:
+                # Source disparue (module rechargé) : reprendre dès qu'elle revient
+                self.restarts += 1
+                time.sleep(RESTART_DELAY)
+        with self.ring.condition:
+            self.ring.condition.notify()
+
+    def _write(self):
+        segment = None
+        segment_written = 0
+        bytes_per_second = self.rate * self.frame_bytes
+        while True:
+            block = self.ring.next_block(timeout=0.5)
+            if block is None:
+                if not self.running and not len(self.ring):
+                    break
+                continue
+            try:
+                full = (self.segment_bytes and segment_written >= self.segment_bytes) or \
+                       (self.segment_seconds and segment_written >= self.segment_seconds * bytes_per_second)
+                if segment is None or full:
+                    if segment is not None:
+                        segment.close()
+                    segment, segment_written = self._open_segment(), 0
+                segment.write(block)
+                segment_written += len(block)
+                self.written_bytes += len(block)
+            except OSError as e:
+                # Disque plein, répertoire retiré... : le bloc est perdu, nouveau segment au suivant
+                self.error = str(e)
+                self._drop(len(block))
+                if segment is not None:
+                    try:
+                        segment.close()
+                    except OSError:
+                        pass
+                segment = None
+            finally:
+                self.ring.release()
+        if segment is not None:
+            try:
+                segment.close()
+            except OSError as e:
+                self.error = str(e)
+
+    def _open_segment(self):
+        name = f"{self.prefix}-{datetime.now():%Y%m%d-%H%M%S}-{len(self.segments) + 1:03d}.{self.file_format}"
+        path = os.path.join(self.directory, name)
+        segment = _SEGMENT_TYPES[self.file_format](path, self.rate, self.channels, self.flac)
+        self.segments.append(path)
+        return segment
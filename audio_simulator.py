@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serveur sonore simulé d'Audio Combinator
+Backend en mémoire (sinks, modules, sink-inputs, volumes, événements) pour
+les essais de charge et le développement sans matériel audio, avec latence
+par appel et injection d'erreurs configurables.
+"""
+
+import dataclasses
+import queue
+import random
+import threading
+import time
+from collections import Counter
+
+from audio_backend import (BackendError, Module, ServerEvent, Sink, SinkInput, SoundBackend,
+                           parse_module_arguments)
+
+
+class SimulatedBackend(SoundBackend):
+    """Serveur sonore entièrement simulé en mémoire
+
+    latency : délai (secondes) de chaque appel, ou dict opération -> délai.
+    failure_rate : probabilité qu'un appel échoue avec BackendError.
+    inject_failure(operation, count) fait échouer les prochains appels d'une
+    opération. calls compte les appels par opération.
+    """
+
+    name = "simulated"
+
+    def __init__(self, sink_count=4, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.failures = Counter()
+        self._pending_failures = Counter()
+        self._lock = threading.RLock()
+        self._subscriptions = []
+        self._sinks = {}          # nom -> Sink
+        self._modules = {}        # index -> Module
+        self._sink_inputs = {}    # index -> SinkInput
+        self._next_index = {"sink": 0, "module": 0, "sink-input": 0}
+        self.default_sink = None
+
+        hardware = self._new_module("module-udev-detect", "")
+        for number in range(1, sink_count + 1):
+            self.add_sink(f"sim_output.{number}", f"Sortie simulée {number}",
+                          latency_usec=5000 * number, owner_module=hardware.index)
+
+    # Manipulation directe du serveur (branchements, flux de lecture)
+
+    def add_sink(self, name, description=None, latency_usec=20000, owner_module=None):
+        """Ajoute un sink, comme le branchement d'un périphérique"""
+        with self._lock:
+            if name in self._sinks:
+                raise BackendError(f"Le sink {name} existe déjà")
+            sink = Sink(index=self._allocate("sink"), name=name, description=description or name,
+                        volume=100, state="IDLE", monitor_source=f"{name}.monitor",
+                        owner_module=owner_module, configured_latency_usec=latency_usec,
+                        properties={"device.description": description or name})
+            self._sinks[name] = sink
+            if self.default_sink is None:
+                self.default_sink = name
+        self._emit("new", "sink", sink.index)
+        return dataclasses.replace(sink)
+
+    def remove_sink(self, name):
+        """Retire un sink, comme le débranchement d'un périphérique"""
+        with self._lock:
+            sink = self._sinks.pop(name, None)
+            if sink is None:
+                raise BackendError(f"No such entity: {name}")
+            self._rescue_sink_inputs(sink)
+            if self.default_sink == name:
+                self.default_sink = next(iter(self._sinks), None)
+        self._emit("remove", "sink", sink.index)
+
+    def add_sink_input(self, sink_name=None, client=None, properties=None):
+        """Ajoute un flux de lecture sur un sink (par défaut, le sink par défaut)"""
+        with self._lock:
+            sink = self._sink(sink_name or self.default_sink)
+            sink_input = SinkInput(index=self._allocate("sink-input"), sink=sink.index,
+                                   client=client, properties=dict(properties or {}),
+                                   volume=100, muted=False)
+            self._sink_inputs[sink_input.index] = sink_input
+            sink.state = "RUNNING"
+        self._emit("new", "sink-input", sink_input.index)
+        return dataclasses.replace(sink_input)
+
+    def remove_sink_input(self, index):
+        with self._lock:
+            if self._sink_inputs.pop(int(index), None) is None:
+                raise BackendError(f"No such entity: {index}")
+        self._emit("remove", "sink-input", int(index))
+
+    def inject_failure(self, operation, count=1):
+        """Fait échouer les `count` prochains appels de l'opération"""
+        with self._lock:
+            self._pending_failures[operation] += count
+
+    # Interface SoundBackend
+
+    def list_sinks(self):
+        self._call("list_sinks")
+        with self._lock:
+            return [dataclasses.replace(sink, properties=dict(sink.properties))
+                    for sink in self._sinks.values()]
+
+    def list_modules(self):
+        self._call("list_modules")
+        with self._lock:
+            return [dataclasses.replace(module) for module in self._modules.values()]
+
+    def list_sink_inputs(self):
+        self._call("list_sink_inputs")
+        with self._lock:
+            return [dataclasses.replace(sink_input, properties=dict(sink_input.properties))
+                    for sink_input in self._sink_inputs.values()]
+
+    def set_sink_volume(self, sink_name, volume_percent):
+        self._call("set_sink_volume")
+        with self._lock:
+            sink = self._sink(sink_name)
+            sink.volume = int(round(volume_percent))
+        self._emit("change", "sink", sink.index)
+
+    def set_sink_mute(self, sink_name, muted):
+        self._call("set_sink_mute")
+        with self._lock:
+            sink = self._sink(sink_name)
+            sink.muted = bool(muted)
+        self._emit("change", "sink", sink.index)
+
+    def apply_sink_states(self, states):
+        """Un seul appel pour tout le lot, comme le backend natif"""
+        self._call("apply_sink_states")
+        changed = []
+        with self._lock:
+            for state in states:
+                sink = self._sink(state.name)
+                if state.volume is not None:
+                    sink.volume = int(round(state.volume))
+                if state.muted is not None:
+                    sink.muted = bool(state.muted)
+                changed.append(sink.index)
+        for index in changed:
+            self._emit("change", "sink", index)
+
+    def set_sink_input_volume(self, sink_input_id, volume_percent):
+        self._call("set_sink_input_volume")
+        with self._lock:
+            self._sink_input(sink_input_id).volume = int(round(volume_percent))
+        self._emit("change", "sink-input", int(sink_input_id))
+
+    def set_sink_input_mute(self, sink_input_id, muted):
+        self._call("set_sink_input_mute")
+        with self._lock:
+            self._sink_input(sink_input_id).muted = bool(muted)
+        self._emit("change", "sink-input", int(sink_input_id))
+
+    def load_module(self, name, argument=""):
+        self._call("load_module")
+        arguments = parse_module_arguments(argument)
+        with self._lock:
+            if name == "module-combine-sink":
+                slaves = [slave for slave in arguments.get("slaves", "").split(",") if slave]
+                for slave in slaves:
+                    self._sink(slave)
+            module = self._new_module(name, argument)
+        self._emit("new", "module", module.index)
+
+        if name in ("module-combine-sink", "module-null-sink"):
+            sink_name = arguments.get("sink_name") or f"{name}.{module.index}"
+            self.add_sink(sink_name, "Sortie simultanée" if name == "module-combine-sink" else sink_name,
+                          latency_usec=0, owner_module=module.index)
+        return module.index
+
+    def unload_module(self, module_id):
+        self._call("unload_module")
+        with self._lock:
+            module = self._modules.pop(int(module_id), None)
+            if module is None:
+                raise BackendError(f"No such entity: module {module_id}")
+            owned = [sink.name for sink in self._sinks.values() if sink.owner_module == module.index]
+        for sink_name in owned:
+            self.remove_sink(sink_name)
+        self._emit("remove", "module", module.index)
+
+    def set_default_sink(self, sink_name):
+        self._call("set_default_sink")
+        with self._lock:
+            self._sink(sink_name)
+            self.default_sink = sink_name
+        self._emit("change", "server")
+
+    def get_default_sink(self):
+        self._call("get_default_sink")
+        with self._lock:
+            return self.default_sink
+
+    def move_sink_input(self, sink_input_id, sink_name):
+        self._call("move_sink_input")
+        self._move(sink_input_id, sink_name)
+
+    def move_sink_inputs(self, sink_input_ids, sink_name):
+        """Un seul appel pour tout le lot, comme le backend natif"""
+        self._call("move_sink_inputs")
+        for sink_input_id in sink_input_ids:
+            self._move(sink_input_id, sink_name)
+
+    def _move(self, sink_input_id, sink_name):
+        with self._lock:
+            sink = self._sink(sink_name)
+            self._sink_input(sink_input_id).sink = sink.index
+        self._emit("change", "sink-input", int(sink_input_id))
+
+    def subscribe(self, callback):
+        subscription = _SimulatedSubscription(self, callback)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        subscription.events.put(ServerEvent("resync", "server"))
+        return subscription
+
+    def close(self):
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription.stop()
+
+    # Interne
+
+    def _call(self, operation):
+        """Comptabilise un appel, applique la latence et les erreurs injectées"""
+        delay = self.latency.get(operation, 0.0) if isinstance(self.latency, dict) else self.latency
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.calls[operation] += 1
+            fail = self._pending_failures[operation] > 0
+            if fail:
+                self._pending_failures[operation] -= 1
+            elif self.failure_rate:
+                fail = self.random.random() < self.failure_rate
+            if fail:
+                self.failures[operation] += 1
+        if fail:
+            raise BackendError(f"Échec simulé: {operation}")
+
+    def _allocate(self, kind):
+        self._next_index[kind] += 1
+        return self._next_index[kind]
+
+    def _new_module(self, name, argument):
+        module = Module(self._allocate("module"), name, argument)
+        self._modules[module.index] = module
+        return module
+
+    def _sink(self, name_or_index):
+        sink = self._sinks.get(name_or_index)
+        if sink is None:
+            sink = next((sink for sink in self._sinks.values()
+                         if str(sink.index) == str(name_or_index)), None)
+        if sink is None:
+            raise BackendError(f"No such entity: {name_or_index}")
+        return sink
+
+    def _sink_input(self, index):
+        with self._lock:
+            sink_input = self._sink_inputs.get(int(index))
+        if sink_input is None:
+            raise BackendError(f"No such entity: sink-input {index}")
+        return sink_input
+
+    def _rescue_sink_inputs(self, removed):
+        """Déplace les flux d'un sink retiré vers un autre sink, comme le serveur"""
+        fallback = next((sink for sink in self._sinks.values() if sink.name == self.default_sink), None)
+        fallback = fallback or next(iter(self._sinks.values()), None)
+        for sink_input in list(self._sink_inputs.values()):
+            if sink_input.sink == removed.index:
+                if fallback is None:
+                    del self._sink_inputs[sink_input.index]
+                else:
+                    sink_input.sink = fallback.index
+
+    def _emit(self, kind, facility, index=None):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.events.put(ServerEvent(kind, facility, index))
+
+
+class _SimulatedSubscription:
+    """Abonnement aux événements simulés, livrés depuis un thread dédié"""
+
+    def __init__(self, backend, callback):
+        self.backend = backend
+        self.callback = callback
+        self.events = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.backend._lock:
+            if self in self.backend._subscriptions:
+                self.backend._subscriptions.remove(self)
+        self.events.put(None)
+
+    def _run(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            self.callback(event)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Flux de lecture d'Audio Combinator
+Index des sink-inputs tenu à jour par les événements du serveur, et règles
+de routage par application (« jeu -> sortie combinée, visio -> casque seul »)
+"""
+
+import dataclasses
+import fnmatch
+import threading
+import time
+
+from audio_backend import BackendError
+
+
+@dataclasses.dataclass
+class RoutingRule:
+    """Envoie les flux d'une application vers une sortie
+
+    application : motif (jokers * et ?, sans casse) comparé au nom de
+    l'application et à celui de son exécutable. target : nom technique d'un
+    sink, "combined" ou "combined:<zone>". volume : volume du flux à
+    appliquer en le routant (None pour ne pas y toucher).
+    """
+    application: str
+    target: str
+    volume: int = None
+
+    def matches(self, sink_input):
+        pattern = self.application.lower()
+        return any(fnmatch.fnmatchcase(value.lower(), pattern)
+                   for value in (sink_input.properties.get("application.name", ""),
+                                 sink_input.properties.get("application.process.binary", ""))
+                   if value)
+
+    def to_dict(self):
+        return {key: value for key, value in dataclasses.asdict(self).items() if value is not None}
+
+    @classmethod
+    def from_dict(cls, data):
+        volume = data.get("volume")
+        return cls(str(data["application"]), str(data["target"]),
+                   int(volume) if volume is not None else None)
+
+
+def match_rule(rules, sink_input):
+    """Première règle qui s'applique au flux, ou None"""
+    return next((rule for rule in rules if rule.matches(sink_input)), None)
+
+
+def stream_selection(value):
+    """Choix des flux à amener sur la sortie combinée (préréglage, requête)
+
+    true -> tous les flux ; {"applications": [...], "sinks": [...]} -> filtres
+    (listes ou chaînes séparées par des virgules) ; faux ou absent -> None.
+    """
+    if not value:
+        return None
+    if value is True:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f"Choix de flux invalide: {value!r}")
+    selection = {}
+    for key in ("applications", "sinks"):
+        items = value.get(key) or []
+        if isinstance(items, str):
+            items = items.split(",")
+        selection[key] = [str(item).strip() for item in items if str(item).strip()]
+    return selection
+
+
+class StreamIndex:
+    """Index des flux de lecture, sans relecture de la table à chaque recherche
+
+    Une suppression signalée par le serveur est appliquée directement ; une
+    création ou une modification demande une relecture, faite par un thread
+    dédié et regroupée : les événements arrivés pendant `settle` secondes ne
+    coûtent qu'un seul list_sink_inputs. on_update(added, removed) est
+    appelé depuis ce thread après chaque relecture ; ses erreurs vont à
+    on_error(error) sans arrêter le thread.
+    """
+
+    def __init__(self, backend, on_update=None, settle=0.05, on_error=None):
+        self.backend = backend
+        self.on_update = on_update
+        self.on_error = on_error
+        self.settle = settle
+        self.loaded = False
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._running = True
+        self._thread = None
+
+    def load(self, sink_inputs):
+        """Remplace le contenu de l'index ; retourne les flux apparus et disparus"""
+        streams = {sink_input.index: sink_input for sink_input in sink_inputs}
+        with self._lock:
+            previous, self._streams = self._streams, streams
+            self.loaded = True
+        added = [stream for index, stream in streams.items() if index not in previous]
+        removed = [stream for index, stream in previous.items() if index not in streams]
+        return added, removed
+
+    def refresh(self):
+        """Relit la table des flux depuis le serveur"""
+        return self.load(self.backend.list_sink_inputs())
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.refresh()
+
+    def invalidate(self):
+        """Programme une relecture (appelable depuis n'importe quel thread)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._dirty.set()
+
+    def remove(self, index):
+        with self._lock:
+            return self._streams.pop(int(index), None)
+
+    def update(self, index, **changes):
+        """Met à jour un flux connu après une opération faite par l'application"""
+        with self._lock:
+            stream = self._streams.get(int(index))
+            if stream is not None:
+                for key, value in changes.items():
+                    setattr(stream, key, value)
+            return stream
+
+    def get(self, index):
+        with self._lock:
+            return self._streams.get(int(index))
+
+    def streams(self):
+        with self._lock:
+            return list(self._streams.values())
+
+    def on_sink(self, sink_index):
+        """Flux qui jouent sur un sink (d'après son index serveur)"""
+        return [stream for stream in self.streams() if stream.sink == sink_index]
+
+    def by_application(self, pattern):
+        rule = RoutingRule(pattern, "")
+        return [stream for stream in self.streams() if rule.matches(stream)]
+
+    def stop(self):
+        self._running = False
+        self._dirty.set()
+
+    def _run(self):
+        while True:
+            self._dirty.wait()
+            if not self._running:
+                return
+            time.sleep(self.settle)
+            self._dirty.clear()
+            try:
+                added, removed = self.refresh()
+            except BackendError:
+                continue
+            if self.on_update and (added or removed):
+                try:
+                    self.on_update(added, removed)
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(e)
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Travailleurs d'arrière-plan d'Audio Combinator
+Écritures de volume regroupées et limitées en débit hors du thread GTK
+Exécuteur de commandes asynchrone pour les opérations sur le serveur sonore
+Moteur de fondus (rampes de volume) cadencé par son propre thread
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_backend import BackendError
+
+
+class VolumeWriteScheduler:
+    """Envoie les volumes au serveur depuis un thread dédié
+
+    Les écritures en attente sont regroupées par cible : seule la dernière
+    valeur demandée pour un sink (ou un sink-input) est envoyée. Le thread
+    envoie au plus une valeur par cible et par tour, et au plus max_rate
+    tours par seconde.
+    """
+
+    def __init__(self, backend, max_rate=30.0, on_error=None):
+        self.backend = backend
+        self.interval = 1.0 / max_rate
+        self.on_error = on_error
+        self.pending = {}
+        self.in_flight = False
+        self.running = True
+        self.condition = threading.Condition()
+        self.stats = {"submitted": 0, "written": 0, "coalesced": 0, "failed": 0}
+        self._reported = dict(self.stats)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def set_sink_volume(self, sink_name, volume_percent):
+        self.submit(("sink", sink_name), volume_percent)
+
+    def set_sink_input_volume(self, sink_input_id, volume_percent):
+        self.submit(("sink-input", sink_input_id), volume_percent)
+
+    def submit(self, target, volume_percent):
+        """Programme une écriture ; remplace la valeur en attente pour cette cible"""
+        with self.condition:
+            self.stats["submitted"] += 1
+            if target in self.pending:
+                self.stats["coalesced"] += 1
+            self.pending[target] = volume_percent
+            self.condition.notify()
+
+    def discard(self, target):
+        """Abandonne l'écriture en attente pour une cible (ex. sink disparu)"""
+        with self.condition:
+            self.pending.pop(target, None)
+
+    def flush(self, timeout=2.0):
+        """Attend que toutes les écritures en attente soient envoyées"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.pending or self.in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def take_report(self):
+        """Retourne les compteurs accumulés depuis le dernier rapport"""
+        with self.condition:
+            report = {key: self.stats[key] - self._reported[key] for key in self.stats}
+            self._reported = dict(self.stats)
+        return report
+
+    def stop(self):
+        """Envoie les dernières valeurs puis arrête le thread"""
+        self.flush()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=1.0)
+
+    def _write(self, target, volume_percent):
+        kind, identifier = target
+        if kind == "sink":
+            self.backend.set_sink_volume(identifier, volume_percent)
+        else:
+            self.backend.set_sink_input_volume(identifier, volume_percent)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                batch = self.pending
+                self.pending = {}
+                self.in_flight = True
+
+            started = time.monotonic()
+            for target, volume_percent in batch.items():
+                try:
+                    self._write(target, volume_percent)
+                    written, failed = 1, 0
+                except BackendError as e:
+                    written, failed = 0, 1
+                    if self.on_error:
+                        self.on_error(target, e)
+                with self.condition:
+                    self.stats["written"] += written
+                    self.stats["failed"] += failed
+
+            with self.condition:
+                self.in_flight = False
+                self.condition.notify_all()
+
+            # Limiter le débit : les valeurs arrivant pendant la pause sont regroupées
+            elapsed = time.monotonic() - started
+            if elapsed < self.interval:
+                time.sleep(self.interval - elapsed)
+
+
+class CommandExecutor:
+    """Exécute les opérations sur le serveur sonore hors du thread de l'interface
+
+    Les tâches s'exécutent dans l'ordre sur un unique thread, ce qui préserve
+    la séquence des commandes (déchargement avant chargement, etc.). Les
+    callbacks de fin, d'erreur et de progression sont transmis via dispatch,
+    par exemple GLib.idle_add pour les exécuter dans la boucle GTK.
+    """
+
+    def __init__(self, dispatch=None):
+        self.dispatch = dispatch or (lambda func, *args: func(*args))
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-io")
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, on_done=None, on_error=None):
+        """Programme func(*args) et retourne un Future"""
+        with self._lock:
+            self.pending += 1
+        future = self.pool.submit(func, *args)
+
+        def _complete(completed):
+            with self._lock:
+                self.pending -= 1
+            error = completed.exception()
+            if error is None:
+                if on_done:
+                    self.dispatch(on_done, completed.result())
+            elif on_error:
+                self.dispatch(on_error, error)
+
+        future.add_done_callback(_complete)
+        return future
+
+    def reporter(self, callback):
+        """Retourne une fonction de progression utilisable depuis le thread de travail"""
+        return lambda *args: self.dispatch(callback, *args)
+
+    @property
+    def busy(self):
+        with self._lock:
+            return self.pending > 0
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
+
+
+def _curve_linear(start, end, t):
+    return start + (end - start) * t
+
+
+def _curve_ease(start, end, t):
+    """Démarrage et arrivée en douceur (smoothstep)"""
+    return start + (end - start) * t * t * (3 - 2 * t)
+
+
+def _curve_cubic(start, end, t):
+    """Interpolation perceptuelle : linéaire sur la racine cubique du volume"""
+    a, b = max(start, 0.0) ** (1 / 3), max(end, 0.0) ** (1 / 3)
+    return (a + (b - a) * t) ** 3
+
+
+FADE_CURVES = {
+    "linear": _curve_linear,
+    "ease": _curve_ease,
+    "cubic": _curve_cubic,
+}
+
+
+class _Fade:
+    __slots__ = ("start", "end", "started", "duration", "curve", "before", "on_done")
+
+    def __init__(self, start, end, duration, curve, before, on_done):
+        self.start = start
+        self.end = end
+        self.started = None
+        self.duration = duration
+        self.curve = curve
+        self.before = before
+        self.on_done = on_done
+
+    def value(self, now):
+        if self.started is None:
+            return self.start
+        if self.duration <= 0:
+            return self.end
+        t = min(1.0, (now - self.started) / self.duration)
+        return self.curve(self.start, self.end, t)
+
+
+class FadeEngine:
+    """Rampes de volume simultanées, envoyées à cadence fixe
+
+    À chaque tick, la valeur courante de chaque fondu est confiée au
+    VolumeWriteScheduler : si le serveur est plus lent que la cadence, les
+    pas intermédiaires sont regroupés au lieu de s'accumuler. Un nouveau
+    fondu sur une cible déjà en fondu repart de la valeur courante.
+    """
+
+    def __init__(self, writer, tick_rate=50.0, on_error=None):
+        self.writer = writer
+        self.interval = 1.0 / tick_rate
+        self.on_error = on_error
+        self.fades = {}
+        self.running = True
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def fade(self, target, start, end, duration_ms, curve="linear", before=None, on_done=None):
+        """Programme un fondu de start à end (en %) sur duration_ms millisecondes
+
+        before() s'exécute sur le thread du moteur juste avant le premier pas,
+        on_done(target) une fois la valeur finale envoyée. Leurs erreurs vont
+        à on_error(target, error) ; un fondu dont before() échoue est abandonné.
+        """
+        if curve not in FADE_CURVES:
+            raise ValueError(f"Courbe inconnue: {curve}")
+        with self.condition:
+            current = self.fades.get(target)
+            if current is not None:
+                start = current.value(time.monotonic())
+            self.fades[target] = _Fade(float(start), float(end), duration_ms / 1000.0,
+                                       FADE_CURVES[curve], before, on_done)
+            self.condition.notify()
+
+    def cancel(self, target):
+        """Arrête un fondu en cours et retourne la dernière valeur atteinte"""
+        with self.condition:
+            fade = self.fades.pop(target, None)
+            return fade.value(time.monotonic()) if fade else None
+
+    def current(self, target):
+        with self.condition:
+            fade = self.fades.get(target)
+            return fade.value(time.monotonic()) if fade else None
+
+    @property
+    def active(self):
+        with self.condition:
+            return len(self.fades)
+
+    def wait(self, timeout=None):
+        """Attend la fin de tous les fondus"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.fades:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.fades.clear()
+            self.condition.notify_all()
+        self.thread.join(timeout=1.0)
+
+    def _discard(self, target, fade):
+        """Retire un fondu s'il est toujours le fondu courant de sa cible"""
+        with self.condition:
+            if self.fades.get(target) is not fade:
+                return False
+            del self.fades[target]
+            self.condition.notify_all()
+            return True
+
+    def _callback(self, target, func, *args):
+        """Appelle before/on_done ; une erreur est signalée sans arrêter le moteur"""
+        try:
+            func(*args)
+            return True
+        except Exception as e:
+            if self.on_error:
+                self.on_error(target, e)
+            return False
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.fades:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                fades = list(self.fades.items())
+
+            tick = time.monotonic()
+            finished = []
+            for target, fade in fades:
+                if fade.started is None:
+                    if fade.before and not self._callback(target, fade.before):
+                        self._discard(target, fade)
+                        continue
+                    fade.started = time.monotonic()
+                now = time.monotonic()
+                self.writer.submit(target, round(fade.value(now), 1))
+                if now - fade.started >= fade.duration:
+                    finished.append((target, fade))
+
+            for target, fade in finished:
+                # Un fondu remplacé entre-temps n'est ni retiré ni terminé :
+                # son on_done contredirait celui qui l'a remplacé
+                if self._discard(target, fade) and fade.on_done:
+                    self._callback(target, fade.on_done, target)
+
+            elapsed = time.monotonic() - tick
+            if elapsed < self.interval:
+                time.sleep(self.interval - elapsed)
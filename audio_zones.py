@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zones d'Audio Combinator
+Chaque zone est une sortie combinée indépendante (ses périphériques, son
+volume général, sa politique de sortie par défaut et son cycle de vie),
+pilotée par le cœur qui partage entre elles le backend et la table des sinks
+"""
+
+import re
+import time
+
+from audio_backend import BackendError, MixerSnapshot, SinkState
+from audio_latency import DRIFT_WARNING_USEC, LatencyMonitor, combine_sink_tuning
+from audio_recorder import Recorder
+
+# Préfixe des sorties combinées créées par Audio Combinator
+COMBINED_PREFIX = "combined-output-"
+
+# Zone utilisée quand aucune n'est précisée (interface graphique, commandes simples)
+DEFAULT_ZONE = "principale"
+
+_SINK_NAME = re.compile(r'sink_name="?([^"\s]+)')
+
+
+def _no_progress(text, fraction):
+    pass
+
+
+def module_sink_name(argument):
+    """Nom du sink créé par un module, d'après ses arguments (None si absent)"""
+    match = _SINK_NAME.search(argument or "")
+    return match.group(1) if match else None
+
+
+def zone_slug(name):
+    """Partie du nom de sink propre à une zone (caractères sûrs pour pactl)"""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+class Zone:
+    """Une sortie combinée et son état
+
+    Les opérations sont bloquantes et passent par le cœur (backend, table
+    des sinks, journal) ; les modules chargés sont inscrits dans
+    core.owned_modules (index -> nom du sink) pour que le nettoyage ne
+    touche qu'à ceux-là, et chaque changement est noté dans le journal de
+    reprise.
+    """
+
+    def __init__(self, core, name):
+        self.core = core
+        self.name = name
+
+        # État de la sortie combinée
+        self.combined_sink_active = False
+        self.module_id = None
+        self.combined_name = None
+        self.slaves = []  # Noms des sinks combinés
+
+        # Branchements à chaud : slaves voulus (même débranchés) et sinks déjà vus
+        self.wanted_slaves = []
+        self.slave_volumes = {}  # Volumes du plan, rétablis au retour d'un slave
+        self.set_as_default = False
+        self.known_sinks = set()
+
+        # Latences des sorties combinées
+        self.latency = None          # Dernier rapport de latence (LatencyReport)
+        self.initial_latency = None  # Rapport utilisé pour régler le module
+        self.latency_monitor = None
+
+        # Enregistrement de la sortie combinée (Recorder)
+        self.recorder = None
+
+        # État du mélangeur avant la session, rétabli à l'arrêt (MixerSnapshot)
+        self.snapshot = None
+
+        # Flux amenés sur la sortie combinée au démarrage : index -> (sink d'origine, application)
+        self.moved_streams = {}
+
+    @property
+    def is_default(self):
+        return self.name == DEFAULT_ZONE
+
+    def log(self, message, tag=None):
+        if not self.is_default:
+            message = f"[{self.name}] {message}"
+        self.core.log(message, tag)
+
+    def new_sink_name(self):
+        stamp = int(time.time())
+        if self.is_default:
+            return f"{COMBINED_PREFIX}{stamp}"
+        return f"{COMBINED_PREFIX}{zone_slug(self.name)}-{stamp}"
+
+    def owns_sink_name(self, sink_name):
+        """Vrai si le nom de sink a été généré pour cette zone (relais compris)"""
+        zone = "" if self.is_default else re.escape(zone_slug(self.name)) + "-"
+        return re.fullmatch(rf"{re.escape(COMBINED_PREFIX)}{zone}\d+(-relais)?", sink_name) is not None
+
+    # Cycle de vie
+
+    def create(self, plan, progress=_no_progress):
+        """Crée la sortie audio combinée de la zone"""
+        core = self.core
+        selected_devices = plan["devices"]
+
+        if len(selected_devices) < 2:
+            self.log("Veuillez sélectionner au moins deux périphériques différents.", "error")
+            return False
+
+        # Noter l'état du mélangeur avant d'y toucher
+        self.snapshot = core.take_snapshot()
+
+        # Générer un nom pour la sortie combinée
+        self.combined_name = self.new_sink_name()
+
+        # Créer la sortie combinée
+        self.log(f"Création de la sortie combinée '{self.combined_name}'...", "info")
+        self.log(f"Combinaison de {len(selected_devices)} périphériques:", "info")
+        for device in selected_devices:
+            self.log(f"  - {device['description']}", "info")
+
+        steps = 4
+        progress("Mesure des latences", 1 / steps)
+        names = [device['name'] for device in selected_devices]
+        report = core.measure_latency(names)
+        if report.latencies:
+            self.log(f"Latences: {report.summary(core.describe)}", "info")
+
+        progress("Chargement du module de combinaison", 2 / steps)
+        module_id = self.load_combine_module(self.combined_name, names, report)
+
+        if module_id is not None:
+            self.module_id = str(module_id)
+            self.combined_sink_active = True
+            self.slaves = names
+            self.wanted_slaves = list(names)
+            self.slave_volumes = dict(zip(names, plan["volumes"]))
+            self.set_as_default = plan["set_as_default"]
+            self.known_sinks = {sink.name for sink in core.sinks}
+            self.log("Sortie combinée créée avec succès!", "success")
+            self.start_latency_monitor(report)
+
+            # Volume principal et volumes individuels en un lot (seulement ceux qui changent)
+            progress("Réglage des volumes", 3 / steps)
+            mutes = list(plan.get("mutes", [])) + [False] * len(selected_devices)
+            states = [SinkState(self.combined_name, plan["main_volume"])]
+            states += [SinkState(device['name'], volume, muted or None)
+                       for device, volume, muted in zip(selected_devices, plan["volumes"], mutes)]
+            try:
+                core.apply_sink_states(states)
+            except BackendError as e:
+                self.log(f"Erreur: {e}", "error")
+
+            # Définir comme périphérique par défaut si demandé
+            if plan["set_as_default"]:
+                progress("Définition du périphérique par défaut", 1.0)
+                core.run_backend("set_default_sink", self.combined_name)
+                self.log("Défini comme périphérique par défaut.", "success")
+
+            # Amener les flux déjà en cours (sinon ils restent sur leur ancienne sortie)
+            if plan.get("move_streams") is not None:
+                self.move_streams_in(plan["move_streams"])
+
+            self.log("Contrôles de volume individuels activés.", "success")
+            core.save_state()
+            return True
+        else:
+            self.combined_name = None
+            self.snapshot = None
+            self.log("Erreur lors de la création de la sortie combinée.", "error")
+            return False
+
+    def move_streams_in(self, selection):
+        """Déplace en un lot les flux en cours choisis vers la sortie combinée
+
+        selection : {"applications": [motifs], "sinks": [noms]} (voir
+        CombinerCore.select_streams) ; {} prend tous les flux. Le sink d'origine
+        de chaque flux est noté pour l'y renvoyer à l'arrêt.
+        """
+        core = self.core
+        moved = {}
+        for stream in core.select_streams(selection.get("applications"), selection.get("sinks")):
+            origin = core.sinks.get_by_index(stream.sink)
+            if origin is not None and origin.name != self.combined_name:
+                moved[stream.index] = (origin.name, stream.application)
+        if not moved:
+            return 0
+        try:
+            core.backend.move_sink_inputs(list(moved), self.combined_name)
+            failed = False
+        except BackendError as e:
+            # Un flux a pu se terminer entre-temps : la relecture dira lesquels sont arrivés
+            self.log(f"Erreur lors du déplacement des flux: {e}", "error")
+            failed = True
+        # La table des sinks date d'avant le chargement du module
+        combined = core.sinks.get(self.combined_name)
+        try:
+            if combined is None:
+                core.refresh()
+                combined = core.sinks.get(self.combined_name)
+            if failed:
+                core.streams.refresh()
+        except BackendError as e:
+            self.log(f"Erreur: {e}", "error")
+        if combined is None:
+            return 0
+        if failed:
+            arrived = {stream.index for stream in core.streams.on_sink(combined.index)}
+            moved = {index: entry for index, entry in moved.items() if index in arrived}
+        else:
+            for index in moved:
+                core.streams.update(index, sink=combined.index)
+        self.moved_streams.update(moved)
+        self.log(f"{len(moved)} flux déplacé(s) vers la sortie combinée.", "info")
+        return len(moved)
+
+    def load_combine_module(self, sink_name, slave_names, report):
+        """Charge module-combine-sink avec le réglage d'alignement ; retourne l'index ou None"""
+        core = self.core
+        argument = f"sink_name=\"{sink_name}\" slaves=\"{','.join(slave_names)}\""
+        tuning = combine_sink_tuning(report, core.resample_method)
+        tuned = " ".join(f"{key}={value}" for key, value in tuning.items())
+        try:
+            module_id = core.backend.load_module("module-combine-sink", f"{argument} {tuned}")
+        except BackendError as e:
+            # Un serveur peut refuser un paramètre (ex. méthode de rééchantillonnage absente)
+            self.log(f"Réglage d'alignement refusé ({e}), chargement sans réglage.", "warning")
+            if core.metrics:
+                core.metrics.retry("load_module")
+            module_id = core.run_backend("load_module", "module-combine-sink", argument)
+        if module_id is not None:
+            core.owned_modules[str(module_id)] = sink_name
+            core.save_state()
+        return module_id
+
+    def unload_module(self, module_id):
+        """Décharge un module de l'instance ; il reste inscrit si le serveur refuse"""
+        try:
+            self.core.backend.unload_module(module_id)
+        except BackendError as e:
+            self.log(f"Erreur: {e}", "error")
+            return False
+        self.core.owned_modules.pop(str(module_id), None)
+        # Sans attendre l'événement : la table ne doit plus proposer son sink
+        for sink in [sink for sink in self.core.sinks if sink.owner_module == int(module_id)]:
+            self.core.sinks.remove(sink.index)
+        return True
+
+    def reconfigure(self, slave_names, progress=_no_progress):
+        """Remplace les slaves de la sortie combinée en gardant son nom
+
+        module-combine-sink ne peut pas changer de slaves : une sortie relais
+        reçoit les flux en un lot pendant que le module est rechargé sous le
+        même nom, puis les flux y reviennent en un lot. La lecture ne s'arrête
+        donc jamais faute de sortie.
+        """
+        core = self.core
+        if not self.combined_sink_active or not slave_names:
+            return False
+        if list(slave_names) == self.slaves:
+            return True
+        name = self.combined_name
+        self.log(f"Reconfiguration de la sortie combinée: {', '.join(core.describe(n) for n in slave_names)}",
+                 "info")
+
+        progress("Mesure des latences", 0.1)
+        report = core.measure_latency(slave_names)
+        combined = core.sinks.get(name)
+        # Relecture obligatoire : un flux oublié par l'index tomberait sur une
+        # sortie de secours au déchargement du module
+        try:
+            core.streams.refresh()
+        except BackendError as e:
+            self.log(f"Erreur: {e}", "error")
+        sink_inputs = [sink_input.index for sink_input in core.streams_on(name)]
+
+        # Relais temporaire portant les nouveaux slaves
+        progress("Sortie relais", 0.3)
+        bridge_name = f"{name}-relais"
+        bridge_id = self.load_combine_module(bridge_name, slave_names, report)
+        if bridge_id is not None and sink_inputs:
+            core.run_backend("move_sink_inputs", sink_inputs, bridge_name)
+
+        progress("Rechargement du module de combinaison", 0.5)
+        self.stop_latency_monitor()
+        # Sans module_id, la disparition de l'ancien module n'est pas prise pour une perte
+        old_module, self.module_id = self.module_id, None
+        self.unload_module(old_module)
+        module_id = self.load_combine_module(name, slave_names, report)
+        if module_id is None:
+            if bridge_id is None:
+                self.on_combined_module_lost()
+                return False
+            # Le relais devient la sortie combinée
+            self.log("Rechargement impossible, la sortie relais reste active.", "warning")
+            self.module_id, self.combined_name = str(bridge_id), bridge_name
+        else:
+            self.module_id = str(module_id)
+            progress("Retour des flux", 0.7)
+            if combined:
+                core.run_backend("apply_sink_states", [SinkState(name, combined.volume, combined.muted)])
+            if self.set_as_default:
+                core.run_backend("set_default_sink", name)
+            if sink_inputs:
+                core.run_backend("move_sink_inputs", sink_inputs, name)
+            if bridge_id is not None:
+                self.unload_module(bridge_id)
+
+        # Rétablir le volume des slaves qui reviennent
+        returning = [SinkState(slave, self.slave_volumes[slave]) for slave in slave_names
+                     if slave not in self.slaves and slave in self.slave_volumes]
+        if returning:
+            core.run_backend("apply_sink_states", returning)
+        self.slaves = list(slave_names)
+        core.save_state()
+        self.start_latency_monitor(report)
+        progress("Reconfiguration terminée", 1.0)
+        self.log(f"Sortie combinée reconfigurée ({len(sink_inputs)} flux déplacés).", "success")
+        return True
+
+    def hotplug_slaves(self, add_new=False):
+        """Slaves à combiner d'après les sinks présents, ou None si rien ne change
+
+        Un slave débranché est retiré de la combinaison puis y revient quand
+        il est rebranché ; avec add_new, tout nouveau périphérique est ajouté.
+        """
+        if not self.combined_sink_active:
+            return None
+        sinks = self.core.sinks
+        if add_new:
+            for sink in sinks.selectable():
+                if sink.name not in self.known_sinks and sink.name not in self.wanted_slaves:
+                    self.log(f"Nouveau périphérique ajouté à la combinaison: {sink.description}", "info")
+                    self.wanted_slaves.append(sink.name)
+        self.known_sinks.update(sink.name for sink in sinks)
+        present = [name for name in self.wanted_slaves if name in sinks]
+        if not present or present == self.slaves:
+            return None
+        return present
+
+    def remove(self):
+        """Supprime la sortie audio combinée de la zone"""
+        self.stop_latency_monitor()
+        self.stop_recording()
+        if self.module_id:
+            self.log(f"Suppression de la sortie combinée (module {self.module_id})...", "info")
+            # Avant le déchargement : les flux ne passent pas par une sortie de secours
+            self.core.restore_snapshot(self.snapshot, self.combined_name,
+                                       set(self.slaves) | set(self.wanted_slaves), self.moved_streams)
+            self.snapshot = None
+            self.moved_streams = {}
+            removed = self.unload_module(self.module_id)
+            self.combined_sink_active = False
+            self.module_id = None
+            self.combined_name = None
+            self.slaves = []
+            self.core.save_state()
+            if removed:
+                self.log("Sortie combinée supprimée.", "success")
+            return removed
+
+        # Sans module connu : seulement les modules de cette zone, et de cette
+        # instance si elle en a chargé (une commande « stop » isolée n'en a aucun)
+        modules = [module for module in self.core.run_backend("list_modules") or []
+                   if module.name == "module-combine-sink" and self.owns_module(module)]
+        if modules:
+            for module in modules:
+                self.unload_module(module.index)
+            self.core.save_state()
+            self.log("Les sorties combinées de la zone ont été supprimées.", "success")
+            return True
+        self.log("Aucune sortie combinée active trouvée.", "warning")
+        return False
+
+    def owns_module(self, module):
+        sink_name = module_sink_name(module.argument)
+        if sink_name is None or not self.owns_sink_name(sink_name):
+            return False
+        owned = self.core.owned_modules
+        return not owned or str(module.index) in owned
+
+    # Latences
+
+    def start_latency_monitor(self, report, interval=10.0):
+        """Surveille l'alignement des sorties tant que la combinaison tourne"""
+        self.stop_latency_monitor()
+        self.latency = self.initial_latency = report
+        self.latency_monitor = LatencyMonitor(self.core.backend, self.slaves, self.on_latency_report,
+                                              interval)
+
+    def stop_latency_monitor(self):
+        if self.latency_monitor:
+            self.latency_monitor.stop()
+            self.latency_monitor = None
+        self.latency = self.initial_latency = None
+
+    def on_latency_report(self, report):
+        """Nouvelle mesure : signale une dérive par rapport au réglage initial"""
+        previous, self.latency = self.latency, report
+        if self.initial_latency is None:
+            # Combinaison reprise : la première mesure sert de référence
+            self.initial_latency = report
+        initial = self.initial_latency
+        if initial is not None and previous is not None:
+            drift = abs(report.spread_usec - initial.spread_usec)
+            if drift >= DRIFT_WARNING_USEC > abs(previous.spread_usec - initial.spread_usec):
+                self.log(f"Les latences ont dérivé depuis le démarrage: {report.summary(self.core.describe)}. "
+                         "Redémarrez la combinaison pour réajuster l'alignement.", "warning")
+        if self.is_default and self.core.on_latency:
+            self.core.on_latency(report)
+
+    # Enregistrement
+
+    def start_recording(self, directory, **options):
+        """Enregistre la sortie combinée dans directory (options : voir Recorder)"""
+        if not self.combined_sink_active:
+            raise ValueError("Aucune sortie combinée active.")
+        self.stop_recording()
+        sink = self.core.sinks.get(self.combined_name)
+        source = sink.monitor_source if sink and sink.monitor_source else f"{self.combined_name}.monitor"
+        prefix = "combined" if self.is_default else f"combined-{zone_slug(self.name)}"
+        self.recorder = Recorder(source, directory, prefix, **options)
+        self.log(f"Enregistrement de la sortie combinée dans {directory}.", "info")
+        return self.recorder.stats()
+
+    def stop_recording(self):
+        """Termine l'enregistrement en cours ; retourne ses compteurs (None s'il n'y en a pas)"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return None
+        stats = recorder.stop()
+        dropped = f", {stats['dropped_blocks']} blocs perdus" if stats["dropped_blocks"] else ""
+        self.log(f"Enregistrement terminé: {stats['seconds']} s en {stats['segments']} fichier(s){dropped}.",
+                 "warning" if stats["dropped_blocks"] or stats["error"] else "success")
+        return stats
+
+    # Événements du serveur
+
+    def check_module(self, modules):
+        """Vérifie que notre module figure toujours dans la liste des modules"""
+        if self.combined_sink_active and self.module_id and \
+                not any(str(module.index) == self.module_id for module in modules):
+            self.on_combined_module_lost()
+            return False
+        return True
+
+    def on_combined_module_lost(self):
+        """Le module de sortie combinée a disparu sans passer par nous"""
+        self.log("Le module de sortie combinée a été supprimé de façon inattendue.", "warning")
+        self.core.owned_modules.pop(self.module_id, None)
+        self.module_id = None  # Un index de module peut être réattribué : ne plus jamais le décharger
+        self.combined_sink_active = False
+        self.moved_streams = {}  # Le serveur a déjà déplacé les flux vers une autre sortie
+        self.stop_latency_monitor()
+        self.stop_recording()
+        self.core.save_state()
+
+    # Journal de reprise
+
+    def to_state(self):
+        """Ce qu'il faut pour reprendre la zone après un arrêt brutal"""
+        return {
+            "module_id": self.module_id,
+            "combined_name": self.combined_name,
+            "slaves": list(self.slaves),
+            "wanted_slaves": list(self.wanted_slaves),
+            "slave_volumes": dict(self.slave_volumes),
+            "set_as_default": self.set_as_default,
+            "snapshot": self.snapshot.to_dict() if self.snapshot else None,
+            "moved_streams": {str(index): list(entry) for index, entry in self.moved_streams.items()},
+        }
+
+    def adopt(self, state):
+        """Reprend une combinaison toujours chargée, sans la recréer (aucune coupure)"""
+        self.module_id = str(state["module_id"])
+        self.combined_name = state["combined_name"]
+        self.slaves = list(state.get("slaves", []))
+        self.wanted_slaves = list(state.get("wanted_slaves", self.slaves))
+        self.slave_volumes = dict(state.get("slave_volumes", {}))
+        self.set_as_default = bool(state.get("set_as_default", False))
+        snapshot = state.get("snapshot")
+        self.snapshot = MixerSnapshot.from_dict(snapshot) if snapshot else None
+        self.moved_streams = {int(index): tuple(entry)
+                              for index, entry in state.get("moved_streams", {}).items()}
+        self.known_sinks = {sink.name for sink in self.core.sinks}
+        self.combined_sink_active = True
+        self.core.owned_modules[self.module_id] = self.combined_name
+        self.start_latency_monitor(None)
+        self.log(f"Sortie combinée '{self.combined_name}' reprise (module {self.module_id}).", "success")
+
+    def status(self):
+        return {
+            "active": self.combined_sink_active,
+            "combined_name": self.combined_name,
+            "module_id": self.module_id,
+            "slaves": list(self.slaves),
+            "set_as_default": self.set_as_default,
+            "latency": self.latency.to_dict() if self.latency else None,
+            "recording": self.recorder.stats() if self.recorder else None,
+        }
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pactl simulé pour les mesures de performance d'Audio Combinator
+L'état du serveur (sinks, modules, sink-inputs) est un fichier JSON désigné
+par FAKE_PACTL_STATE ; chaque lancement est ajouté à FAKE_PACTL_SPAWNS.
+Seules les commandes utilisées par l'application sont simulées.
+"""
+
+import fcntl
+import json
+import os
+import sys
+import time
+
+
+def make_state(sink_count):
+    """État initial : sink_count sinks matériels, aucun module de combinaison"""
+    return {
+        "next_module": 100,
+        "next_sink": sink_count + 1,
+        "default_sink": "",
+        "modules": [],
+        "sink_inputs": [],
+        "sinks": [
+            {"index": i, "name": f"alsa_output.fake_{i}", "description": f"Sortie simulée {i}",
+             "volume": 65536, "mute": False, "owner_module": 1,
+             "latency": {"actual": 1000 * i, "configured": 20000}}
+            for i in range(1, sink_count + 1)
+        ],
+    }
+
+
+def sink_json(sink):
+    volume = {"value": sink["volume"], "value_percent": f"{round(sink['volume'] * 100 / 65536)}%"}
+    return {
+        "index": sink["index"],
+        "name": sink["name"],
+        "description": sink["description"],
+        "state": "RUNNING",
+        "mute": sink["mute"],
+        "volume": {"front-left": volume, "front-right": volume},
+        "monitor_source": sink["name"] + ".monitor",
+        "owner_module": sink["owner_module"],
+        "latency": sink["latency"],
+        "properties": {"device.description": sink["description"]},
+    }
+
+
+def parse_arguments(argument):
+    """sink_name="x" slaves="a,b" -> dict"""
+    values = {}
+    for part in argument:
+        key, _, value = part.partition("=")
+        values[key] = value.strip('"')
+    return values
+
+
+def find_sink(state, name):
+    for sink in state["sinks"]:
+        if sink["name"] == name or str(sink["index"]) == name:
+            return sink
+    raise LookupError(f"No sink named {name}")
+
+
+def run(state, args):
+    """Exécute une commande ; retourne (sortie, état modifié)"""
+    if args[:3] == ["--format=json", "list", "sinks"]:
+        return json.dumps([sink_json(sink) for sink in state["sinks"]]), False
+    if args[:3] == ["list", "short", "modules"]:
+        return "".join(f"{m['index']}\t{m['name']}\t{m['argument']}\n" for m in state["modules"]), False
+    if args[:3] == ["--format=json", "list", "sink-inputs"]:
+        return json.dumps([{"index": i["index"], "sink": i["sink"], "client": i["client"],
+                            "mute": False, "volume": {}, "properties": i.get("properties", {}),
+                            "owner_module": i.get("owner_module")}
+                           for i in state["sink_inputs"]]), False
+    if args[:3] == ["list", "short", "sink-inputs"]:
+        return "".join(f"{i['index']}\t{i['sink']}\t{i['client']}\tprotocol-native.c\ts16le 2ch 44100Hz\n"
+                       for i in state["sink_inputs"]), False
+    command = args[0] if args else ""
+    if command == "load-module":
+        module = {"index": state["next_module"], "name": args[1], "argument": " ".join(args[2:])}
+        state["next_module"] += 1
+        state["modules"].append(module)
+        if args[1] == "module-combine-sink":
+            name = parse_arguments(args[2:]).get("sink_name", f"combined{module['index']}")
+            state["sinks"].append({"index": state["next_sink"], "name": name,
+                                   "description": "Simultaneous output", "volume": 65536,
+                                   "mute": False, "owner_module": module["index"],
+                                   "latency": {"actual": 0, "configured": 0}})
+            state["next_sink"] += 1
+        return f"{module['index']}\n", True
+    if command == "unload-module":
+        index = int(args[1])
+        state["modules"] = [m for m in state["modules"] if m["index"] != index]
+        state["sinks"] = [s for s in state["sinks"] if s["owner_module"] != index]
+        return "", True
+    if command == "set-sink-volume":
+        find_sink(state, args[1])["volume"] = int(args[2])
+        return "", True
+    if command == "set-sink-mute":
+        find_sink(state, args[1])["mute"] = args[2] in ("1", "yes", "true")
+        return "", True
+    if command == "set-default-sink":
+        find_sink(state, args[1])
+        state["default_sink"] = args[1]
+        return "", True
+    if command == "get-default-sink":
+        return f"{state['default_sink']}\n", False
+    if command == "move-sink-input":
+        sink_input = next((i for i in state["sink_inputs"] if str(i["index"]) == args[1]), None)
+        if sink_input is None:
+            raise LookupError(f"No sink-input {args[1]}")
+        sink_input["sink"] = find_sink(state, args[2])["index"]
+        return "", True
+    if command in ("set-sink-input-volume", "set-sink-input-mute"):
+        return "", False
+    raise LookupError(f"Unsupported command: {' '.join(args)}")
+
+
+def main(args):
+    with open(os.environ["FAKE_PACTL_SPAWNS"], "a") as spawns:
+        spawns.write(" ".join(args) + "\n")
+    delay = float(os.environ.get("FAKE_PACTL_DELAY", "0"))
+    if delay:
+        time.sleep(delay)
+
+    with open(os.environ["FAKE_PACTL_STATE"], "r+") as state_file:
+        fcntl.flock(state_file, fcntl.LOCK_EX)
+        state = json.load(state_file)
+        try:
+            output, changed = run(state, args)
+        except (LookupError, IndexError, ValueError) as e:
+            print(f"Failure: {e}", file=sys.stderr)
+            return 1
+        if changed:
+            state_file.seek(0)
+            state_file.truncate()
+            json.dump(state, state_file)
+    sys.stdout.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mesures de performance d'Audio Combinator contre un pactl simulé
+Découverte des sinks, démarrage/arrêt de la combinaison et débit des
+réglages de volume, pour 2 à 64 sinks. Les résultats sont comparés à une
+référence enregistrée ; le code de sortie vaut 1 en cas de régression.
+Avec --backend simulated, le serveur en mémoire remplace pactl et les
+compteurs de lancements comptent les appels au backend.
+
+    python3 benchmarks/run_benchmarks.py                     # mesurer et comparer
+    python3 benchmarks/run_benchmarks.py --update-baseline   # enregistrer la référence
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from audio_backend import PactlBackend  # noqa: E402
+from audio_core import CombinerCore  # noqa: E402
+from audio_simulator import SimulatedBackend  # noqa: E402
+from fake_pactl import make_state  # noqa: E402
+
+FAKE_PACTL = os.path.join(BENCH_DIR, "fake_pactl.py")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+# Nombre de slaves maximal dans l'interface graphique
+MAX_SLAVES = 8
+
+# Sens de chaque mesure : "lower" si une valeur plus basse est meilleure
+DIRECTIONS = {
+    "refresh_ms": "lower",
+    "start_ms": "lower",
+    "stop_ms": "lower",
+    "volume_ops_per_s": "higher",
+    "spawns_refresh": "lower",
+    "spawns_start": "lower",
+    "spawns_stop": "lower",
+    "spawns_volume": "lower",
+}
+
+
+class FakeServer:
+    """Fichier d'état et compteur de lancements du pactl simulé"""
+
+    def __init__(self, directory, sink_count):
+        self.state_path = os.path.join(directory, f"state-{sink_count}.json")
+        self.spawns_path = os.path.join(directory, f"spawns-{sink_count}.log")
+        with open(self.state_path, "w") as f:
+            json.dump(make_state(sink_count), f)
+        open(self.spawns_path, "w").close()
+        os.environ["FAKE_PACTL_STATE"] = self.state_path
+        os.environ["FAKE_PACTL_SPAWNS"] = self.spawns_path
+
+    def create_backend(self):
+        return PactlBackend(FAKE_PACTL)
+
+    def spawns(self):
+        with open(self.spawns_path) as f:
+            return sum(1 for _ in f)
+
+
+class SimulatedServer:
+    """Serveur simulé en mémoire ; compte les appels au backend"""
+
+    def __init__(self, directory, sink_count):
+        self.backend = SimulatedBackend(sink_count)
+
+    def create_backend(self):
+        return self.backend
+
+    def spawns(self):
+        return sum(self.backend.calls.values())
+
+
+SERVERS = {"fake-pactl": FakeServer, "simulated": SimulatedServer}
+
+
+def _silent(message, tag=None):
+    if tag == "error":
+        print(message, file=sys.stderr)
+
+
+def measure(server_kind, sink_count, repeat, drag_steps, directory):
+    """Mesures pour un nombre de sinks ; médiane sur `repeat` essais"""
+    server = SERVERS[server_kind](directory, sink_count)
+    core = CombinerCore(backend=server.create_backend(),
+                        config_dir=os.path.join(directory, "config"), log=_silent)
+    samples = {key: [] for key in DIRECTIONS}
+
+    def timed(key, func, *args):
+        spawns = server.spawns()
+        started = time.perf_counter()
+        result = func(*args)
+        samples[key + "_ms"].append((time.perf_counter() - started) * 1000)
+        samples["spawns_" + key].append(server.spawns() - spawns)
+        return result
+
+    try:
+        for _ in range(repeat):
+            timed("refresh", core.refresh)
+
+            names = [sink.name for sink in core.sinks.selectable()][:MAX_SLAVES]
+            plan = core.make_plan(names, [50] * len(names))
+            if not timed("start", core.start, plan):
+                raise RuntimeError("Échec du démarrage de la combinaison simulée")
+
+            # Glissement de curseurs : drag_steps réglages répartis sur les slaves
+            spawns = server.spawns()
+            started = time.perf_counter()
+            for step in range(drag_steps):
+                core.set_volume(names[step % len(names)], step % 101)
+            core.volume_writer.flush(timeout=30.0)
+            elapsed = time.perf_counter() - started
+            samples["volume_ops_per_s"].append(drag_steps / elapsed)
+            samples["spawns_volume"].append(server.spawns() - spawns)
+
+            timed("stop", core.stop)
+    finally:
+        core.close()
+
+    return {key: round(statistics.median(values), 2) for key, values in samples.items()}
+
+
+def compare(results, baseline, tolerance):
+    """Liste des régressions par rapport à la référence"""
+    regressions = []
+    for sinks, metrics in results.items():
+        for key, value in metrics.items():
+            reference = baseline.get(sinks, {}).get(key)
+            if reference is None:
+                continue
+            # Les lancements de processus sont déterministes : aucune tolérance
+            allowed = 0.0 if key.startswith("spawns_") else tolerance
+            if DIRECTIONS[key] == "lower":
+                regressed = value > reference * (1 + allowed)
+            else:
+                regressed = value < reference * (1 - allowed)
+            if regressed:
+                regressions.append(f"{sinks} sinks, {key}: {value} (référence {reference})")
+    return regressions
+
+
+def print_table(results):
+    keys = list(DIRECTIONS)
+    print("sinks\t" + "\t".join(keys))
+    for sinks, metrics in results.items():
+        print(f"{sinks}\t" + "\t".join(str(metrics[key]) for key in keys))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesures de performance d'Audio Combinator")
+    parser.add_argument("--backend", choices=sorted(SERVERS), default="fake-pactl",
+                        help="serveur simulé utilisé pour les mesures")
+    parser.add_argument("--sinks", default="2,8,32,64",
+                        help="nombres de sinks simulés, séparés par des virgules")
+    parser.add_argument("--repeat", type=int, default=3, help="essais par mesure (médiane)")
+    parser.add_argument("--drag-steps", type=int, default=500,
+                        help="réglages de volume par glissement simulé")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="fichier de référence")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="écart relatif toléré sur les durées et débits (0.5 = 50%%)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="enregistrer les résultats comme nouvelle référence")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="audio-combinator-bench-") as directory:
+        for sink_count in (int(value) for value in args.sinks.split(",")):
+            # Les résultats du serveur en mémoire ont leurs propres références
+            key = str(sink_count) if args.backend == "fake-pactl" else f"{args.backend}/{sink_count}"
+            results[key] = measure(args.backend, sink_count, args.repeat, args.drag_steps, directory)
+    print_table(results)
+
+    if args.update_baseline:
+        # Conserver les références des autres configurations
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Référence enregistrée dans {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Aucune référence : lancez avec --update-baseline pour en enregistrer une.")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"RÉGRESSION: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
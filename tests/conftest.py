@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures communes : un cœur branché sur le serveur sonore simulé
+Aucun matériel audio ni serveur PulseAudio/PipeWire n'est nécessaire.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_core import CombinerCore  # noqa: E402
+from audio_simulator import SimulatedBackend  # noqa: E402
+
+
+@pytest.fixture
+def backend():
+    return SimulatedBackend(sink_count=5)
+
+
+@pytest.fixture
+def messages():
+    """Messages du journal d'état : [(tag, message)]"""
+    return []
+
+
+@pytest.fixture
+def make_core(backend, tmp_path, messages):
+    """Fabrique de cœurs partageant le backend et le répertoire d'état"""
+    cores = []
+
+    def make():
+        core = CombinerCore(backend=backend, config_dir=str(tmp_path / "config"),
+                            state_dir=str(tmp_path / "state"),
+                            log=lambda message, tag=None: messages.append((tag, message)))
+        core.refresh()
+        cores.append(core)
+        return core
+
+    yield make
+    for core in cores:
+        core.close()
+
+
+@pytest.fixture
+def core(make_core):
+    return make_core()
+
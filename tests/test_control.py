@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Protocole de contrôle : requêtes valides, erreurs et lots"""
+
+import pytest
+
+from audio_control import ControlProtocol
+
+
+@pytest.fixture
+def protocol(core):
+    return ControlProtocol(core)
+
+
+def test_set_volume(protocol, core, backend):
+    response = protocol.handle({"id": 1, "op": "set-volume", "volumes": {"sim_output.1": 40}})
+
+    assert response == {"id": 1, "ok": True, "result": None}
+    core.volume_writer.flush()
+    assert next(sink.volume for sink in backend.list_sinks() if sink.name == "sim_output.1") == 40
+
+
+def test_volumes_must_be_an_object(protocol):
+    response = protocol.handle({"id": 2, "op": "set-volume", "volumes": [40, 60]})
+
+    assert response["ok"] is False
+    assert "volumes" in response["error"]
+
+
+def test_unknown_operation(protocol):
+    response = protocol.handle({"id": 3, "op": "explode"})
+
+    assert response == {"id": 3, "ok": False, "error": "Opération inconnue: explode"}
+
+
+def test_record_into_unusable_directory(protocol, core, tmp_path):
+    core.start(core.make_plan(["sim_output.1", "sim_output.2"]))
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+
+    response = protocol.handle({"op": "record", "action": "start", "directory": str(blocker / "rec")})
+
+    assert response["ok"] is False
+    assert core.zone.recorder is None
+
+
+def test_unexpected_error_is_reported(core):
+    def run(func, *args):
+        raise RuntimeError("boom")
+
+    response = ControlProtocol(core, run=run).handle({"op": "streams"})
+
+    assert response == {"ok": False, "error": "Erreur interne: boom", "id": None}
+
+
+def test_batch_continues_after_errors(protocol, core):
+    response = protocol.handle({"op": "batch", "ops": [
+        {"op": "explode"},
+        {"op": "mute", "mutes": "sim_output.1"},
+        {"op": "set-volume", "sink": "sim_output.2", "volume": 200},
+        {"op": "mute", "sink": "sim_output.2", "muted": True},
+    ]})
+
+    assert [entry["ok"] for entry in response["result"]] == [False, False, False, True]
+    assert core.sinks.get("sim_output.2").muted
+
+
+def test_handle_line_rejects_invalid_json(protocol):
+    assert '"ok": false' in protocol.handle_line("{not json")
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Cœur : démarrage, arrêt, rétablissement du mélangeur, zones et reprise"""
+
+import os
+import subprocess
+import sys
+
+from audio_backend import ServerEvent
+from audio_zones import DEFAULT_ZONE
+
+
+def volumes(backend):
+    return {sink.name: sink.volume for sink in backend.list_sinks()}
+
+
+def playing_on(backend, sink_input):
+    index = next(entry.sink for entry in backend.list_sink_inputs() if entry.index == sink_input.index)
+    return next(sink.name for sink in backend.list_sinks() if sink.index == index)
+
+
+def test_start_creates_combined_sink(core, backend):
+    assert core.start(core.make_plan(["sim_output.1", "sim_output.2"], [80, 60], main_volume=70))
+
+    assert core.combined_sink_active
+    assert backend.get_default_sink() == core.combined_name
+    current = volumes(backend)
+    assert current["sim_output.1"] == 80
+    assert current["sim_output.2"] == 60
+    assert current[core.combined_name] == 70
+    assert any(module.name == "module-combine-sink" for module in backend.list_modules())
+
+
+def test_stop_restores_mixer(core, backend):
+    backend.set_sink_volume("sim_output.1", 30)
+    backend.set_default_sink("sim_output.3")
+    core.refresh()
+    core.start(core.make_plan(["sim_output.1", "sim_output.2"], [80, 80]))
+
+    assert core.stop()
+
+    assert not core.combined_sink_active
+    assert backend.get_default_sink() == "sim_output.3"
+    current = volumes(backend)
+    assert current["sim_output.1"] == 30
+    assert current["sim_output.2"] == 100
+    assert not any(module.name == "module-combine-sink" for module in backend.list_modules())
+
+
+def test_stop_returns_moved_streams(core, backend):
+    player = backend.add_sink_input("sim_output.5", client=1, properties={"application.name": "mpv"})
+    other = backend.add_sink_input("sim_output.5", client=2, properties={"application.name": "vlc"})
+    plan = core.make_plan(["sim_output.1", "sim_output.2"])
+    plan["move_streams"] = {"applications": ["mpv"]}
+    core.start(plan)
+
+    assert playing_on(backend, player) == core.combined_name
+    assert playing_on(backend, other) == "sim_output.5"
+
+    core.stop()
+
+    assert playing_on(backend, player) == "sim_output.5"
+
+
+def test_stopping_one_zone_leaves_the_other(core, backend):
+    backend.set_sink_volume("sim_output.1", 30)
+    player = backend.add_sink_input("sim_output.5", properties={"application.name": "mpv"})
+    core.refresh()
+    core.start(core.make_plan(["sim_output.1", "sim_output.2"], [80, 80]), zone="A")
+    plan = core.make_plan(["sim_output.3", "sim_output.4"], [70, 70])
+    plan["move_streams"] = {"applications": ["mpv"]}
+    core.start(plan, zone="B")
+    combined_b = core.get_zone("B").combined_name
+
+    core.stop("A")
+
+    # B a pris la sortie par défaut après A : elle la garde, avec son flux et ses volumes
+    assert backend.get_default_sink() == combined_b
+    assert playing_on(backend, player) == combined_b
+    current = volumes(backend)
+    assert current["sim_output.1"] == 30
+    assert current["sim_output.3"] == 70
+
+    core.stop("B")
+
+    assert playing_on(backend, player) == "sim_output.5"
+    assert volumes(backend)["sim_output.3"] == 100
+
+
+def _crash(core, state_dir):
+    """Simule l'arrêt brutal de l'instance : son journal devient orphelin"""
+    core.fades.stop()
+    core.volume_writer.stop()
+    core.streams.stop()
+    dead = subprocess.Popen([sys.executable, "-c", ""])
+    dead.wait()
+    os.replace(core.journal.path, os.path.join(state_dir, f"{dead.pid}.json"))
+
+
+def test_recover_adopts_live_zone(make_core, backend, tmp_path):
+    crashed = make_core()
+    crashed.start(crashed.make_plan(["sim_output.1", "sim_output.2"], [80, 80]))
+    combined_name = crashed.combined_name
+    _crash(crashed, str(tmp_path / "state"))
+
+    core = make_core()
+    assert core.recover() == [DEFAULT_ZONE]
+
+    assert core.combined_sink_active
+    assert core.combined_name == combined_name
+    assert core.stop()
+    assert volumes(backend)["sim_output.1"] == 100
+
+
+def test_recover_without_adopt_cleans_up(make_core, backend, tmp_path):
+    backend.set_sink_volume("sim_output.1", 30)
+    crashed = make_core()
+    crashed.start(crashed.make_plan(["sim_output.1", "sim_output.2"], [80, 80]))
+    _crash(crashed, str(tmp_path / "state"))
+
+    core = make_core()
+    assert core.recover(adopt=False) == []
+
+    assert not core.combined_sink_active
+    assert not any(module.name == "module-combine-sink" for module in backend.list_modules())
+    assert volumes(backend)["sim_output.1"] == 30
+    assert os.listdir(tmp_path / "state") == []
+
+
+def test_lost_module_is_forgotten(core, backend):
+    core.start(core.make_plan(["sim_output.1", "sim_output.2"]))
+    module_id = core.module_id
+    backend.unload_module(module_id)
+
+    core.handle_event(ServerEvent("remove", "module", int(module_id)))
+
+    assert not core.combined_sink_active
+    assert core.module_id is None
+    assert str(module_id) not in core.owned_modules
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Écritures de volume regroupées et moteur de fondus"""
+
+import pytest
+
+from audio_simulator import SimulatedBackend
+from audio_workers import FadeEngine, VolumeWriteScheduler
+
+
+def volume(backend, name):
+    return next(sink.volume for sink in backend.list_sinks() if sink.name == name)
+
+
+@pytest.fixture
+def writer():
+    errors = []
+    # Un serveur lent : les valeurs arrivant pendant une écriture s'accumulent
+    backend = SimulatedBackend(sink_count=2, latency={"set_sink_volume": 0.01})
+    writer = VolumeWriteScheduler(backend, on_error=lambda target, error: errors.append((target, error)))
+    writer.errors = errors
+    yield writer
+    writer.stop()
+
+
+@pytest.fixture
+def fades(writer):
+    errors = []
+    engine = FadeEngine(writer, on_error=lambda target, error: errors.append((target, error)))
+    engine.errors = errors
+    yield engine
+    engine.stop()
+
+
+def test_writes_are_coalesced(writer):
+    for value in range(100):
+        writer.set_sink_volume("sim_output.1", value)
+
+    assert writer.flush()
+    assert volume(writer.backend, "sim_output.1") == 99
+    assert writer.backend.calls["set_sink_volume"] < 100
+    assert writer.stats["coalesced"] > 0
+    assert writer.stats["written"] + writer.stats["coalesced"] == 100
+
+
+def test_write_error_is_reported_and_writer_continues(writer):
+    writer.backend.inject_failure("set_sink_volume")
+    writer.set_sink_volume("sim_output.1", 10)
+    assert writer.flush()
+
+    writer.set_sink_volume("sim_output.1", 20)
+    assert writer.flush()
+
+    assert [target for target, error in writer.errors] == [("sink", "sim_output.1")]
+    assert volume(writer.backend, "sim_output.1") == 20
+
+
+def test_fade_reaches_target_then_calls_on_done(fades, writer):
+    done = []
+    fades.fade(("sink", "sim_output.1"), 100, 20, 100, curve="ease", on_done=done.append)
+
+    assert fades.wait(timeout=2.0)
+    assert writer.flush()
+    assert volume(writer.backend, "sim_output.1") == 20
+    assert done == [("sink", "sim_output.1")]
+
+
+def test_replaced_fade_does_not_complete(fades):
+    done = []
+    target = ("sink", "sim_output.1")
+    fades.fade(target, 100, 0, 200, on_done=lambda target: done.append("first"))
+    fades.fade(target, 100, 50, 50, on_done=lambda target: done.append("second"))
+
+    assert fades.wait(timeout=2.0)
+    assert done == ["second"]
+
+
+def test_failing_callbacks_do_not_stop_the_engine(fades, writer):
+    def fail(*args):
+        raise RuntimeError("boom")
+
+    fades.fade(("sink", "sim_output.1"), 100, 50, 20, before=fail)
+    fades.fade(("sink", "sim_output.2"), 100, 50, 20, on_done=fail)
+    assert fades.wait(timeout=2.0)
+
+    done = []
+    fades.fade(("sink", "sim_output.1"), 100, 30, 20, on_done=done.append)
+    assert fades.wait(timeout=2.0)
+
+    assert [target for target, error in fades.errors] == [("sink", "sim_output.1"), ("sink", "sim_output.2")]
+    assert done == [("sink", "sim_output.1")]
+    assert fades.thread.is_alive()